@@ -0,0 +1,73 @@
+"""Period totals and sparklines from rolled-up buckets against a scan of raw click events.
+
+Run from the backend directory:
+
+    python benchmarks/bench_affiliate_metrics.py --links 10000 --days 30 --clicks-per-minute 500
+
+Simulated traffic is recorded minute by minute and compacted as the clock
+advances, the way the click flusher does. The raw events are kept alongside
+only to check the rolled-up answers and to time the scan they replace.
+"""
+import argparse
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.affiliate_metrics import AffiliateMetrics  # noqa: E402
+
+PERIODS = {"daily": 86_400, "weekly": 7 * 86_400, "monthly": 30 * 86_400}
+
+
+def run(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(3)
+    metrics = AffiliateMetrics()
+    now = 1_700_000_000 - 1_700_000_000 % 86_400
+    minutes = args.days * 1440
+    start_time = now - minutes * 60
+    link_ids = [f"link-{i}" for i in range(args.links)]
+
+    raw_time = np.repeat(start_time + np.arange(minutes, dtype=np.int64) * 60, args.clicks_per_minute)
+    raw_link = (rng.zipf(1.4, raw_time.size) - 1) % args.links
+
+    started = perf_counter()
+    per_minute = args.clicks_per_minute
+    for minute in range(minutes):
+        timestamp = start_time + minute * 60
+        links, counts = np.unique(raw_link[minute * per_minute:(minute + 1) * per_minute], return_counts=True)
+        for link, count in zip(links.tolist(), counts.tolist()):
+            metrics.record(link_ids[link], timestamp, clicks=count)
+        metrics.compact(timestamp + 60)
+    elapsed = perf_counter() - started
+    print(f"recorded {raw_time.size:,} clicks over {args.days} days in {elapsed:.1f}s, {len(metrics):,} buckets kept")
+
+    for period, seconds in PERIODS.items():
+        since = now - seconds
+        started = perf_counter()
+        for _ in range(100):
+            clicks = metrics.totals(since)[0]
+        rolled = (perf_counter() - started) / 100
+        started = perf_counter()
+        scanned = int(np.count_nonzero(raw_time >= since))
+        scan = perf_counter() - started
+        print(f"{period:<8} rollups {rolled * 1e3:>8.3f} ms   raw scan {scan * 1e3:>8.2f} ms   clicks {clicks:,} / {scanned:,}")
+
+    started = perf_counter()
+    for link in range(100):
+        metrics.series(now - 7 * 86_400, now, 168, link_ids[link])
+    print(f"weekly hourly sparkline for one link: {(perf_counter() - started) / 100 * 1e3:.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--clicks-per-minute", type=int, default=200)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
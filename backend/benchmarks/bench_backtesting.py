@@ -0,0 +1,70 @@
+"""Throughput of the vectorized backtester on synthetic 1-minute candles.
+
+Run from the backend directory:
+
+    python benchmarks/bench_backtesting.py --symbols 24 --years 2
+
+Use ``--data-dir`` to also write the candles as ``.npy`` files and time
+loading them the way the backtest endpoint does.
+"""
+import argparse
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.backtesting import Candles, load_candles, run_backtest, symbol_filename  # noqa: E402
+
+MINUTES_PER_YEAR = 525_600
+
+CONFIGS = {
+    "Smart Grid": {"grid_levels": 10, "grid_spacing": 1.5, "take_profit": 50.0, "stop_loss": 20.0},
+    "DCA": {"initial_buy": 100, "dca_amount": 50, "dca_interval": 24, "take_profit": 10.0, "max_buys": 10},
+    "Trend": {"ema_short": 9, "ema_long": 21, "rsi_period": 14, "rsi_overbought": 70, "take_profit": 5.0, "stop_loss": 3.0},
+}
+
+
+def synthetic_candles(rng: np.random.Generator, minutes: int) -> Candles:
+    timestamp = 1_600_000_000_000 + np.arange(minutes, dtype=np.int64) * 60_000
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.0008, minutes)))
+    spread = close * rng.uniform(0.0, 0.001, minutes)
+    return Candles(timestamp, close, close + spread, close - spread, close, rng.uniform(1, 10, minutes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=24)
+    parser.add_argument("--years", type=float, default=2.0)
+    parser.add_argument("--data-dir", type=Path, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    minutes = int(args.years * MINUTES_PER_YEAR)
+    candles = {f"SYM{i}/USDT": synthetic_candles(rng, minutes) for i in range(args.symbols)}
+    total = args.symbols * minutes
+    print(f"{args.symbols} symbols x {minutes:,} candles = {total:,} candles")
+
+    if args.data_dir:
+        args.data_dir.mkdir(parents=True, exist_ok=True)
+        for symbol, symbol_candles in candles.items():
+            np.save(args.data_dir / f"{symbol_filename(symbol, '1m')}.npy", np.column_stack(symbol_candles))
+        start = perf_counter()
+        for symbol in candles:
+            load_candles(args.data_dir / f"{symbol_filename(symbol, '1m')}.npy")
+        print(f"{'load .npy':<12}{perf_counter() - start:>8.2f}s")
+
+    for strategy_type, config in CONFIGS.items():
+        start = perf_counter()
+        stats = run_backtest(strategy_type, config, candles)
+        elapsed = perf_counter() - start
+        print(
+            f"{strategy_type:<12}{elapsed:>8.2f}s {total / elapsed / 1e6:>8.1f}M candles/s "
+            f"trades={stats['total_trades']:<8} pnl={stats['profit_loss']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Catalog sync throughput against the local stub network server.
+
+Run from the backend directory:
+
+    python benchmarks/bench_catalog_sync.py --networks 5 --products 50000 --latency 0.02
+
+Runs a cold sync that creates every product, a warm sync where every page
+answers 304, and a sync after ``--changes`` products per network changed
+price, where only the changed pages are transferred and diffed.
+"""
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.catalog_sync import CatalogSync  # noqa: E402
+from services.repository import InMemoryRepository  # noqa: E402
+from stubs import CatalogStubServer  # noqa: E402
+
+
+def catalog(rng: random.Random, name: str, count: int):
+    return [
+        {
+            "name": f"{name} product {i}",
+            "description": f"Description of product {i}",
+            "price": round(rng.uniform(5, 500), 2),
+            "commission_rate": round(rng.uniform(0.01, 0.5), 3),
+            "product_url": f"https://{name}.example.com/p/{i}",
+            "category": rng.choice(["Electronics", "Books", "Home", "Fitness"]),
+            "tags": [f"tag{rng.randrange(50)}"],
+        }
+        for i in range(count)
+    ]
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(5)
+    names = [f"n{i}" for i in range(args.networks)]
+    server = CatalogStubServer({name: catalog(rng, name, args.products) for name in names}, args.page_size, args.latency)
+    port = await server.start()
+    networks = [{"id": name, "name": name, "api_url": f"http://127.0.0.1:{port}/{name}"} for name in names]
+    products = InMemoryRepository(indexes=("network_id", "product_url"))
+    sync = CatalogSync(products, rate=args.rate, page_concurrency=args.concurrency, max_connections=args.connections)
+
+    def report(label: str, result) -> None:
+        errors = [network["error"] for network in result["networks"] if network["error"]]
+        print(
+            f"{label:<8} {result['seconds']:>7.2f}s  {result['pages'] / result['seconds']:>7,.0f} pages/s  "
+            f"{result['products_per_second']:>8,.0f} products/s  "
+            f"pages={result['pages']:,} 304={result['not_modified']:,} created={result['created']:,} "
+            f"updated={result['updated']:,} unchanged={result['unchanged']:,} errors={errors[:1]}"
+        )
+
+    report("cold", await sync.sync(networks))
+    report("warm", await sync.sync(networks))
+    for name in names:
+        server.mutate(name, args.changes, rng)
+    report("changed", await sync.sync(networks))
+    assert len(products) == args.networks * args.products
+    await sync.stop()
+    await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--networks", type=int, default=5)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub response delay in seconds")
+    parser.add_argument("--rate", type=float, default=0, help="requests/s per network, 0 = unlimited")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--connections", type=int, default=40)
+    parser.add_argument("--changes", type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
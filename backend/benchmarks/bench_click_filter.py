@@ -0,0 +1,104 @@
+"""Bot and fraud click filtering cost, accuracy and memory.
+
+Run from the backend directory:
+
+    python benchmarks/bench_click_filter.py --clicks 2000000 --visitors 200000
+
+Synthetic traffic over one simulated hour has four sources:
+- human visitors with browser user agents;
+- crawlers and HTTP libraries;
+- a click farm hammering links from a few IPs;
+- visitors who click the same link over and over.
+
+Clicks are classified in flush-sized batches. The benchmark prints the
+per-click cost, how well each source was caught, the unique visitor
+estimate against the true count, and the filter's memory after each
+quarter of the traffic. Memory only grows by 1 KiB for each link's
+first human click, never with the number of clicks.
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.click_filter import ClickFilter  # noqa: E402
+from services.click_tracking import Click  # noqa: E402
+
+BROWSERS = [
+    f"Mozilla/5.0 ({system}) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{version}.0 Safari/537.36"
+    for system in ("Windows NT 10.0; Win64; x64", "Macintosh; Intel Mac OS X 10_15_7", "X11; Linux x86_64", "Linux; Android 14")
+    for version in range(110, 131)
+]
+BOTS = [
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "Mozilla/5.0 (compatible; AhrefsBot/7.0; +http://ahrefs.com/robot/)",
+    "python-requests/2.31.0",
+    "curl/8.4.0",
+    "Go-http-client/1.1",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) HeadlessChrome/120.0 Safari/537.36",
+]
+
+
+def traffic(args: argparse.Namespace, rng: random.Random):
+    """Yield ``(click, source)`` in time order."""
+    step = 3600 / args.clicks
+    visitors = [(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", rng.choice(BROWSERS)) for i in range(args.visitors)]
+    farm = [f"203.0.113.{i}" for i in range(4)]
+    for i in range(args.clicks):
+        now = 1_700_000_000 + i * step
+        link = f"link-{int(rng.paretovariate(1.2)) % args.links}"
+        roll = rng.random()
+        if roll < 0.70:
+            ip, agent = visitors[rng.randrange(args.visitors)]
+            yield Click(link, now, ip, agent), "human"
+        elif roll < 0.85:
+            yield Click(link, now, f"66.249.{rng.randrange(256)}.{rng.randrange(256)}", rng.choice(BOTS)), "bot"
+        elif roll < 0.95:
+            yield Click(link, now, rng.choice(farm), rng.choice(BROWSERS)), "farm"
+        else:
+            ip, agent = visitors[i % 50]
+            yield Click("link-0", now, ip, agent), "repeat"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clicks", type=int, default=2_000_000)
+    parser.add_argument("--visitors", type=int, default=200_000)
+    parser.add_argument("--links", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    click_filter = ClickFilter(window=60, ip_limit=60, repeat_limit=5)
+    caught = {source: [0, 0] for source in ("human", "bot", "farm", "repeat")}
+    humans_seen = set()
+    elapsed = 0.0
+    batch, sources = [], []
+    quarter = args.clicks // 4
+    for i, (click, source) in enumerate(traffic(args, random.Random(5)), 1):
+        batch.append(click)
+        sources.append(source)
+        if len(batch) == args.batch_size or i == args.clicks:
+            started = perf_counter()
+            verdicts = [click_filter.classify(click) for click in batch]
+            elapsed += perf_counter() - started
+            for click, source, verdict in zip(batch, sources, verdicts):
+                caught[source][0] += 1
+                caught[source][1] += verdict is not None
+                if verdict is None:
+                    humans_seen.add((click.ip, click.user_agent))
+            batch, sources = [], []
+        if i % quarter == 0:
+            print(f"after {i:>10,} clicks: filter memory {click_filter.stats()['memory_bytes'] / 2**20:.2f} MiB")
+
+    print(f"{elapsed / args.clicks * 1e6:.2f}us per click ({args.clicks / elapsed:,.0f} clicks/s)")
+    for source, (total, rejected) in caught.items():
+        print(f"{source:<7} {total:>10,} clicks, {rejected / total:6.1%} rejected")
+    estimate = click_filter.unique_visitors()
+    print(f"unique visitors: estimated {estimate:,}, actual {len(humans_seen):,} ({estimate / len(humans_seen) - 1:+.2%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Redirect lookup and click recording cost, and batched flush throughput.
+
+Run from the backend directory:
+
+    python benchmarks/bench_click_tracking.py --links 100000 --clicks 2000000
+
+Clicks are spread over the links with a Zipf-like skew, as campaign
+traffic is. The flush applies one counter update per link per batch
+instead of one per click.
+"""
+import argparse
+import asyncio
+import sys
+from collections import Counter
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.click_tracking import ClickBuffer, LinkIndex  # noqa: E402
+
+
+async def run(args: argparse.Namespace) -> None:
+    links = {
+        f"link-{i}": {"id": f"link-{i}", "custom_url": f"deal-{i}", "tracking_id": f"t{i}", "is_active": True, "clicks": 0}
+        for i in range(args.links)
+    }
+    index = LinkIndex()
+    for link in links.values():
+        index.put(link, f"https://example.com/product/{link['id']}")
+
+    def count_clicks(clicks):
+        for link_id, count in Counter(click.link_id for click in clicks).items():
+            links[link_id]["clicks"] += count
+
+    buffer = ClickBuffer(count_clicks, interval=args.interval, batch_size=args.batch_size)
+    rng = np.random.default_rng(7)
+    codes = [f"deal-{i}" for i in (rng.zipf(1.3, args.clicks) - 1) % args.links]
+
+    buffer.start()
+    start = perf_counter()
+    for offset in range(0, len(codes), 1000):
+        for code in codes[offset:offset + 1000]:
+            started = perf_counter()
+            link_id, _ = index.resolve(code)
+            buffer.record(link_id, "127.0.0.1", "bench")
+            buffer.latency["redirect"].record(perf_counter() - started)
+        await asyncio.sleep(0)  # let the flusher run, as request handling would
+    elapsed = perf_counter() - start
+    await buffer.stop()
+
+    stats = buffer.stats()
+    assert sum(link["clicks"] for link in links.values()) == args.clicks
+    print(f"{args.clicks:,} clicks in {elapsed:.2f}s = {args.clicks / elapsed:,.0f} clicks/s")
+    print(f"{stats['batches']:,} flushes, {args.clicks / stats['batches']:,.0f} clicks per flush")
+    for name, latency in stats["latency"].items():
+        print(
+            f"{name:<9} p50={latency['p50_us']:>9.1f}us p99={latency['p99_us']:>9.1f}us "
+            f"max={latency['max_us']:>9.1f}us"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--clicks", type=int, default=1_000_000)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Dashboard snapshot against the five list endpoints it replaces.
+
+Run from the backend directory:
+
+    python benchmarks/bench_dashboard.py --products 50000 --links 100000 --earnings 500000
+
+Fills the affiliate bot's repositories, then compares the bytes and time
+of serializing the full network, product, link and earning lists plus the
+statistics with one dashboard snapshot: unchanged (the 304 path), after
+an earning write and after a counter merge.
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from routes import affiliate_bot as bot  # noqa: E402
+from services.http_caching import not_modified  # noqa: E402
+from services.metrics import LatencyHistogram  # noqa: E402
+
+
+def fill(args: argparse.Namespace) -> None:
+    rng = random.Random(5)
+    now = datetime.utcnow()
+    networks = [network["id"] for network in bot.mock_networks]
+    for i in range(args.products):
+        product = {
+            "id": f"p{i}",
+            "name": f"Product {i}",
+            "description": "A product description of typical length for an affiliate catalog entry.",
+            "image_url": f"https://example.com/images/{i}.jpg",
+            "price": round(rng.uniform(5, 500), 2),
+            "commission_rate": round(rng.uniform(0.01, 0.5), 3),
+            "network_id": networks[i % len(networks)],
+            "product_url": f"https://example.com/product/{i}",
+            "category": f"category-{i % 20}",
+            "tags": ["tag-a", "tag-b"],
+            "created_at": now,
+            "updated_at": now,
+        }
+        bot.mock_products.add(product)
+        bot.product_ranking.put(product)
+    for i in range(args.links):
+        clicks = rng.randrange(1000)
+        bot.mock_links.add({
+            "id": f"l{i}",
+            "product_id": f"p{i % args.products}",
+            "custom_url": f"link-{i}",
+            "tracking_id": f"t{i}",
+            "campaign": "benchmark",
+            "is_active": rng.random() < 0.9,
+            "clicks": clicks,
+            "conversions": clicks // 30,
+            "revenue": clicks / 3,
+            "created_at": now,
+            "updated_at": now,
+        })
+    statuses = ("pending", "approved", "paid")
+    for i in range(args.earnings):
+        bot.mock_earnings.add({
+            "id": f"e{i}",
+            "link_id": f"l{i % args.links}",
+            "amount": round(rng.uniform(1, 100), 2),
+            "transaction_date": now - timedelta(minutes=i),
+            "status": statuses[i % 3],
+            "transaction_id": f"TX-{i}",
+            "payment_method": "PayPal",
+            "payment_date": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+
+def encode(value: object) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+
+def run(args: argparse.Namespace) -> None:
+    started = perf_counter()
+    fill(args)
+    print(f"filled {args.products:,} products, {args.links:,} links, {args.earnings:,} earnings in {perf_counter() - started:.1f}s")
+
+    started = perf_counter()
+    fan_out = sum(len(encode(repository.find())) for repository in (
+        bot.mock_networks, bot.mock_products, bot.mock_links, bot.mock_earnings,
+    )) + len(encode(bot.summarize_totals(bot.link_counters.totals(), "all-time")))
+    fan_out_seconds = perf_counter() - started
+
+    started = perf_counter()
+    body, etag = bot.dashboard.snapshot()
+    cold = perf_counter() - started
+    print(f"five endpoints: {fan_out / 1e6:8.1f} MB in {fan_out_seconds * 1e3:8.1f}ms (serialization only)")
+    print(f"dashboard:      {len(body) / 1e3:8.1f} kB in {cold * 1e3:8.1f}ms (first build)")
+
+    unchanged, earning_write, counter_merge = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    picker = random.Random(6)
+    revalidated = 0
+    for i in range(args.reads):
+        if i % 3 == 1:
+            bot.mock_earnings.update(f"e{picker.randrange(args.earnings)}", {"status": "paid"})
+            histogram = earning_write
+        elif i % 3 == 2:
+            bot.link_counters.add(f"l{picker.randrange(args.links)}", clicks=1)
+            bot.link_counters.merge()
+            histogram = counter_merge
+        else:
+            histogram = unchanged
+        started = perf_counter()
+        body, new_etag = bot.dashboard.snapshot()
+        revalidated += not_modified(new_etag, etag)
+        histogram.record(perf_counter() - started)
+        etag = new_etag
+    for name, histogram in (("unchanged", unchanged), ("after earning write", earning_write), ("after counter merge", counter_merge)):
+        stats = histogram.snapshot()
+        print(f"{name:<20} p50={stats['p50_us']:>8.1f}us p99={stats['p99_us']:>8.1f}us")
+    print(f"{revalidated:,} of {args.reads:,} reads would have been 304s")
+
+    expected = bot.mock_earnings.count(status="paid")
+    assert json.loads(body)["earnings"]["by_status"]["paid"]["count"] == expected
+    print("paid earnings in the snapshot match the status index")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--earnings", type=int, default=500_000)
+    parser.add_argument("--reads", type=int, default=30_000)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Payout report reconciliation throughput and memory.
+
+Run from the backend directory:
+
+    python benchmarks/bench_earnings_reconciliation.py --earnings 1000000
+
+Earnings are loaded into a repository with a unique transaction id
+index. A payout report covering all of them is then streamed in 64 KiB
+chunks, as CSV and as a JSON array. Most rows move an earning forward,
+and a few are unknown or disagree on the amount. Peak RSS is printed
+after each phase; reconciling should add little to what the earnings
+themselves take.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.earnings_reconciliation import iter_json_batches, reconcile_rows  # noqa: E402
+from services.repository import InMemoryRepository  # noqa: E402
+from services.trade_io import iter_line_batches, parse_row_batches  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_earnings(count: int) -> InMemoryRepository:
+    earnings = InMemoryRepository(indexes=("link_id", "status"), unique=("transaction_id",))
+    created = datetime(2024, 1, 1)
+    earnings.add_many({
+        "id": f"e{i}",
+        "link_id": f"l{i % 1000}",
+        "amount": round(1 + i % 500 * 0.37, 2),
+        "transaction_date": created,
+        "status": "pending" if i % 2 else "approved",
+        "transaction_id": f"TX{i:09d}",
+        "payment_method": None,
+        "payment_date": None,
+        "created_at": created,
+        "updated_at": created,
+    } for i in range(count))
+    return earnings
+
+
+def report_rows(count: int, paid_every: int):
+    """One row per earning: one in a thousand unknown, one in a thousand with the wrong amount."""
+    for i in range(count):
+        transaction_id = f"UNKNOWN{i}" if i % 1000 == 0 else f"TX{i:09d}"
+        amount = round(1 + i % 500 * 0.37, 2) + (5 if i % 1000 == 1 else 0)
+        yield transaction_id, "approved" if i % paid_every == 0 else "paid", amount
+
+
+async def csv_report(count: int, paid_every: int):
+    buffer = ["transaction_id,status,amount,payment_date,payment_method\n"]
+    size = 0
+    for transaction_id, status, amount in report_rows(count, paid_every):
+        line = f"{transaction_id},{status},{amount},2024-02-01T00:00:00Z,Bank Transfer\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    yield "".join(buffer).encode()
+
+
+async def json_report(count: int, paid_every: int):
+    buffer = ["["]
+    size = 0
+    for i, (transaction_id, status, amount) in enumerate(report_rows(count, paid_every)):
+        item = json.dumps({"transaction_id": transaction_id, "status": status, "amount": amount})
+        buffer.append(item if i == 0 else "," + item)
+        size += len(item)
+        if size >= CHUNK:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    buffer.append("]")
+    yield "".join(buffer).encode()
+
+
+def report(name: str, result, elapsed: float) -> None:
+    print(
+        f"{name:<5} {result['rows']:,} rows in {elapsed:.2f}s ({result['rows'] / elapsed:,.0f} rows/s): "
+        f"updated={result['updated']:,} unchanged={result['unchanged']:,} "
+        f"mismatches={result['mismatches']} failed={result['failed']}  peak RSS {peak_rss_mb():.0f} MB"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    started = perf_counter()
+    earnings = load_earnings(args.earnings)
+    print(f"loaded {len(earnings):,} earnings in {perf_counter() - started:.2f}s, peak RSS {peak_rss_mb():.0f} MB")
+
+    started = perf_counter()
+    result = await reconcile_rows(parse_row_batches(iter_line_batches(csv_report(args.earnings, 5)), "csv"), earnings)
+    report("csv", result, perf_counter() - started)
+    assert earnings.count(status="paid") == result["transitions"].get("pending->paid", 0) + result["transitions"].get("approved->paid", 0)
+
+    started = perf_counter()
+    result = await reconcile_rows(iter_json_batches(json_report(args.earnings, 2)), earnings, dry_run=True, unit="item")
+    report("json", result, perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--earnings", type=int, default=1_000_000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Per-tick cost of the Smart Grid engine with many grids per symbol.
+
+Run from the backend directory:
+
+    python benchmarks/bench_grid_engine.py --grids 500 --levels 150 --ticks 200000
+
+Compares the engine, which only visits grids whose trigger prices a tick
+crossed, with handing every tick to every grid on the symbol.
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.grid_engine import GridEngine  # noqa: E402
+
+SYMBOLS = ["BTC/USDT", "ETH/USDT", "SOL/USDT", "BNB/USDT"]
+
+
+def price_path(ticks: int, volatility: float):
+    rng = random.Random(42)
+    prices = {symbol: 100.0 for symbol in SYMBOLS}
+    for _ in range(ticks):
+        symbol = rng.choice(SYMBOLS)
+        prices[symbol] *= 1.0 + rng.gauss(0.0, volatility)
+        yield symbol, prices[symbol]
+
+
+def make_engine(grids: int, levels: int) -> GridEngine:
+    engine = GridEngine()
+    for i in range(grids):
+        engine.add(f"grid-{i}", SYMBOLS[i % len(SYMBOLS)], {
+            "grid_levels": levels + i % 50,
+            "grid_spacing": 0.2 + 0.1 * (i % 10),
+            "capital": 1000,
+        })
+    return engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grids", type=int, default=500)
+    parser.add_argument("--levels", type=int, default=150)
+    parser.add_argument("--ticks", type=int, default=200_000)
+    parser.add_argument("--volatility", type=float, default=0.0002)
+    args = parser.parse_args()
+
+    engine = make_engine(args.grids, args.levels)
+    start = perf_counter()
+    fills = 0
+    for symbol, price in price_path(args.ticks, args.volatility):
+        fills += len(engine.on_price(symbol, price))
+    elapsed = perf_counter() - start
+    stats = engine.stats()
+    print(
+        f"engine     {elapsed / args.ticks * 1e6:>8.2f} us/tick  {stats['grids_touched_per_tick']:>7.2f} grids touched/tick "
+        f"fills={fills:,} levels={stats['levels']:,} p99={stats['tick_latency']['p99_us']:.1f}us"
+    )
+
+    naive = make_engine(args.grids, args.levels)
+    by_symbol = {symbol: [] for symbol in SYMBOLS}
+    for i in range(args.grids):
+        by_symbol[SYMBOLS[i % len(SYMBOLS)]].append(naive.get(f"grid-{i}"))
+    start = perf_counter()
+    fills = 0
+    for symbol, price in price_path(args.ticks, args.volatility):
+        out = []
+        for grid in by_symbol[symbol]:
+            grid.on_price(price, out)
+        fills += len(out)
+    elapsed = perf_counter() - start
+    print(f"every grid {elapsed / args.ticks * 1e6:>8.2f} us/tick  {args.grids / len(SYMBOLS):>7.2f} grids touched/tick fills={fills:,}")
+
+
+if __name__ == "__main__":
+    main()
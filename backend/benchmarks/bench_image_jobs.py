@@ -0,0 +1,84 @@
+"""Image job queue under repeated prompts.
+
+Run from the backend directory:
+
+    python benchmarks/bench_image_jobs.py --requests 20000 --prompts 500
+
+Requests arrive at ``--rate`` per second for Zipf-distributed prompts,
+half of them upscaled. Generation takes ``--generate`` seconds and
+upscaling ``--upscale``. Reports how long submitting takes (what a request
+worker waits), how many generations and upscales ran against the number
+of requests, and how long clients waited for their images.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.image_jobs import ImageJobQueue  # noqa: E402
+from services.metrics import LatencyHistogram  # noqa: E402
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(8)
+    prompts = (rng.zipf(1.3, args.requests) - 1) % args.prompts
+    upscales = rng.random(args.requests) < 0.5
+
+    async def generate(prompt: str) -> str:
+        await asyncio.sleep(args.generate)
+        return f"https://images.example.com/{abs(hash(prompt))}.png"
+
+    async def upscale(url: str) -> str:
+        await asyncio.sleep(args.upscale)
+        return f"{url}?upscaled=true"
+
+    queue = ImageJobQueue(generate, upscale, workers=args.workers, cache_size=args.cache_size)
+    submit, ready = LatencyHistogram(), LatencyHistogram()
+
+    async def client(job, started: float) -> None:
+        await queue.wait(job)
+        ready.record(perf_counter() - started)
+
+    clients = []
+    started_all = perf_counter()
+    for prompt, upscaled in zip(prompts.tolist(), upscales.tolist()):
+        started = perf_counter()
+        job = queue.submit(f"Prompt number {prompt}, in a watercolor style", upscaled)
+        submit.record(perf_counter() - started)
+        if not job.finished:
+            clients.append(asyncio.create_task(client(job, started)))
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*clients)
+    elapsed = perf_counter() - started_all
+    await queue.stop()
+
+    stats = queue.stats()
+    print(f"{args.requests:,} requests for {len(set(prompts.tolist())):,} distinct prompts in {elapsed:.1f}s")
+    print(f"generated {stats['generated']:,}, upscaled {stats['upscaled']:,} "
+          f"(synchronous: {args.requests:,} generations, {int(upscales.sum()):,} upscales)")
+    print(f"answered from the cache {stats['cache_hits']:,}, joined in-flight jobs {stats['deduplicated']:,}")
+    for name, histogram in (("submit", submit), ("image ready", ready)):
+        snapshot = histogram.snapshot()
+        print(f"{name:<12} p50={snapshot['p50_us'] / 1e3:>9.3f}ms p99={snapshot['p99_us'] / 1e3:>9.3f}ms")
+    assert stats["failed"] == 0 and stats["in_flight"] == 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--prompts", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=1000.0)
+    parser.add_argument("--generate", type=float, default=0.5)
+    parser.add_argument("--upscale", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--cache-size", type=int, default=1000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
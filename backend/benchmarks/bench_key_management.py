@@ -0,0 +1,73 @@
+"""Compare per-call PBKDF2 key derivation with the cached KeyManager cipher.
+
+Run from the backend directory:
+
+    python benchmarks/bench_key_management.py --requests 2000
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from cryptography.fernet import Fernet  # noqa: E402
+
+from config.settings import settings  # noqa: E402
+from services.key_management import derive_key  # noqa: E402
+from services.metrics import LatencyHistogram  # noqa: E402
+
+
+def bench_uncached(token: bytes, iterations: int) -> LatencyHistogram:
+    hist = LatencyHistogram()
+    password = settings.API_KEY_ENCRYPTION_PASSWORD.encode()
+    salt = settings.API_KEY_ENCRYPTION_SALT.encode()
+    for _ in range(iterations):
+        start = perf_counter()
+        Fernet(derive_key(password, salt, settings.API_KEY_KDF_ITERATIONS)).decrypt(token)
+        hist.record(perf_counter() - start)
+    return hist
+
+
+async def bench_validate_endpoint(requests: int, concurrency: int) -> LatencyHistogram:
+    from routes.trading_bot import mock_api_keys, validate_api_key
+
+    key_id = mock_api_keys[0]["id"]
+    hist = LatencyHistogram()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            result = await validate_api_key(key_id)
+            hist.record(result["crypto_latency_us"] / 1_000_000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return hist
+
+
+def report(name: str, hist: LatencyHistogram) -> None:
+    snap = hist.snapshot()
+    print(
+        f"{name:<28} n={snap['count']:<6} mean={snap['mean_us']:>10.1f}us "
+        f"p50={snap['p50_us']:>10.1f}us p99={snap['p99_us']:>10.1f}us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--uncached", type=int, default=20, help="samples for the per-call PBKDF2 path")
+    args = parser.parse_args()
+
+    from services.key_management import key_manager
+
+    token = key_manager.encrypt("benchmark_secret").encode()
+    report("uncached derive+decrypt", bench_uncached(token, args.uncached))
+    report("/validate crypto (cached)", asyncio.run(bench_validate_endpoint(args.requests, args.concurrency)))
+    report("key derivation (once)", key_manager.latency["derive"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Concurrent counter increments: batched link counters against locked records.
+
+Run from the backend directory:
+
+    python benchmarks/bench_link_counters.py --threads 8 --increments 200000
+
+Each thread adds clicks, conversions and revenue to random links while a
+merger writes the pending deltas to plain link records. Afterwards the
+stored values are checked against the number of increments made, and the
+pre-aggregated totals read is timed against summing every link. Batching
+does not beat locking the records on raw increments; what it buys is
+that increments never touch the records being read, and that the totals
+need no scan.
+"""
+import argparse
+import random
+import sys
+import threading
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.link_counters import LinkCounters  # noqa: E402
+
+
+def hammer(threads: int, increments: int, add) -> float:
+    def work(seed: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(increments):
+            add(rng.randrange(len(links)))
+
+    workers = [threading.Thread(target=work, args=(seed,)) for seed in range(threads)]
+    start = perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return perf_counter() - start
+
+
+def run(args: argparse.Namespace) -> None:
+    global links
+    total = args.threads * args.increments
+
+    links = [{"id": str(i), "clicks": 0, "conversions": 0, "revenue": 0.0} for i in range(args.links)]
+    by_id = {link["id"]: link for link in links}
+    ids = [link["id"] for link in links]
+    lock = threading.Lock()
+
+    def locked_add(i: int) -> None:
+        with lock:
+            link = by_id[ids[i]]
+            link["clicks"] += 1
+            link["conversions"] += 1
+            link["revenue"] += 0.5
+
+    elapsed = hammer(args.threads, args.increments, locked_add)
+    print(f"shared lock    {total / elapsed:>12,.0f} increments/s")
+
+    links = [{"id": str(i), "clicks": 0, "conversions": 0, "revenue": 0.0} for i in range(args.links)]
+    by_id = {link["id"]: link for link in links}
+
+    def apply(link_id, delta):
+        link = by_id[link_id]
+        link["clicks"] += delta[0]
+        link["conversions"] += delta[1]
+        link["revenue"] += delta[2]
+        return True
+
+    counters = LinkCounters(apply)
+    done = threading.Event()
+
+    def merger() -> None:
+        while not done.wait(args.interval):
+            counters.merge()
+
+    merging = threading.Thread(target=merger)
+    merging.start()
+    elapsed = hammer(args.threads, args.increments, lambda i: counters.add(ids[i], 1, 1, 0.5))
+    done.set()
+    merging.join()
+    counters.merge()
+    print(f"batched        {total / elapsed:>12,.0f} increments/s, {counters.merges} merges")
+
+    stored = sum(link["clicks"] for link in links)
+    assert stored == total == counters.totals()["clicks"], (stored, total)
+    print(f"no lost updates: {stored:,} clicks stored")
+
+    start = perf_counter()
+    for _ in range(100):
+        counters.totals()
+    print(f"totals()       {(perf_counter() - start) / 100 * 1e6:>12.2f} us")
+    start = perf_counter()
+    for _ in range(10):
+        sum(link["clicks"] for link in links), sum(link["revenue"] for link in links)
+    print(f"sum over links {(perf_counter() - start) / 10 * 1e6:>12.2f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--increments", type=int, default=100_000)
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--interval", type=float, default=0.05)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
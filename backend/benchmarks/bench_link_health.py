@@ -0,0 +1,82 @@
+"""Link health check throughput against the local stub merchant server.
+
+Run from the backend directory:
+
+    python benchmarks/bench_link_health.py --links 100000 --hosts 500 --latency 0.05
+
+Product URLs are spread over ``--hosts`` loopback addresses (127.0.x.y)
+of one stub server. That way per-host politeness applies as it would
+across merchant sites. Most URLs answer 200, and some are:
+- dead (404);
+- redirected;
+- refusing HEAD;
+- flaky (503 every other request).
+
+The benchmark runs a cold check, then a repeat check, which is answered
+from the cache except for failed URLs whose backoff has expired, then
+forced checks until the dead URLs cross the failure threshold. For each it prints URLs per second and the most requests any
+host saw in flight at once, which must not exceed ``--host-concurrency``.
+"""
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.link_health import LinkHealthChecker  # noqa: E402
+from stubs import LinkStubServer  # noqa: E402
+
+KINDS = (("ok", 0.90), ("dead", 0.05), ("moved", 0.03), ("nohead", 0.01), ("flaky", 0.01))
+
+
+async def run(args: argparse.Namespace) -> None:
+    server = LinkStubServer(args.latency)
+    port = await server.start("0.0.0.0")
+    rng = random.Random(3)
+    kinds = rng.choices([kind for kind, _ in KINDS], [weight for _, weight in KINDS], k=args.links)
+    urls = [
+        f"http://127.0.{1 + i % args.hosts // 250}.{1 + i % args.hosts % 250}:{port}/{kind}/{i}"
+        for i, kind in enumerate(kinds)
+    ]
+    dead = []
+    checker = LinkHealthChecker(
+        concurrency=args.concurrency,
+        host_rate=args.host_rate,
+        host_concurrency=args.host_concurrency,
+        retry_delay=0.05,
+        failure_threshold=args.failures,
+        on_dead=dead.append,
+    )
+    for name, force in [("cold", False), ("repeat", False)] + [(f"forced {i + 2}", True) for i in range(args.failures - 1)]:
+        result = await checker.check(urls, force=force)
+        print(
+            f"{name:<9} {result['urls']:>7,} urls, {result['probed']:>7,} probed in {result['seconds']:6.2f}s "
+            f"({result['urls_per_second']:7,.0f}/s), {result['requests']:,} requests, {result['retries']:,} retries, "
+            f"{result['healthy']:,} healthy, {result['failed']:,} failed"
+        )
+    await checker.stop()
+    await server.close()
+
+    busiest = max(server.max_in_flight.values())
+    print(f"most requests in flight at one host: {busiest} (limit {args.host_concurrency})")
+    print(f"{len(dead):,} URLs reported dead, {kinds.count('dead'):,} were")
+    assert busiest <= args.host_concurrency
+    assert len(dead) == kinds.count("dead")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--hosts", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--host-rate", type=float, default=5.0)
+    parser.add_argument("--host-concurrency", type=int, default=4)
+    parser.add_argument("--failures", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Throughput and latency of the market-data feed against the local replay server.
+
+Run from the backend directory:
+
+    python benchmarks/bench_market_data.py --symbols 50 --candles 20000
+
+The replay server streams synthetic 1-minute klines over localhost in the
+exchange's combined-stream format; ``--rate`` caps messages per second.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.backtesting import Candles  # noqa: E402
+from services.market_data import MarketDataFeed, stream_names, tcp_connector  # noqa: E402
+from stubs import ReplayServer  # noqa: E402
+
+
+def synthetic_candles(rng: np.random.Generator, count: int) -> Candles:
+    timestamp = 1_600_000_000_000 + np.arange(count, dtype=np.int64) * 60_000
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.0008, count)))
+    return Candles(timestamp, close, close * 1.001, close * 0.999, close, rng.uniform(1, 10, count))
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(42)
+    candles = {f"SYM{i}/USDT": synthetic_candles(rng, args.candles) for i in range(args.symbols)}
+    server = ReplayServer(candles, rate=args.rate)
+    port = await server.start()
+    feed = MarketDataFeed(
+        tcp_connector("127.0.0.1", port),
+        stream_names(candles, ["1m"], tickers=False),
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+    )
+    total = args.symbols * args.candles
+
+    start = perf_counter()
+    feed.start()
+    while feed.messages < total:
+        await asyncio.sleep(0.05)
+    elapsed = perf_counter() - start
+    await feed.stop()
+    await server.close()
+
+    stats = feed.stats()
+    print(f"{total:,} messages in {elapsed:.2f}s = {total / elapsed:,.0f} msgs/s, {stats['batches']:,} batches")
+    for name, latency in stats["latency"].items():
+        print(
+            f"{name:<10} p50={latency['p50_us']:>10.0f}us p90={latency['p90_us']:>10.0f}us "
+            f"p99={latency['p99_us']:>10.0f}us max={latency['max_us']:>10.0f}us"
+        )
+    last = feed.candles("SYM0/USDT", "1m", 1)
+    assert last is not None and last.timestamp[-1] == candles["SYM0/USDT"].timestamp[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--candles", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=0.0)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
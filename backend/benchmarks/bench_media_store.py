@@ -0,0 +1,136 @@
+"""Media store downloads and renditions under repeated publishing.
+
+Run from the backend directory:
+
+    python benchmarks/bench_media_store.py --posts 500 --images 20
+
+``--posts`` posts each use one of ``--images`` generated images, served by
+a local stub, and go out to ``--targets`` platforms with ``--attempts``
+publishing attempts each (retries included). Every attempt asks the store
+for the image sized for each platform, as publishing does. Reports how
+many downloads and renders ran against the number of requests, how long
+an attempt waited for its images, on first attempts that all start at
+once and on retries, and what rendering on every attempt would have cost,
+measured on a sample.
+"""
+import argparse
+import asyncio
+import io
+import random
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.media_store import PLATFORM_RENDITIONS, MediaStore, parse_spec, render  # noqa: E402
+from services.metrics import LatencyHistogram  # noqa: E402
+
+
+def make_png(seed: int, width: int, height: int) -> bytes:
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, width)[None, :, None]
+    y = np.linspace(0, 1, height)[:, None, None]
+    colors = rng.random((2, 3))
+    pixels = (x * colors[0] + y * colors[1]) * 127 + rng.integers(0, 32, (height, width, 3))
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def serve_images(images: dict) -> asyncio.AbstractServer:
+    """Serve ``GET /<name>`` from ``images`` over HTTP/1.1 keep-alive."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                body = images[request_line.decode("latin-1").split()[1].strip("/")]
+                writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: image/png\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+        except (ConnectionError, KeyError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(6)
+    images = {f"image-{i}.png": make_png(i, args.width, args.height) for i in range(args.images)}
+    server = await serve_images(images)
+    base = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    root = tempfile.mkdtemp(prefix="media-bench-")
+    store = MediaStore(root)
+    platforms = list(PLATFORM_RENDITIONS)
+    first, retry = LatencyHistogram(), LatencyHistogram()
+
+    async def publish(url: str, targets: list) -> None:
+        for n in range(args.attempts):
+            started = perf_counter()
+            digest = await store.fetch(url)
+            await asyncio.gather(*(store.rendition(digest, PLATFORM_RENDITIONS[platform]) for platform in targets))
+            (retry if n else first).record(perf_counter() - started)
+
+    posts = [(f"{base}/{rng.choice(list(images))}", rng.sample(platforms, args.targets)) for _ in range(args.posts)]
+    started = perf_counter()
+    await asyncio.gather(*(publish(url, targets) for url, targets in posts))
+    elapsed = perf_counter() - started
+    stats = store.stats()
+
+    sample = posts[:args.sample]
+    naive = perf_counter()
+    scratch = Path(root) / "naive"
+    scratch.mkdir()
+    for i, (url, targets) in enumerate(sample):
+        data = images[url.rsplit("/", 1)[1]]
+        source = scratch / f"{i}.png"
+        source.write_bytes(data)
+        for platform in targets:
+            width, height = parse_spec(PLATFORM_RENDITIONS[platform])
+            await asyncio.to_thread(render, str(source), str(scratch / f"{i}-{platform}.jpg"), width, height)
+    per_attempt = (perf_counter() - naive) / len(sample)
+
+    await store.close()
+    server.close()
+    await server.wait_closed()
+    shutil.rmtree(root)
+
+    attempts = args.posts * args.attempts
+    requests = attempts * args.targets
+    print(f"{attempts:,} publishing attempts asking for {requests:,} platform images in {elapsed:.1f}s")
+    print(f"downloaded {stats['downloaded']:,} (fetch hits {stats['download_hits']:,}), "
+          f"rendered {stats['rendered']:,} (rendition hits {stats['rendition_hits']:,})")
+    for name, histogram in (("first attempt", first), ("retries", retry)):
+        snapshot = histogram.snapshot()
+        print(f"{name:<13} images ready p50={snapshot['p50_us'] / 1e3:>9.3f}ms p99={snapshot['p99_us'] / 1e3:>9.3f}ms")
+    print(f"rendering on every attempt: {per_attempt * 1e3:.0f}ms per attempt, "
+          f"{per_attempt * attempts:.0f}s for all {attempts:,} (without downloads)")
+    assert stats["downloaded"] == len({url for url, _ in posts})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--targets", type=int, default=3)
+    parser.add_argument("--attempts", type=int, default=2)
+    parser.add_argument("--width", type=int, default=1536)
+    parser.add_argument("--height", type=int, default=1024)
+    parser.add_argument("--sample", type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
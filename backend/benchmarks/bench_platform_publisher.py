@@ -0,0 +1,116 @@
+"""Multi-platform publishing throughput with one slow platform.
+
+Run from the backend directory:
+
+    python benchmarks/bench_platform_publisher.py --posts 2000 --slow-latency 0.5
+
+Every post is due at once and targets ``--targets`` random platforms out
+of ``--platforms``. The posts go through the scheduled post dispatcher to
+a local stub API where one platform answers in ``--slow-latency`` seconds
+and the rest in ``--latency``; ``--error-rate`` of requests fail with 503
+and are retried. Reports posts per minute, each platform's publish time
+including rate limit waits, and when the posts that skip the slow
+platform were done.
+"""
+import argparse
+import asyncio
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter, time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.platform_publisher import PlatformPublisher  # noqa: E402
+from services.post_dispatcher import PostDispatcher  # noqa: E402
+from stubs import PlatformStubServer  # noqa: E402
+
+PLATFORMS = ["instagram", "facebook", "twitter", "pinterest", "youtube", "linkedin", "tiktok", "threads"]
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(4)
+    platforms = PLATFORMS[:args.platforms]
+    slow = platforms[-1]
+    stub = PlatformStubServer(
+        latency={slow: args.slow_latency},
+        default_latency=args.latency,
+        limits={platform: args.rate + args.concurrency for platform in platforms},
+        error_rate=args.error_rate,
+        seed=5,
+    )
+    port = await stub.start()
+    publisher = PlatformPublisher(
+        f"http://127.0.0.1:{port}/{{platform}}/posts",
+        rate=args.rate,
+        concurrency=args.concurrency,
+        retry_delay=0.1,
+    )
+    finished_at = {}
+    started = perf_counter()
+
+    async def publish(post: dict) -> None:
+        results = await publisher.publish(post, {platform: "token" for platform in post["platforms"]})
+        finished_at[post["id"]] = perf_counter() - started
+        failed = [platform for platform, result in results.items() if result["status"] != "posted"]
+        if failed:
+            raise RuntimeError(f"failed on {', '.join(failed)}")
+
+    dispatcher = PostDispatcher(publish, concurrency=args.dispatch_concurrency)
+    now = datetime.utcfromtimestamp(time())
+    posts = [
+        {
+            "id": f"post-{i}",
+            "scheduled_time": now,
+            "post_status": "planned",
+            "content_text": f"Post number {i}",
+            "platforms": rng.sample(platforms, args.targets),
+        }
+        for i in range(args.posts)
+    ]
+    for post in posts:
+        dispatcher.schedule(post)
+    dispatcher.start()
+    while len(dispatcher) or dispatcher.stats()["publishing"]:
+        await asyncio.sleep(0.05)
+    elapsed = perf_counter() - started
+    await dispatcher.stop()
+    await publisher.close()
+    await stub.close()
+
+    sent = sum(len(post["platforms"]) for post in posts)
+    print(f"{args.posts:,} posts to {sent:,} platform targets in {elapsed:.1f}s: {args.posts / elapsed * 60:,.0f} posts/min")
+    stats = publisher.stats()
+    for platform in platforms:
+        platform_stats = stats[platform]
+        latency = platform_stats["latency"]
+        print(
+            f"{platform:<10} posted={platform_stats['posted']:>5} failed={platform_stats['failed']:>3} "
+            f"retries={platform_stats['retries']:>3} p50={latency['p50_us'] / 1e6:6.2f}s "
+            f"p99={latency['p99_us'] / 1e6:6.2f}s"
+        )
+    fast = [finished_at[post["id"]] for post in posts if slow not in post["platforms"]]
+    print(f"posts skipping {slow}: {len(fast):,}, all done at {max(fast):.1f}s")
+    print(f"stub 429s: {sum(stub.throttled.values())}, duplicate posts: {sum(stub.duplicates.values())}")
+    transitions = dispatcher.stats()["transitions"]
+    print(f"posted {transitions['posted']:,}, errors {transitions['error']:,}")
+    assert all(count <= args.concurrency for count in stub.max_in_flight.values())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--platforms", type=int, default=6)
+    parser.add_argument("--targets", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=0.5)
+    parser.add_argument("--rate", type=float, default=100.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--dispatch-concurrency", type=int, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Incremental EPC ranking under click and conversion traffic.
+
+Run from the backend directory:
+
+    python benchmarks/bench_product_ranking.py --products 200000 --events 1000000
+
+Clicks land on products with a Zipf skew and convert at a per-product
+rate. The top 10 per category is read after every 1000 events and, at the
+end, checked against a full sort by EPC.
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.metrics import LatencyHistogram  # noqa: E402
+from services.product_ranking import ProductRanking  # noqa: E402
+
+
+def run(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(9)
+    categories = [f"category-{i}" for i in range(args.categories)]
+    ranking = ProductRanking(prior_rate=0.03, prior_weight=50)
+    start = perf_counter()
+    for i in range(args.products):
+        ranking.put({
+            "id": f"p{i}",
+            "category": categories[i % args.categories],
+            "price": float(rng.uniform(5, 500)),
+            "commission_rate": float(rng.uniform(0.01, 0.5)),
+        })
+    print(f"ranked {args.products:,} products in {perf_counter() - start:.2f}s")
+
+    targets = (rng.zipf(1.2, args.events) - 1) % args.products
+    rates = rng.beta(1, 30, args.products)
+    converted = rng.random(args.events) < rates[targets]
+    update = LatencyHistogram()
+    read = LatencyHistogram()
+    picker = random.Random(1)
+    for i, (target, conversion) in enumerate(zip(targets.tolist(), converted.tolist())):
+        started = perf_counter()
+        ranking.record(f"p{target}", clicks=1, conversions=int(conversion))
+        update.record(perf_counter() - started)
+        if i % 1000 == 0:
+            started = perf_counter()
+            ranking.top(picker.choice(categories), 10)
+            read.record(perf_counter() - started)
+    for name, histogram in (("record", update), ("top 10", read)):
+        stats = histogram.snapshot()
+        print(f"{name:<7} p50={stats['p50_us']:>7.1f}us p99={stats['p99_us']:>7.1f}us")
+
+    for category in categories[:3]:
+        expected = sorted(
+            (ranking.explain(f"p{i}") for i in range(categories.index(category), args.products, args.categories)),
+            key=lambda ranked: (-ranked["expected_epc"], ranked["product_id"]),
+        )[:10]
+        assert ranking.top(category, 10) == expected
+    print("top 10 matches a full sort")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
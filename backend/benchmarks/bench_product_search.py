@@ -0,0 +1,95 @@
+"""Product search latency at catalog scale, and the cost of incremental updates.
+
+Run from the backend directory:
+
+    python benchmarks/bench_product_search.py --products 500000
+
+Products get names, descriptions and tags drawn from a Zipf-distributed
+vocabulary, so common words match a large share of the catalog as they
+do in real catalogs. Query latency is reported per query shape.
+"""
+import argparse
+import random
+import sys
+from itertools import accumulate
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.metrics import LatencyHistogram  # noqa: E402
+from services.product_search import ProductIndex  # noqa: E402
+
+CATEGORIES = ["Electronics", "Books", "Home & Garden", "Health & Fitness", "Toys", "Beauty", "Sports", "Automotive"]
+
+
+def run(args: argparse.Namespace) -> None:
+    rng = random.Random(11)
+    vocabulary = [f"w{i}" for i in range(args.vocabulary)]
+    cumulative = list(accumulate(1.0 / (rank + 1) for rank in range(args.vocabulary)))
+    networks = [f"network-{i}" for i in range(5)]
+
+    def product(i: int):
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=14)
+        return {
+            "id": f"p{i}",
+            "name": " ".join(words[:4]),
+            "description": " ".join(words[4:12]),
+            "tags": words[12:],
+            "category": rng.choice(CATEGORIES),
+            "network_id": rng.choice(networks),
+            "price": round(rng.uniform(5, 500), 2),
+            "commission_rate": round(rng.uniform(0.01, 0.5), 3),
+        }
+
+    index = ProductIndex()
+    start = perf_counter()
+    for i in range(args.products):
+        index.put(product(i))
+    print(f"indexed {args.products:,} products in {perf_counter() - start:.1f}s")
+
+    shapes = {
+        "common term": lambda: {"query": vocabulary[rng.randrange(5)]},
+        "two terms": lambda: {"query": f"{vocabulary[rng.randrange(50)]} {vocabulary[rng.randrange(200)]}"},
+        "rare term": lambda: {"query": vocabulary[rng.randrange(1000, args.vocabulary)]},
+        "prefix": lambda: {"query": f"w{rng.randrange(10, 99)}"},
+        "term+filters": lambda: {
+            "query": vocabulary[rng.randrange(20)],
+            "category": rng.choice(CATEGORIES),
+            "min_price": 20.0,
+            "max_price": 200.0,
+        },
+        "filters only": lambda: {"min_commission": 0.2, "sort": "commission_desc"},
+        "deep page": lambda: {"query": vocabulary[rng.randrange(3)], "offset": 1000},
+    }
+    for name, shape in shapes.items():
+        histogram = LatencyHistogram()
+        for _ in range(args.queries):
+            kwargs = shape()
+            started = perf_counter()
+            index.search(**kwargs)
+            histogram.record(perf_counter() - started)
+        stats = histogram.snapshot()
+        print(f"{name:<13} p50={stats['p50_us'] / 1000:>7.2f}ms p99={stats['p99_us'] / 1000:>7.2f}ms")
+
+    histogram = LatencyHistogram()
+    for _ in range(args.queries):
+        updated = product(rng.randrange(args.products))
+        started = perf_counter()
+        index.put(updated)
+        index.search(vocabulary[0])
+        histogram.record(perf_counter() - started)
+    stats = histogram.snapshot()
+    print(f"update+query  p50={stats['p50_us'] / 1000:>7.2f}ms p99={stats['p99_us'] / 1000:>7.2f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
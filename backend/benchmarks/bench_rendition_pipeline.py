@@ -0,0 +1,123 @@
+"""Platform rendition throughput of the media store's process pool.
+
+Run from the backend directory:
+
+    python benchmarks/bench_rendition_pipeline.py --images 48 --workers 1,2,4,8
+
+Stores ``--images`` generated ``--size`` JPEGs and renders every platform
+size of each, the way publishing a post to all its platforms does. The
+pool renders each image's sizes in one task per image; it is compared
+with rendering every size in its own thread on the event loop's default
+executor. Reports source images and renditions per second, and how late
+a 10 ms timer on the event loop fired while rendering ran.
+"""
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.media_store import PLATFORM_RENDITIONS, MediaStore, parse_spec, render  # noqa: E402
+from services.metrics import LatencyHistogram  # noqa: E402
+
+
+def make_jpeg(seed: int, size: int) -> bytes:
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, size)[None, :, None]
+    y = np.linspace(0, 1, size)[:, None, None]
+    colors = rng.random((2, 3))
+    pixels = (x * colors[0] + y * colors[1]) * 127 + rng.integers(0, 64, (size, size, 3))
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def measure(render_all) -> tuple:
+    """Seconds ``render_all`` took and how late a 10 ms timer on the loop fired meanwhile."""
+    lag = LatencyHistogram()
+    done = False
+
+    async def tick() -> None:
+        while not done:
+            started = perf_counter()
+            await asyncio.sleep(0.01)
+            lag.record(perf_counter() - started - 0.01)
+
+    ticker = asyncio.create_task(tick())
+    started = perf_counter()
+    await render_all()
+    elapsed = perf_counter() - started
+    done = True
+    await ticker
+    return elapsed, lag.snapshot()
+
+
+def report(name: str, count: int, elapsed: float, lag: dict) -> None:
+    specs = len(set(PLATFORM_RENDITIONS.values()))
+    print(
+        f"{name:<20} {count / elapsed:>7.2f} images/s {count * specs / elapsed:>8.1f} renditions/s "
+        f"loop lag p50={lag['p50_us'] / 1e3:>6.2f}ms p99={lag['p99_us'] / 1e3:>7.2f}ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    images = [make_jpeg(i, args.size) for i in range(args.images + 1)]
+    specs = sorted(set(PLATFORM_RENDITIONS.values()))
+    print(f"{args.images} images of {args.size}x{args.size}, {len(specs)} sizes each, {os.cpu_count()} CPUs")
+
+    root = tempfile.mkdtemp(prefix="rendition-bench-")
+    try:
+        store = MediaStore(str(Path(root) / "threads"))
+        digests = [store.put(data) for data in images[1:]]
+
+        async def in_threads() -> None:
+            await asyncio.gather(*(
+                asyncio.to_thread(render, str(store.path(digest)), str(store.rendition_path(digest, spec)), *parse_spec(spec))
+                for digest in digests
+                for spec in specs
+            ))
+
+        elapsed, lag = await measure(in_threads)
+        report("threads, per size", args.images, elapsed, lag)
+
+        for workers in (int(value) for value in args.workers.split(",")):
+            store = MediaStore(str(Path(root) / f"pool-{workers}"), workers=workers)
+            warmup, *digests = [store.put(data) for data in images]
+            await store.renditions(warmup, specs)
+
+            async def in_pool() -> None:
+                await asyncio.gather(*(store.renditions(digest, specs) for digest in digests))
+
+            elapsed, lag = await measure(in_pool)
+            report(f"pool, {workers} workers", args.images, elapsed, lag)
+            cached = perf_counter()
+            await asyncio.gather(*(store.renditions(digest, specs) for digest in digests))
+            cached = perf_counter() - cached
+            stats = store.stats()
+            await store.close()
+            assert stats["rendered"] == len(images) * len(specs) and stats["batches"] == len(images)
+        print(f"{'cached (hash, spec)':<20} {args.images / cached:>7.0f} images/s")
+    finally:
+        shutil.rmtree(root)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=48)
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, 4, os.cpu_count() or 1})))
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compare InMemoryRepository lookups with the list-scan path it replaced.
+
+Run from the backend directory:
+
+    python benchmarks/bench_repository.py --rows 1000000
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.repository import InMemoryRepository  # noqa: E402
+
+STATUSES = ["open", "closed", "failed"]
+
+
+def make_trades(rows: int, strategies: int):
+    strategy_ids = [str(uuid4()) for _ in range(strategies)]
+    return [
+        {
+            "id": str(uuid4()),
+            "strategy_id": random.choice(strategy_ids),
+            "symbol": "BTC/USDT",
+            "status": random.choice(STATUSES),
+            "price": random.uniform(1, 100),
+        }
+        for _ in range(rows)
+    ], strategy_ids
+
+
+def timed(fn, repeat: int) -> float:
+    start = perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (perf_counter() - start) / repeat * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--strategies", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(7)
+    trades, strategy_ids = make_trades(args.rows, args.strategies)
+    start = perf_counter()
+    repo = InMemoryRepository(indexes=("strategy_id", "status"), records=trades)
+    print(f"rows={args.rows} build={perf_counter() - start:.2f}s")
+
+    ids = [random.choice(trades)["id"] for _ in range(args.lookups)]
+    strategy_id = strategy_ids[0]
+
+    def scan_get():
+        for trade_id in ids:
+            for trade in trades:
+                if trade["id"] == trade_id:
+                    break
+
+    def repo_get():
+        for trade_id in ids:
+            repo.get(trade_id)
+
+    def scan_filter():
+        [t for t in trades if t["strategy_id"] == strategy_id and t["status"] == "open"]
+
+    def repo_filter():
+        repo.find(strategy_id=strategy_id, status="open")
+
+    def scan_delete_insert():
+        trade = trades.pop(len(trades) // 2)
+        trades.insert(len(trades) // 2, trade)
+
+    def repo_delete_insert():
+        trade = repo.delete(ids[0])
+        repo.add(trade)
+
+    rows = [
+        ("get by id", timed(scan_get, 1) / len(ids), timed(repo_get, 100) / len(ids)),
+        ("filter strategy+status", timed(scan_filter, 3), timed(repo_filter, 100)),
+        ("delete + reinsert", timed(scan_delete_insert, 20), timed(repo_delete_insert, 1000)),
+    ]
+    print(f"{'operation':<26}{'scan (us)':>14}{'repository (us)':>18}{'speedup':>10}")
+    for name, scan_us, repo_us in rows:
+        print(f"{name:<26}{scan_us:>14.1f}{repo_us:>18.1f}{scan_us / repo_us:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
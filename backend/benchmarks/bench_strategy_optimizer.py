@@ -0,0 +1,71 @@
+"""Scaling of the strategy parameter sweep with the number of worker processes.
+
+Run from the backend directory:
+
+    python benchmarks/bench_strategy_optimizer.py --workers 1 4 16 32
+
+Candles are written once as a ``.npy`` file and memory-mapped by every
+worker, so only candidate configs travel through the pool.
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services import strategy_optimizer  # noqa: E402
+
+MINUTES_PER_YEAR = 525_600
+
+BASE_CONFIG = {"grid_levels": 10, "grid_spacing": 1.5, "take_profit": 50.0, "stop_loss": 20.0}
+PARAMETERS = {
+    "grid_spacing": {"min": 0.25, "max": 5.0, "step": 0.25},
+    "take_profit": {"min": 5.0, "max": 100.0, "step": 5.0},
+}
+
+
+def write_candles(path: Path, minutes: int) -> None:
+    rng = np.random.default_rng(42)
+    timestamp = 1_600_000_000_000 + np.arange(minutes, dtype=np.int64) * 60_000
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.0008, minutes)))
+    spread = close * rng.uniform(0.0, 0.001, minutes)
+    np.save(path, np.column_stack((timestamp, close, close + spread, close - spread, close, rng.uniform(1, 10, minutes))))
+
+
+async def sweep(paths, workers: int) -> float:
+    candidates, total = strategy_optimizer.build_candidates(PARAMETERS)
+    start = perf_counter()
+    async for update in strategy_optimizer.optimize(
+        paths, "Smart Grid", BASE_CONFIG, candidates, total, workers=workers
+    ):
+        if update["done"]:
+            best = update["best"][0]
+    elapsed = perf_counter() - start
+    print(f"{workers:>4} workers {elapsed:>8.2f}s {total / elapsed:>8.1f} configs/s best={best['params']}")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "SYMUSDT_1m.npy"
+        write_candles(path, int(args.years * MINUTES_PER_YEAR))
+        paths = {"SYM/USDT": str(path)}
+        for workers in args.workers:
+            # A fresh pool per run so the worker count actually changes.
+            strategy_optimizer.shutdown_pool()
+            asyncio.run(sweep(paths, workers))
+        strategy_optimizer.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
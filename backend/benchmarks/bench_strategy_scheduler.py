@@ -0,0 +1,117 @@
+"""Tick-to-decision latency of the live strategy scheduler.
+
+Run from the backend directory:
+
+    python benchmarks/bench_strategy_scheduler.py --strategies 300 --symbols 20
+
+DCA and Trend strategies are spread over the symbols and evaluated on each
+closed 1-minute kline streamed by the local replay server. Decisions are
+recorded in an in-memory TradeStore.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from uuid import uuid4
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.backtesting import Candles  # noqa: E402
+from services.market_data import MarketDataFeed, stream_names, tcp_connector  # noqa: E402
+from stubs import ReplayServer  # noqa: E402
+from services.strategy_scheduler import StrategyScheduler, close_profit_loss  # noqa: E402
+from services.trade_store import TradeStore  # noqa: E402
+
+CONFIGS = {
+    "DCA": {"initial_buy": 100, "dca_amount": 50, "dca_interval": 1, "take_profit": 1.0, "max_buys": 10},
+    "Trend": {"ema_short": 9, "ema_long": 21, "rsi_period": 14, "rsi_overbought": 70, "take_profit": 1.0, "stop_loss": 1.0},
+}
+
+
+def synthetic_candles(rng: np.random.Generator, count: int) -> Candles:
+    timestamp = 1_600_000_000_000 + np.arange(count, dtype=np.int64) * 60_000
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.002, count)))
+    return Candles(timestamp, close, close * 1.001, close * 0.999, close, rng.uniform(1, 10, count))
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(42)
+    symbols = [f"SYM{i}/USDT" for i in range(args.symbols)]
+    server = ReplayServer({symbol: synthetic_candles(rng, args.candles) for symbol in symbols}, rate=args.rate)
+    port = await server.start()
+    feed = MarketDataFeed(tcp_connector("127.0.0.1", port), stream_names(symbols, ["1m"], tickers=False))
+    store = TradeStore()
+
+    async def submit(strategy, decision):
+        now = datetime.utcnow()
+        if decision.action == "open":
+            return store.add({
+                "id": str(uuid4()), "strategy_id": strategy["id"], "symbol": decision.symbol, "side": "buy",
+                "quantity": decision.quantity, "price": decision.price, "status": "open",
+                "created_at": now, "updated_at": now,
+            })
+        trade = store.get(decision.trade_id)
+        return store.update(decision.trade_id, {
+            "status": "closed", "profit_loss": close_profit_loss(trade, decision.price),
+            "close_price": decision.price, "close_time": now, "updated_at": now,
+        })
+
+    scheduler = StrategyScheduler(
+        lambda symbol, interval, limit: feed.candles(symbol, interval, limit),
+        lambda strategy_id, symbol: [],
+        submit,
+        window=args.window,
+    )
+    types = list(CONFIGS)
+    for i in range(args.strategies):
+        strategy_type = types[i % len(types)]
+        scheduler.register({
+            "id": str(uuid4()),
+            "name": f"{strategy_type} {i}",
+            "strategy_type": strategy_type,
+            "config": {**CONFIGS[strategy_type], "symbols": [symbols[i % len(symbols)]], "timeframes": ["1m"]},
+        })
+    feed.add_listener(scheduler.on_candle)
+
+    start = perf_counter()
+    scheduler.start()
+    feed.start()
+    total = args.symbols * args.candles
+    while feed.messages < total:
+        await asyncio.sleep(0.05)
+    while scheduler.stats()["pending"] or scheduler.stats()["evaluating"]:
+        await asyncio.sleep(0.01)
+    elapsed = perf_counter() - start
+    await feed.stop()
+    await scheduler.stop()
+    await server.close()
+
+    stats = scheduler.stats()
+    print(
+        f"{stats['ticks']:,} ticks ({stats['coalesced']:,} coalesced), {stats['evaluations']:,} evaluations, "
+        f"{stats['decisions']:,} orders, {len(store):,} trades in {elapsed:.2f}s"
+    )
+    for name, latency in stats["latency"].items():
+        if latency["count"]:
+            print(
+                f"{name:<17} p50={latency['p50_us']:>9.0f}us p90={latency['p90_us']:>9.0f}us "
+                f"p99={latency['p99_us']:>9.0f}us max={latency['max_us']:>9.0f}us"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strategies", type=int, default=300)
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--candles", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=2000.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
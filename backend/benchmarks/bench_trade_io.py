@@ -0,0 +1,97 @@
+"""Bulk trade import and streaming export throughput, with peak memory.
+
+Run from the backend directory:
+
+    python benchmarks/bench_trade_io.py --trades 5000000 --data-dir /tmp/trades
+
+Trades are imported from a generated NDJSON stream, then exported as
+NDJSON and CSV to a sink that discards the text. Peak RSS is printed
+after each phase; the export phases should not raise it.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.trade_io import export_lines, import_rows, iter_lines, parse_rows  # noqa: E402
+from services.trade_store import TradeStore  # noqa: E402
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def ndjson_body(trades: int, strategy_id: str, chunk_lines: int = 1000):
+    created = datetime(2024, 1, 1)
+    lines = []
+    for i in range(trades):
+        lines.append(json.dumps({
+            "id": str(uuid4()),
+            "strategy_id": strategy_id,
+            "symbol": "BTC/USDT" if i % 2 else "ETH/USDT",
+            "side": "buy",
+            "quantity": 0.01 * (i % 100 + 1),
+            "price": 20000 + i % 5000,
+            "status": "closed" if i % 3 else "open",
+            "profit_loss": (i % 200) - 100 if i % 3 else None,
+            "created_at": (created + timedelta(seconds=i)).isoformat(),
+        }))
+        if len(lines) == chunk_lines:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield "\n".join(lines).encode()
+
+
+def validate(row):
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    row["updated_at"] = row["created_at"]
+    return row
+
+
+async def run(args: argparse.Namespace) -> None:
+    store = TradeStore(args.data_dir)
+    strategy_id = str(uuid4())
+
+    start = perf_counter()
+    result = await import_rows(parse_rows(iter_lines(ndjson_body(args.trades, strategy_id)), "ndjson"), store, validate)
+    elapsed = perf_counter() - start
+    print(f"import ndjson {result['imported'] / elapsed:>10,.0f} trades/s  peak RSS {peak_rss_mb():>8.1f} MB")
+
+    for fmt in ("ndjson", "csv"):
+        start = perf_counter()
+        size = 0
+        for text in export_lines(store, fmt):
+            size += len(text)
+        elapsed = perf_counter() - start
+        print(
+            f"export {fmt:<6} {len(store) / elapsed:>10,.0f} trades/s  peak RSS {peak_rss_mb():>8.1f} MB  "
+            f"{size / 1e6:,.0f} MB written"
+        )
+
+    cursor, pages = 0, 0
+    start = perf_counter()
+    while cursor is not None and pages < 20:
+        stop = store.page_end(cursor, 1000, status="open")
+        for _ in export_lines(store, "ndjson", cursor, stop, status="open"):
+            pass
+        cursor, pages = stop, pages + 1
+    print(f"cursor pages  {(perf_counter() - start) / pages * 1000:>10.2f} ms/page of 1000 open trades")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--data-dir", type=Path, default=None)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Append, filter and statistics throughput of the columnar TradeStore.
+
+Run from the backend directory:
+
+    python benchmarks/bench_trade_store.py --trades 1000000 --data-dir /tmp/trades
+
+Without ``--data-dir`` the columns are kept in memory. Peak RSS is printed
+at the end; with a data directory most of the columns live in the page
+cache instead.
+"""
+import argparse
+import random
+import resource
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.trade_store import TradeStore  # noqa: E402
+
+SYMBOLS = ["BTC/USDT", "ETH/USDT", "SOL/USDT", "BNB/USDT", "XRP/USDT"]
+
+
+def make_trade(strategy_ids, now: datetime):
+    created = now - timedelta(minutes=random.uniform(0, 60 * 24 * 90))
+    closed = random.random() < 0.7
+    return {
+        "id": str(uuid4()),
+        "strategy_id": random.choice(strategy_ids),
+        "symbol": random.choice(SYMBOLS),
+        "side": random.choice(("buy", "sell")),
+        "quantity": random.uniform(0.01, 5),
+        "price": random.uniform(1, 50000),
+        "status": "closed" if closed else "open",
+        "profit_loss": random.uniform(-100, 100) if closed else None,
+        "close_price": random.uniform(1, 50000) if closed else None,
+        "close_time": created + timedelta(minutes=random.uniform(1, 600)) if closed else None,
+        "created_at": created,
+        "updated_at": created,
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    start = perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--strategies", type=int, default=50)
+    parser.add_argument("--data-dir", type=Path, default=None)
+    args = parser.parse_args()
+
+    random.seed(42)
+    now = datetime.utcnow()
+    strategy_ids = [str(uuid4()) for _ in range(args.strategies)]
+    store = TradeStore(args.data_dir)
+    ids = []
+
+    start = perf_counter()
+    for _ in range(args.trades):
+        ids.append(store.add(make_trade(strategy_ids, now))["id"])
+    elapsed = perf_counter() - start
+    print(f"append        {args.trades / elapsed:>12,.0f} trades/s ({len(store):,} trades)")
+
+    sample = random.sample(ids, min(1000, len(ids)))
+    print(f"get by id     {timed(lambda: [store.get(i) for i in sample], 1) / len(sample) * 1000:>12.1f} us")
+    print(f"count status  {timed(lambda: store.count(status='closed'), 10):>12.2f} ms")
+    print(f"find filtered {timed(lambda: store.find(strategy_id=strategy_ids[0], symbol=SYMBOLS[0], limit=100), 10):>12.2f} ms")
+    for period in ("daily", "monthly", "all-time"):
+        # The first query summarizes the hours' equity curves; later ones reuse them.
+        first = timed(lambda: store.statistics(period, now), 1)
+        store.update(sample[0], {"updated_at": now})  # drop the all-time cache
+        after = timed(lambda: store.statistics(period, now), 10)
+        print(f"stats {period:<8}{first:>12.2f} ms first, {after:.2f} ms after a write")
+
+    store.flush()
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS      {peak_mb:>12.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""Local stand-ins for the exchange and third-party APIs the benchmarks talk to.
+
+Imported by the benchmark scripts once they have put ``src`` on
+``sys.path``; nothing in the application uses them.
+"""
+import asyncio
+import json
+import random
+import time
+from email.utils import formatdate
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from services.backtesting import Candles
+from services.market_data import exchange_symbol
+
+
+class ReplayServer:
+    """Local stand-in for the exchange websocket.
+
+    Replays candles as closed-kline messages in the exchange's
+    combined-stream format, one JSON message per line over TCP (see
+    ``tcp_connector``). Each client's ``SUBSCRIBE`` line picks the streams;
+    only ``<symbol>@kline_<interval>`` streams matching ``interval`` and a
+    symbol in ``candles`` are replayed. ``rate`` caps messages per second
+    per client (0 replays as fast as the client reads) and ``E`` is stamped
+    with the send time so latency can be measured.
+    """
+
+    def __init__(self, candles: Dict[str, Candles], interval: str = "1m", rate: float = 0.0):
+        self._candles = {exchange_symbol(symbol): c for symbol, c in candles.items()}
+        self._interval = interval
+        self._rate = rate
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.sent = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening and return the bound port."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = json.loads(await reader.readline())
+            symbols = [
+                stream.split("@", 1)[0].upper()
+                for stream in request.get("params", [])
+                if stream.endswith(f"@kline_{self._interval}")
+            ]
+            symbols = [symbol for symbol in symbols if symbol in self._candles]
+            rows = max((len(self._candles[symbol]) for symbol in symbols), default=0)
+            started = perf_counter()
+            sent = 0
+            for row in range(rows):
+                for symbol in symbols:
+                    candles = self._candles[symbol]
+                    if row < len(candles):
+                        writer.write(self._kline(symbol, candles, row))
+                        sent += 1
+                self.sent = max(self.sent, sent)
+                if row % 64 == 63:
+                    await writer.drain()
+                    if self._rate:
+                        ahead = sent / self._rate - (perf_counter() - started)
+                        if ahead > 0:
+                            await asyncio.sleep(ahead)
+            await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _kline(self, symbol: str, candles: Candles, row: int) -> bytes:
+        timestamp, open_, high, low, close, volume = (column[row] for column in candles)
+        return json.dumps({
+            "stream": f"{symbol.lower()}@kline_{self._interval}",
+            "data": {
+                "e": "kline",
+                "E": int(time.time() * 1000),
+                "s": symbol,
+                "k": {
+                    "t": int(timestamp),
+                    "i": self._interval,
+                    "o": repr(float(open_)),
+                    "h": repr(float(high)),
+                    "l": repr(float(low)),
+                    "c": repr(float(close)),
+                    "v": repr(float(volume)),
+                    "x": True,
+                },
+            },
+        }).encode() + b"\n"
+
+
+class CatalogStubServer:
+    """Local stand-in for affiliate network catalog APIs.
+
+    Serves ``/<network>/products?page=N`` over HTTP/1.1 keep-alive, with an
+    ETag and Last-Modified per page, answering 304 to matching conditional
+    requests. ``mutate`` changes the price of random products, which
+    changes their pages' validators. ``latency`` delays every response.
+    """
+
+    def __init__(self, catalogs: Dict[str, List[Dict[str, Any]]], page_size: int = 100, latency: float = 0.0):
+        self._catalogs = catalogs
+        self._page_size = page_size
+        self._latency = latency
+        self._versions: Dict[Tuple[str, int], Tuple[int, float]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests = 0
+        self.not_modified = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening and return the bound port."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def mutate(self, network: str, count: int, rng: Optional[random.Random] = None) -> None:
+        rng = rng or random.Random()
+        catalog = self._catalogs[network]
+        for index in rng.sample(range(len(catalog)), min(count, len(catalog))):
+            catalog[index]["price"] = round(catalog[index]["price"] * rng.uniform(0.8, 1.2), 2)
+            page = index // self._page_size + 1
+            version, _ = self._versions.get((network, page), (0, 0.0))
+            self._versions[(network, page)] = (version + 1, time.time())
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if self._latency:
+                    await asyncio.sleep(self._latency)
+                writer.write(self._respond(request_line.decode("latin-1").split()[1], headers))
+                await writer.drain()
+        except (ConnectionError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, target: str, headers: Dict[str, str]) -> bytes:
+        self.requests += 1
+        parts = urlsplit(target)
+        network, _, resource = parts.path.strip("/").partition("/")
+        catalog = self._catalogs.get(network)
+        if catalog is None or resource != "products":
+            return self._response(404, b'{"detail": "Not Found"}')
+        page = int(parse_qs(parts.query).get("page", ["1"])[0])
+        version, modified = self._versions.get((network, page), (0, 0.0))
+        etag = f'"{network}-{page}-{version}"'
+        last_modified = formatdate(modified, usegmt=True)
+        if headers.get("if-none-match") == etag:
+            self.not_modified += 1
+            return self._response(304, b"", etag, last_modified)
+        pages = max(1, -(-len(catalog) // self._page_size))
+        start = (page - 1) * self._page_size
+        body = json.dumps({"products": catalog[start:start + self._page_size], "page": page, "pages": pages}).encode()
+        return self._response(200, body, etag, last_modified)
+
+    @staticmethod
+    def _response(status: int, body: bytes, etag: str = "", last_modified: str = "") -> bytes:
+        reason = {200: "OK", 304: "Not Modified", 404: "Not Found"}[status]
+        head = [f"HTTP/1.1 {status} {reason}", f"Content-Length: {len(body)}", "Content-Type: application/json"]
+        if etag:
+            head += [f"ETag: {etag}", f"Last-Modified: {last_modified}"]
+        return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+
+class LinkStubServer:
+    """Local stand-in for merchant sites.
+
+    Answers HEAD and GET over HTTP/1.1 keep-alive according to the first
+    path segment: ``/ok/...`` 200, ``/dead/...`` 404, ``/moved/...`` a 301
+    to ``/ok/...``, ``/nohead/...`` 405 to HEAD and 200 to GET, and
+    ``/flaky/...`` 503 on every other request. Anything else is 404.
+    ``latency`` delays every response. Requests are counted per Host
+    header, along with the most that were in flight at once.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self._latency = latency
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._flaky: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self.requests: Dict[str, int] = {}
+        self.max_in_flight: Dict[str, int] = {}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening and return the bound port."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                method, target = request_line.decode("latin-1").split()[:2]
+                host = headers.get("host", "")
+                self.requests[host] = self.requests.get(host, 0) + 1
+                self._in_flight[host] = self._in_flight.get(host, 0) + 1
+                self.max_in_flight[host] = max(self.max_in_flight.get(host, 0), self._in_flight[host])
+                try:
+                    if self._latency:
+                        await asyncio.sleep(self._latency)
+                    writer.write(self._respond(method, target))
+                    await writer.drain()
+                finally:
+                    self._in_flight[host] -= 1
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, method: str, target: str) -> bytes:
+        kind, _, rest = target.lstrip("/").partition("/")
+        if kind == "ok":
+            status = 200
+        elif kind == "moved":
+            return self._response(method, 301, [f"Location: /ok/{rest}"])
+        elif kind == "nohead":
+            status = 405 if method == "HEAD" else 200
+        elif kind == "flaky":
+            count = self._flaky[target] = self._flaky.get(target, 0) + 1
+            status = 503 if count % 2 else 200
+        else:
+            status = 404
+        return self._response(method, status)
+
+    @staticmethod
+    def _response(method: str, status: int, extra: Iterable[str] = ()) -> bytes:
+        reason = {200: "OK", 301: "Moved Permanently", 404: "Not Found", 405: "Method Not Allowed", 503: "Service Unavailable"}
+        body = b"" if method == "HEAD" else f"{status} {reason[status]}".encode()
+        head = [f"HTTP/1.1 {status} {reason[status]}", f"Content-Length: {len(body)}", *extra]
+        return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+
+class PlatformStubServer:
+    """Local stand-in for social platform APIs.
+
+    Accepts ``POST /<platform>/posts`` over HTTP/1.1 keep-alive and answers
+    201 with a post id after the platform's ``latency`` (``default_latency``
+    otherwise). A platform in ``limits`` answers 429 with ``Retry-After``
+    to requests beyond that many per second, and ``error_rate`` of requests
+    fail with 503. Repeated ``Idempotency-Key`` values return the first
+    post id instead of posting again. Requests, duplicates, 429s and the
+    most requests in flight are counted per platform.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[Mapping[str, float]] = None,
+        default_latency: float = 0.0,
+        limits: Optional[Mapping[str, float]] = None,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self._latency = dict(latency or {})
+        self._default_latency = default_latency
+        self._limits = dict(limits or {})
+        self._error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._windows: Dict[str, Any] = {}
+        self._posted: Dict[str, str] = {}
+        self._in_flight: Dict[str, int] = {}
+        self.requests: Dict[str, int] = {}
+        self.posts: Dict[str, int] = {}
+        self.duplicates: Dict[str, int] = {}
+        self.throttled: Dict[str, int] = {}
+        self.max_in_flight: Dict[str, int] = {}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening and return the bound port."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                await reader.readexactly(int(headers.get("content-length", 0)))
+                platform = request_line.decode("latin-1").split()[1].strip("/").split("/")[0]
+                self.requests[platform] = self.requests.get(platform, 0) + 1
+                self._in_flight[platform] = self._in_flight.get(platform, 0) + 1
+                self.max_in_flight[platform] = max(self.max_in_flight.get(platform, 0), self._in_flight[platform])
+                try:
+                    writer.write(await self._respond(platform, headers.get("idempotency-key")))
+                    await writer.drain()
+                finally:
+                    self._in_flight[platform] -= 1
+        except (ConnectionError, ValueError, IndexError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, platform: str, key: Optional[str]) -> bytes:
+        limit = self._limits.get(platform)
+        if limit is not None:
+            second = int(time.time())
+            window, count = self._windows.get(platform, (second, 0))
+            count = count + 1 if window == second else 1
+            self._windows[platform] = (second, count)
+            if count > limit:
+                self.throttled[platform] = self.throttled.get(platform, 0) + 1
+                return self._response(429, {"error": "rate limited"}, ["Retry-After: 1"])
+        await asyncio.sleep(self._latency.get(platform, self._default_latency))
+        if self._error_rate and self._rng.random() < self._error_rate:
+            return self._response(503, {"error": "unavailable"})
+        if key is not None and key in self._posted:
+            self.duplicates[platform] = self.duplicates.get(platform, 0) + 1
+            return self._response(201, {"id": self._posted[key]})
+        post_id = f"{platform}-{len(self._posted) + 1}"
+        if key is not None:
+            self._posted[key] = post_id
+        self.posts[platform] = self.posts.get(platform, 0) + 1
+        return self._response(201, {"id": post_id})
+
+    @staticmethod
+    def _response(status: int, payload: Dict[str, Any], extra: Iterable[str] = ()) -> bytes:
+        reason = {201: "Created", 429: "Too Many Requests", 503: "Service Unavailable"}
+        body = json.dumps(payload).encode()
+        head = [f"HTTP/1.1 {status} {reason[status]}", "Content-Type: application/json", f"Content-Length: {len(body)}", *extra]
+        return ("\r\n".join(head) + "\r\n\r\n").encode() + body
@@ -34,6 +34,53 @@ class Settings(BaseSettings):
     BINANCE_API_KEY: Optional[str] = os.getenv("BINANCE_API_KEY", "")
     BINANCE_API_SECRET: Optional[str] = os.getenv("BINANCE_API_SECRET", "")
     
+    API_KEY_ENCRYPTION_PASSWORD: str = os.getenv("API_KEY_ENCRYPTION_PASSWORD", "krake_secure_password")
+    API_KEY_ENCRYPTION_SALT: str = os.getenv("API_KEY_ENCRYPTION_SALT", "krake_salt_for_encryption")
+    API_KEY_KDF_ITERATIONS: int = int(os.getenv("API_KEY_KDF_ITERATIONS", "100000"))
+    API_KEY_PREVIOUS_KEYS: str = os.getenv("API_KEY_PREVIOUS_KEYS", "")  # Comma-separated Fernet keys
+    API_KEY_KEYRING_FILE: str = os.getenv("API_KEY_KEYRING_FILE", "")  # rotated keys, primary first; empty = not persisted
+    
+    BACKTEST_DATA_DIR: str = os.getenv("BACKTEST_DATA_DIR", "data/candles")
+    OPTIMIZER_CACHE_DIR: str = os.getenv("OPTIMIZER_CACHE_DIR", "data/cache")
+    OPTIMIZER_WORKERS: int = int(os.getenv("OPTIMIZER_WORKERS", "0"))  # 0 = one per CPU
+    OPTIMIZER_MAX_CANDIDATES: int = int(os.getenv("OPTIMIZER_MAX_CANDIDATES", "100000"))
+    TRADE_STORE_DIR: str = os.getenv("TRADE_STORE_DIR", "")  # empty = in-memory, seeded with mock trades
+    
+    MARKET_DATA_URL: str = os.getenv("MARKET_DATA_URL", "wss://stream.binance.com:9443")
+    MARKET_DATA_SYMBOLS: str = os.getenv("MARKET_DATA_SYMBOLS", "")  # Comma-separated, empty = feed off
+    MARKET_DATA_INTERVALS: str = os.getenv("MARKET_DATA_INTERVALS", "1m")  # Comma-separated
+    MARKET_DATA_BUFFER_SIZE: int = int(os.getenv("MARKET_DATA_BUFFER_SIZE", "1000"))  # candles per symbol
+    STRATEGY_SCHEDULER_CONCURRENCY: int = int(os.getenv("STRATEGY_SCHEDULER_CONCURRENCY", "4"))  # orders in flight per API key
+    
+    CLICK_FLUSH_INTERVAL: float = float(os.getenv("CLICK_FLUSH_INTERVAL", "1.0"))  # seconds
+    CLICK_BATCH_SIZE: int = int(os.getenv("CLICK_BATCH_SIZE", "10000"))  # flush early at this many clicks
+    CLICK_FILTER_WINDOW: float = float(os.getenv("CLICK_FILTER_WINDOW", "60"))  # seconds of click history for rate limits
+    CLICK_IP_LIMIT: int = int(os.getenv("CLICK_IP_LIMIT", "60"))  # clicks per IP per window
+    CLICK_REPEAT_LIMIT: int = int(os.getenv("CLICK_REPEAT_LIMIT", "5"))  # clicks per visitor on one link per window
+    COUNTER_MERGE_INTERVAL: float = float(os.getenv("COUNTER_MERGE_INTERVAL", "1.0"))  # seconds
+    RANKING_PRIOR_WEIGHT: float = float(os.getenv("RANKING_PRIOR_WEIGHT", "50"))  # pseudo-clicks at the average conversion rate
+    CATALOG_SYNC_INTERVAL: float = float(os.getenv("CATALOG_SYNC_INTERVAL", "0"))  # seconds, 0 = manual only
+    CATALOG_SYNC_RATE: float = float(os.getenv("CATALOG_SYNC_RATE", "10"))  # requests/s per network
+    CATALOG_SYNC_CONCURRENCY: int = int(os.getenv("CATALOG_SYNC_CONCURRENCY", "4"))  # pages in flight per network
+    CATALOG_SYNC_CONNECTIONS: int = int(os.getenv("CATALOG_SYNC_CONNECTIONS", "20"))  # shared pool size
+    LINK_HEALTH_INTERVAL: float = float(os.getenv("LINK_HEALTH_INTERVAL", "0"))  # seconds, 0 = manual only
+    LINK_HEALTH_CONCURRENCY: int = int(os.getenv("LINK_HEALTH_CONCURRENCY", "200"))  # probes in flight
+    LINK_HEALTH_HOST_RATE: float = float(os.getenv("LINK_HEALTH_HOST_RATE", "5"))  # requests/s per host
+    LINK_HEALTH_HOST_CONCURRENCY: int = int(os.getenv("LINK_HEALTH_HOST_CONCURRENCY", "4"))  # probes in flight per host
+    LINK_HEALTH_TTL: float = float(os.getenv("LINK_HEALTH_TTL", "3600"))  # seconds a healthy result is reused
+    LINK_HEALTH_FAILURES: int = int(os.getenv("LINK_HEALTH_FAILURES", "3"))  # failed checks in a row before deactivating
+    POST_DISPATCH_CONCURRENCY: int = int(os.getenv("POST_DISPATCH_CONCURRENCY", "1000"))  # scheduled posts publishing at once
+    SOCIAL_PUBLISH_URL: str = os.getenv("SOCIAL_PUBLISH_URL", "")  # platform API URL with a {platform} field, empty = simulate
+    SOCIAL_PUBLISH_RATE: float = float(os.getenv("SOCIAL_PUBLISH_RATE", "5"))  # requests/s per platform
+    SOCIAL_PUBLISH_CONCURRENCY: int = int(os.getenv("SOCIAL_PUBLISH_CONCURRENCY", "4"))  # requests in flight per platform
+    SOCIAL_PUBLISH_RETRIES: int = int(os.getenv("SOCIAL_PUBLISH_RETRIES", "3"))
+    IMAGE_JOB_WORKERS: int = int(os.getenv("IMAGE_JOB_WORKERS", "4"))  # image jobs running at once
+    IMAGE_CACHE_SIZE: int = int(os.getenv("IMAGE_CACHE_SIZE", "1000"))  # finished images kept for repeat prompts
+    MEDIA_STORE_DIR: str = os.getenv("MEDIA_STORE_DIR", "")  # empty = images stay remote; relative to the working directory
+    MEDIA_BASE_URL: str = os.getenv("MEDIA_BASE_URL", "/api/social-post/media")  # absolute when platforms fetch images
+    MEDIA_RENDER_WORKERS: int = int(os.getenv("MEDIA_RENDER_WORKERS", "0"))  # 0 = one per CPU
+    DASHBOARD_LIST_SIZE: int = int(os.getenv("DASHBOARD_LIST_SIZE", "5"))  # rows in the dashboard's top and recent lists
+    
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY", "")
     
     model_config = {
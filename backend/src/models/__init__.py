@@ -27,6 +27,7 @@ from .social_post import (
     ScheduledPostCreate,
     ScheduledPostInDB,
     ScheduledPostUpdate,
+    PlatformPublishResult,
     PlatformConnection,
     ImageGenerationRequest,
     ImageGenerationResponse,
@@ -83,6 +84,10 @@ from .affiliate_bot import (
     AffiliateEarningInDB,
     AffiliateEarningUpdate,
     AffiliateStatistics,
+    AffiliateDashboard,
+    EarningsReconciliationResult,
+    ProductSearchResult,
+    RankedProduct,
 )
 from .trading_bot import (
     TradingStrategy,
@@ -93,11 +98,18 @@ from .trading_bot import (
     APIKeyCreate,
     APIKeyInDB,
     APIKeyUpdate,
+    APIKeyRotation,
     Trade,
     TradeCreate,
     TradeInDB,
     TradeUpdate,
+    TradeImport,
+    TradeImportResult,
     TradingStatistics,
+    BacktestRequest,
+    BacktestResult,
+    ParameterRange,
+    OptimizationRequest,
 )
 
 __all__ = [
@@ -137,6 +149,7 @@ __all__ = [
     "ScheduledPostCreate",
     "ScheduledPostInDB",
     "ScheduledPostUpdate",
+    "PlatformPublishResult",
     "PlatformConnection",
     "ImageGenerationRequest",
     "ImageGenerationResponse",
@@ -189,6 +202,10 @@ __all__ = [
     "AffiliateEarningInDB",
     "AffiliateEarningUpdate",
     "AffiliateStatistics",
+    "AffiliateDashboard",
+    "EarningsReconciliationResult",
+    "ProductSearchResult",
+    "RankedProduct",
     "TradingStrategy",
     "TradingStrategyCreate",
     "TradingStrategyInDB",
@@ -197,9 +214,16 @@ __all__ = [
     "APIKeyCreate",
     "APIKeyInDB",
     "APIKeyUpdate",
+    "APIKeyRotation",
     "Trade",
     "TradeCreate",
     "TradeInDB",
     "TradeUpdate",
+    "TradeImport",
+    "TradeImportResult",
     "TradingStatistics",
+    "BacktestRequest",
+    "BacktestResult",
+    "ParameterRange",
+    "OptimizationRequest",
 ]
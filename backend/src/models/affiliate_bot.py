@@ -131,7 +131,8 @@ class AffiliateEarningBase(BaseModel):
     link_id: UUID
     amount: float
     transaction_date: datetime
-    status: str  # pending, approved, paid
+    status: str  # pending, approved, paid; reversed, rejected or cancelled when taken back
+    transaction_id: Optional[str] = None  # the network's id, matched by payout reconciliation
     payment_method: Optional[str] = None
     payment_date: Optional[datetime] = None
 
@@ -163,6 +164,36 @@ class AffiliateEarning(AffiliateEarningInDB):
     pass
 
 
+class EarningsReconciliationResult(BaseModel):
+    """Outcome of reconciling a network payout report against affiliate earnings."""
+    rows: int
+    matched: int
+    updated: int
+    unchanged: int
+    mismatched: int
+    failed: int
+    dry_run: bool
+    transitions: Dict[str, int]  # "pending->paid": count
+    mismatches: Dict[str, int]  # by kind
+    details: List[str]  # first problems, as "line N: reason"
+
+
+class ProductSearchResult(BaseModel):
+    """A page of ranked product search results with facet counts."""
+    total: int
+    items: List[AffiliateProduct]
+    facets: Dict[str, Dict[str, int]]
+
+
+class RankedProduct(BaseModel):
+    """A product with its expected earnings per click and the traffic behind it."""
+    product: AffiliateProduct
+    expected_epc: float
+    clicks: int
+    conversions: int
+    conversion_rate: float  # smoothed
+
+
 class AffiliateStatistics(BaseModel):
     """Statistics for affiliate marketing."""
     total_clicks: int
@@ -172,3 +203,12 @@ class AffiliateStatistics(BaseModel):
     conversion_rate: float
     avg_commission: float
     period: str  # daily, weekly, monthly, all-time
+
+
+class AffiliateDashboard(BaseModel):
+    """Compact snapshot of everything the affiliate dashboard shows."""
+    networks: List[Dict[str, Any]]  # id, name, is_connected, products
+    products: Dict[str, Any]  # total, categories, top by expected EPC
+    links: Dict[str, Any]  # total, active, auto_deactivated, health_checks
+    earnings: Dict[str, Any]  # total, by_status, recent
+    statistics: AffiliateStatistics  # all-time
@@ -47,6 +47,16 @@ class SocialPost(SocialPostInDB):
     pass
 
 
+class PlatformPublishResult(BaseModel):
+    """Outcome of publishing a scheduled post to one platform."""
+    status: str  # posted, error, skipped, simulated
+    attempts: int = 0
+    http_status: Optional[int] = None
+    external_id: Optional[str] = None  # the platform's id of the published post
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
 class ScheduledPostBase(BaseModel):
     """Base scheduled post model."""
     post_id: UUID
@@ -72,6 +82,7 @@ class ScheduledPostUpdate(BaseModel):
 class ScheduledPostInDB(ScheduledPostBase):
     """Scheduled post model as stored in the database."""
     id: UUID = Field(default_factory=uuid4)
+    platform_results: Dict[str, PlatformPublishResult] = Field(default_factory=dict)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -104,7 +115,10 @@ class ImageGenerationRequest(BaseModel):
 
 class ImageGenerationResponse(BaseModel):
     """Image generation response model."""
-    image_url: str
+    image_url: str  # empty until the job is done
     upscaled_image_url: Optional[str] = None
     success: bool = True
     error_message: Optional[str] = None
+    job_id: Optional[str] = None
+    status: str = "done"  # queued, running, done, error
+    cached: bool = False
@@ -84,6 +84,13 @@ class APIKey(APIKeyInDB):
     encrypted_secret: Optional[str] = None
 
 
+class APIKeyRotation(BaseModel):
+    """Encryption key rotation request."""
+    key: str  # urlsafe base64 Fernet key, see Fernet.generate_key()
+    batch_size: int = Field(default=500, ge=1, le=10000)
+    retire_old_keys: bool = False
+
+
 class TradeBase(BaseModel):
     """Base model for trades."""
     strategy_id: UUID
@@ -110,6 +117,20 @@ class TradeUpdate(BaseModel):
     close_time: Optional[datetime] = None
 
 
+class TradeImport(TradeBase):
+    """Trade row in a bulk import; ids and timestamps are kept when present."""
+    id: Optional[UUID] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class TradeImportResult(BaseModel):
+    """Outcome of a bulk trade import."""
+    imported: int
+    failed: int
+    errors: List[str]  # first failures, as "line N: reason"
+
+
 class TradeInDB(TradeBase):
     """Trade model as stored in the database."""
     id: UUID = Field(default_factory=uuid4)
@@ -135,3 +156,42 @@ class TradingStatistics(BaseModel):
     max_drawdown: float
     avg_trade_duration: float
     period: str  # daily, weekly, monthly, all-time
+
+
+class BacktestRequest(BaseModel):
+    """Backtest parameters for a trading strategy."""
+    symbols: Optional[List[str]] = None  # defaults to config["symbols"], then BTC/USDT
+    timeframe: Optional[str] = None  # defaults to the first of config["timeframes"]
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    capital: float = Field(default=1000.0, gt=0)  # quote currency per symbol
+    fee_rate: float = Field(default=0.001, ge=0, lt=1)
+
+
+class ParameterRange(BaseModel):
+    """Numeric range for one config parameter in a parameter sweep."""
+    min: float
+    max: float
+    step: Optional[float] = Field(default=None, gt=0)  # required for grid search
+    integer: bool = False
+
+
+class OptimizationRequest(BacktestRequest):
+    """Parameter sweep over a trading strategy's config."""
+    parameters: Dict[str, Union[List[Any], ParameterRange]]
+    search: str = "grid"  # grid, random
+    samples: int = Field(default=100, ge=1)  # random search only
+    seed: Optional[int] = None
+    objective: str = "profit_loss"
+    maximize: bool = True
+    top_n: int = Field(default=10, ge=1, le=100)
+
+
+class BacktestResult(TradingStatistics):
+    """Trading statistics produced by replaying a strategy over historical candles."""
+    strategy_id: UUID
+    strategy_type: str
+    symbols: List[str]
+    timeframe: str
+    candles: int
+    elapsed_ms: float
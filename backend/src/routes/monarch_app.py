@@ -22,10 +22,11 @@ from models.monarch_app import (
     AppControlAction,
     AppControlActionCreate,
 )
+from services.repository import InMemoryRepository
 
 router = APIRouter()
 
-mock_app_versions = [
+mock_app_versions = InMemoryRepository(indexes=("is_latest",), records=[
     {
         "id": str(uuid4()),
         "version": "1.0.0",
@@ -36,26 +37,26 @@ mock_app_versions = [
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
     }
-]
+])
 
-mock_weekly_content_items = []
-mock_workout_questions = []
-mock_workout_plans = []
-mock_app_control_actions = []
+mock_weekly_content_items = InMemoryRepository(indexes=("type", "week_number", "year"))
+mock_workout_questions = InMemoryRepository()
+mock_workout_plans = InMemoryRepository(indexes=("user_id",))
+mock_app_control_actions = InMemoryRepository(indexes=("action_type", "target_module", "is_applied"))
 
 
 @router.get("/versions", response_model=List[AppVersion])
 async def get_app_versions():
     """Get all app versions."""
-    return mock_app_versions
+    return mock_app_versions.find()
 
 
 @router.get("/versions/latest", response_model=AppVersion)
 async def get_latest_app_version():
     """Get the latest app version."""
-    for version in mock_app_versions:
-        if version["is_latest"]:
-            return version
+    latest = mock_app_versions.find_one(is_latest=True)
+    if latest is not None:
+        return latest
     
     if mock_app_versions:
         return sorted(mock_app_versions, key=lambda x: x["build_number"], reverse=True)[0]
@@ -67,8 +68,8 @@ async def get_latest_app_version():
 async def create_app_version(version: AppVersionCreate):
     """Create a new app version."""
     if version.is_latest:
-        for v in mock_app_versions:
-            v["is_latest"] = False
+        for v in mock_app_versions.find(is_latest=True):
+            mock_app_versions.update(v["id"], {"is_latest": False})
     
     new_version = {
         "id": str(uuid4()),
@@ -77,7 +78,7 @@ async def create_app_version(version: AppVersionCreate):
         "updated_at": datetime.utcnow(),
     }
     
-    mock_app_versions.append(new_version)
+    mock_app_versions.add(new_version)
     return new_version
 
 
@@ -88,18 +89,11 @@ async def get_weekly_content(
     year: Optional[int] = None,
 ):
     """Get weekly content items, optionally filtered by type, week number, and year."""
-    items = mock_weekly_content_items
-    
-    if content_type:
-        items = [item for item in items if item["type"] == content_type]
-    
-    if week_number is not None:
-        items = [item for item in items if item["week_number"] == week_number]
-    
-    if year is not None:
-        items = [item for item in items if item["year"] == year]
-    
-    return items
+    return mock_weekly_content_items.find(
+        type=content_type or None,
+        week_number=week_number,
+        year=year,
+    )
 
 
 @router.post("/weekly-content", response_model=WeeklyContentItem)
@@ -112,7 +106,7 @@ async def create_weekly_content(item: WeeklyContentItemCreate):
         "updated_at": datetime.utcnow(),
     }
     
-    mock_weekly_content_items.append(new_item)
+    mock_weekly_content_items.add(new_item)
     return new_item
 
 
@@ -222,10 +216,7 @@ async def sync_weekly_content():
         }
     ]
     
-    mock_weekly_content_items = [
-        item for item in mock_weekly_content_items 
-        if item["week_number"] != current_week or item["year"] != current_year
-    ]
+    mock_weekly_content_items.delete_where(week_number=current_week, year=current_year)
     
     for item in quotes + meals + self_improvement + journal_templates:
         new_item = {
@@ -234,7 +225,7 @@ async def sync_weekly_content():
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
-        mock_weekly_content_items.append(new_item)
+        mock_weekly_content_items.add(new_item)
     
     return {
         "success": True,
@@ -610,9 +601,9 @@ async def get_workout_questions():
                 "updated_at": datetime.utcnow()
             }
         ]
-        mock_workout_questions.extend(default_questions)
+        mock_workout_questions.add_many(default_questions)
     
-    return mock_workout_questions
+    return mock_workout_questions.find()
 
 
 @router.post("/workout/generate", response_model=WorkoutPlan)
@@ -858,23 +849,23 @@ async def generate_workout_plan(answers: Dict[str, Any], user_id: UUID):
         "updated_at": datetime.utcnow()
     }
     
-    mock_workout_plans.append(plan)
+    mock_workout_plans.add(plan)
     return plan
 
 
 @router.get("/workout/plans", response_model=List[WorkoutPlan])
 async def get_workout_plans(user_id: UUID):
     """Get all workout plans for a user."""
-    user_plans = [plan for plan in mock_workout_plans if plan["user_id"] == str(user_id)]
+    user_plans = mock_workout_plans.find(user_id=str(user_id))
     return user_plans
 
 
 @router.get("/workout/plans/{plan_id}", response_model=WorkoutPlan)
 async def get_workout_plan(plan_id: UUID):
     """Get a specific workout plan."""
-    for plan in mock_workout_plans:
-        if plan["id"] == str(plan_id):
-            return plan
+    plan = mock_workout_plans.get(plan_id)
+    if plan is not None:
+        return plan
     
     raise HTTPException(status_code=404, detail=f"Workout plan with ID {plan_id} not found")
 
@@ -882,11 +873,12 @@ async def get_workout_plan(plan_id: UUID):
 @router.post("/workout/plans/{plan_id}/reset", response_model=WorkoutPlan)
 async def reset_workout_plan(plan_id: UUID):
     """Reset a workout plan (regenerate with new expiration)."""
-    for i, plan in enumerate(mock_workout_plans):
-        if plan["id"] == str(plan_id):
-            mock_workout_plans[i]["expires_at"] = datetime.utcnow() + timedelta(days=7)
-            mock_workout_plans[i]["updated_at"] = datetime.utcnow()
-            return mock_workout_plans[i]
+    plan = mock_workout_plans.update(plan_id, {
+        "expires_at": datetime.utcnow() + timedelta(days=7),
+        "updated_at": datetime.utcnow(),
+    })
+    if plan is not None:
+        return plan
     
     raise HTTPException(status_code=404, detail=f"Workout plan with ID {plan_id} not found")
 
@@ -898,18 +890,11 @@ async def get_app_control_actions(
     is_applied: Optional[bool] = None
 ):
     """Get app control actions, optionally filtered by type, target module, and applied status."""
-    actions = mock_app_control_actions
-    
-    if action_type:
-        actions = [action for action in actions if action["action_type"] == action_type]
-    
-    if target_module:
-        actions = [action for action in actions if action["target_module"] == target_module]
-    
-    if is_applied is not None:
-        actions = [action for action in actions if action["is_applied"] == is_applied]
-    
-    return actions
+    return mock_app_control_actions.find(
+        action_type=action_type or None,
+        target_module=target_module or None,
+        is_applied=is_applied,
+    )
 
 
 @router.post("/control/actions", response_model=AppControlAction)
@@ -922,18 +907,19 @@ async def create_app_control_action(action: AppControlActionCreate):
         "updated_at": datetime.utcnow()
     }
     
-    mock_app_control_actions.append(new_action)
+    mock_app_control_actions.add(new_action)
     return new_action
 
 
 @router.post("/control/actions/{action_id}/apply", response_model=AppControlAction)
 async def apply_app_control_action(action_id: UUID):
     """Apply an app control action."""
-    for i, action in enumerate(mock_app_control_actions):
-        if action["id"] == str(action_id):
-            mock_app_control_actions[i]["is_applied"] = True
-            mock_app_control_actions[i]["updated_at"] = datetime.utcnow()
-            return mock_app_control_actions[i]
+    action = mock_app_control_actions.update(action_id, {
+        "is_applied": True,
+        "updated_at": datetime.utcnow(),
+    })
+    if action is not None:
+        return action
     
     raise HTTPException(status_code=404, detail=f"App control action with ID {action_id} not found")
 
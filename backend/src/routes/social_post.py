@@ -4,7 +4,8 @@ from datetime import datetime
 from typing import List, Optional
 from uuid import UUID, uuid4
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Request
+from fastapi.responses import FileResponse, Response
 
 from models import (
     SocialPost, 
@@ -18,13 +19,20 @@ from models import (
     ImageGenerationResponse,
 )
 from config.settings import settings
+from services.http_caching import not_modified
+from services.image_jobs import ImageJob, ImageJobQueue
+from services.media_store import PLATFORM_RENDITIONS, MediaError, MediaStore
+from services.platform_publisher import PlatformPublisher
+from services.post_dispatcher import PostDispatcher
+from services.repository import InMemoryRepository
 
 router = APIRouter()
 
 OPENAI_API_KEY = settings.OPENAI_API_KEY or "YOUR_OPENAI_API_KEY"
 OPENAI_IMAGE_API = "https://api.openai.com/v1/images/generations"
 
-mock_scheduled_posts = []
+mock_social_posts = InMemoryRepository()
+mock_scheduled_posts = InMemoryRepository()
 mock_platform_connections = [
     {"id": str(uuid4()), "platform": "instagram", "is_connected": True, "last_connected": datetime.utcnow()},
     {"id": str(uuid4()), "platform": "facebook", "is_connected": True, "last_connected": datetime.utcnow()},
@@ -36,39 +44,137 @@ mock_platform_connections = [
 ]
 
 
-@router.post("/generate-image", response_model=ImageGenerationResponse)
-async def generate_image(request: ImageGenerationRequest):
-    """Generate an image using OpenAI's API."""
-    try:
-        print(f"Generating image with prompt: {request.content_description}")
-        
-        image_url = "https://example.com/mock-generated-image.jpg"
-        
-        upscaled_image_url = None
-        if request.upscale_with_vizzy:
-            print("Upscaling image with Vizzy")
-            upscaled_image_url = "https://example.com/mock-upscaled-image.jpg"
-        
-        return ImageGenerationResponse(
-            image_url=image_url,
-            upscaled_image_url=upscaled_image_url,
-            success=True
-        )
-    except Exception as e:
-        print(f"Error in generate_image: {str(e)}")
-        return ImageGenerationResponse(
-            image_url="",
-            success=False,
-            error_message=f"Error generating image: {str(e)}"
-        )
+async def generate_with_openai(content_description: str):
+    """Mock function to generate an image with OpenAI."""
+    print(f"Generating image with prompt: {content_description}")
+    return "https://example.com/mock-generated-image.jpg"
 
 
 async def upscale_with_vizzy(image_url: str):
     """Mock function to upscale an image with Vizzy."""
+    print("Upscaling image with Vizzy")
     await asyncio.sleep(2)  # Simulate processing time
     return f"{image_url}?upscaled=true"
 
 
+media_store = MediaStore(
+    settings.MEDIA_STORE_DIR,
+    settings.MEDIA_BASE_URL,
+    workers=settings.MEDIA_RENDER_WORKERS or None,
+) if settings.MEDIA_STORE_DIR else None
+
+
+async def generate_image_asset(content_description: str):
+    """Generate an image and keep a copy of it in the media store."""
+    image_url = await generate_with_openai(content_description)
+    return await media_store.localize(image_url) if media_store is not None else image_url
+
+
+async def upscale_image_asset(image_url: str):
+    """Upscale an image from its original URL and keep a copy of the result in the media store."""
+    if media_store is None:
+        return await upscale_with_vizzy(image_url)
+    return await media_store.localize(await upscale_with_vizzy(media_store.origin(image_url)))
+
+
+image_jobs = ImageJobQueue(
+    generate_image_asset,
+    upscale_image_asset,
+    workers=settings.IMAGE_JOB_WORKERS,
+    cache_size=settings.IMAGE_CACHE_SIZE,
+)
+
+
+def image_job_response(job: ImageJob) -> ImageGenerationResponse:
+    return ImageGenerationResponse(
+        image_url=job.image_url or "",
+        upscaled_image_url=job.upscaled_image_url,
+        success=job.status != "error",
+        error_message=f"Error generating image: {job.error}" if job.error else None,
+        job_id=job.id,
+        status=job.status,
+        cached=job.cached,
+    )
+
+
+@router.post("/generate-image", response_model=ImageGenerationResponse)
+async def generate_image(
+    request: ImageGenerationRequest,
+    background: bool = Query(False),
+    wait: float = Query(0, ge=0, le=30),
+):
+    """Generate an image using OpenAI's API, upscaled with Vizzy if asked.
+
+    Answers with the finished image. With ``background`` it returns at
+    once with the job's status instead, or after up to ``wait`` seconds if
+    the job finishes sooner; poll ``/generate-image/jobs/{job_id}`` for the
+    result. Prompts that were generated before come back done, and
+    identical prompts in flight share one job.
+    """
+    job = image_jobs.submit(request.content_description, request.upscale_with_vizzy)
+    if not background:
+        await image_jobs.wait(job)
+    elif wait:
+        await image_jobs.wait(job, wait)
+    return image_job_response(job)
+
+
+@router.get("/generate-image/jobs/{job_id}", response_model=ImageGenerationResponse)
+async def get_image_job(job_id: str, wait: float = Query(0, ge=0, le=30)):
+    """Get an image job; ``wait`` holds the request up to that many seconds until it finishes."""
+    job = image_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Image job not found")
+    if wait:
+        await image_jobs.wait(job, wait)
+    return image_job_response(job)
+
+
+@router.get("/generate-image/stats", response_model=dict)
+async def get_image_job_stats():
+    """Get image job queue and cache counts, and media store counts."""
+    return {**image_jobs.stats(), "media": media_store.stats() if media_store is not None else None}
+
+
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+async def media_response(request: Request, path, etag: str, media_type: str):
+    """Serve a media file with its ETag, answering ``If-None-Match`` with 304.
+
+    ``FileResponse`` streams the file from disk, with the server's zero-copy
+    sendfile where it has one, and answers ``Range`` and ``If-Range``
+    requests with 206, or 416 for unsatisfiable ranges.
+    """
+    headers = {"ETag": etag, "Cache-Control": MEDIA_CACHE_CONTROL}
+    if not_modified(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+@router.get("/media/{name}")
+async def get_media(name: str, request: Request):
+    """Serve a stored image by its SHA-256 digest, with or without its file extension."""
+    digest = name.split(".")[0]
+    path = media_store.path(digest) if media_store is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    return await media_response(request, path, MediaStore.etag(digest), media_store.content_type(digest))
+
+
+@router.get("/media/{digest}/{name}")
+async def get_media_rendition(digest: str, name: str, request: Request):
+    """Serve a stored image at one of the platform sizes, rendering it on first request."""
+    spec = name[:-4] if name.endswith(".jpg") else name
+    if media_store is None or digest not in media_store or spec not in PLATFORM_RENDITIONS.values():
+        raise HTTPException(status_code=404, detail="Media not found")
+    try:
+        path = await media_store.rendition(digest, spec)
+    except MediaError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to render media: {str(e)}")
+    return await media_response(request, path, MediaStore.etag(digest, spec), "image/jpeg")
+
+
 @router.post("/posts", response_model=SocialPost)
 async def create_social_post(post: SocialPostCreate):
     """Create a new social post."""
@@ -80,6 +186,7 @@ async def create_social_post(post: SocialPostCreate):
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
+        mock_social_posts.add(new_post.dict())
         
         return new_post
     except Exception as e:
@@ -98,7 +205,9 @@ async def schedule_post(scheduled_post: ScheduledPostCreate):
             updated_at=datetime.utcnow()
         )
         
-        mock_scheduled_posts.append(new_scheduled_post.dict())
+        record = new_scheduled_post.dict()
+        mock_scheduled_posts.add(record)
+        post_dispatcher.schedule(record)
         
         return new_scheduled_post
     except Exception as e:
@@ -109,19 +218,43 @@ async def schedule_post(scheduled_post: ScheduledPostCreate):
 async def get_scheduled_posts(workspace: Optional[str] = None, status: Optional[str] = None):
     """Get all scheduled posts, optionally filtered by workspace and status."""
     try:
-        posts = mock_scheduled_posts
+        posts = mock_scheduled_posts.find(post_status=status or None)
         
         if workspace:
             posts = [p for p in posts if p.get("workspace") == workspace]
             
-        if status:
-            posts = [p for p in posts if p.get("post_status") == status]
-            
         return posts
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get scheduled posts: {str(e)}")
 
 
+@router.put("/scheduled/{scheduled_id}", response_model=ScheduledPost)
+async def update_scheduled_post(scheduled_id: UUID, post_update: ScheduledPostUpdate):
+    """Reschedule or change a scheduled post that is not being published."""
+    post = mock_scheduled_posts.get(scheduled_id)
+    if post is None:
+        raise HTTPException(status_code=404, detail="Scheduled post not found")
+    if post["post_status"] == "ready":
+        raise HTTPException(status_code=409, detail="Scheduled post is being published")
+    post.update(post_update.dict(exclude_unset=True), updated_at=datetime.utcnow())
+    if not post_dispatcher.schedule(post):
+        post_dispatcher.cancel(scheduled_id)
+    return post
+
+
+@router.delete("/scheduled/{scheduled_id}")
+async def delete_scheduled_post(scheduled_id: UUID):
+    """Delete a scheduled post, unpublished if it was still planned."""
+    post = mock_scheduled_posts.get(scheduled_id)
+    if post is None:
+        raise HTTPException(status_code=404, detail="Scheduled post not found")
+    if post["post_status"] == "ready":
+        raise HTTPException(status_code=409, detail="Scheduled post is being published")
+    mock_scheduled_posts.delete(scheduled_id)
+    post_dispatcher.cancel(scheduled_id)
+    return {"message": "Scheduled post deleted successfully"}
+
+
 @router.get("/platforms", response_model=List[PlatformConnection])
 async def get_platform_connections():
     """Get all platform connections."""
@@ -168,42 +301,86 @@ async def disconnect_platform(platform: str):
 
 
 @router.post("/monitor", response_model=dict)
-async def monitor_scheduled_posts(background_tasks: BackgroundTasks):
-    """Start monitoring scheduled posts for publishing."""
+async def monitor_scheduled_posts():
+    """Make sure the scheduled post dispatcher is running and report its state.
+
+    There is one dispatcher per worker, started with the app; calling this
+    again does not start another.
+    """
     try:
-        background_tasks.add_task(post_monitoring_loop)
-        return {"message": "Post monitoring started"}
+        post_dispatcher.start()
+        return {"message": "Post monitoring started", **post_dispatcher.stats()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start post monitoring: {str(e)}")
 
 
-async def post_monitoring_loop():
-    """Background task to monitor scheduled posts."""
-    while True:
-        now = datetime.utcnow()
-        
-        for i, post in enumerate(mock_scheduled_posts):
-            if post["post_status"] == "planned" and post["scheduled_time"] <= now:
-                try:
-                    await process_post(post)
-                    
-                    mock_scheduled_posts[i]["post_status"] = "ready"
-                    mock_scheduled_posts[i]["updated_at"] = datetime.utcnow()
-                    
-                    log_status_change(post["id"], "planned", "ready")
-                except Exception as e:
-                    mock_scheduled_posts[i]["post_status"] = "error"
-                    mock_scheduled_posts[i]["error_message"] = str(e)
-                    mock_scheduled_posts[i]["updated_at"] = datetime.utcnow()
-                    
-                    log_error_to_monitoring(post["id"], str(e))
-        
-        await asyncio.sleep(60)
+platform_publisher = PlatformPublisher(
+    settings.SOCIAL_PUBLISH_URL,
+    rate=settings.SOCIAL_PUBLISH_RATE,
+    concurrency=settings.SOCIAL_PUBLISH_CONCURRENCY,
+    retries=settings.SOCIAL_PUBLISH_RETRIES,
+)
 
 
 async def process_post(post):
-    """Process a post for publishing."""
-    pass
+    """Publish a scheduled post to each of its platforms that is connected.
+
+    Platforms are published to concurrently and their results kept on the
+    post. Platforms a previous attempt already posted to are not sent the
+    post again. Without ``SOCIAL_PUBLISH_URL`` publishing is simulated.
+
+    A scheduled post whose ``post_id`` is not a stored social post is
+    simulated as before; with ``SOCIAL_PUBLISH_URL`` set there is nothing
+    to send, so each platform it would go to fails with "Post not found".
+    """
+    social_post = mock_social_posts.get(post["post_id"])
+    connections = {conn["platform"]: conn for conn in mock_platform_connections}
+    results = post.setdefault("platform_results", {})
+    tokens = {}
+    for platform in post["platforms"]:
+        if results.get(platform, {}).get("status") == "posted":
+            continue
+        connection = connections.get(platform)
+        if connection is None or not connection["is_connected"]:
+            results[platform] = {"status": "skipped", "error": "Platform not connected"}
+        elif settings.SOCIAL_PUBLISH_URL:
+            tokens[platform] = connection.get("token")
+        else:
+            results[platform] = {"status": "simulated"}
+    if tokens and social_post is None:
+        results.update({platform: {"status": "error", "error": "Post not found"} for platform in tokens})
+    elif tokens:
+        images = await platform_images(social_post, tokens)
+        results.update(await platform_publisher.publish({**social_post, "id": post["id"]}, tokens, images))
+
+    failed = [platform for platform, result in results.items() if result["status"] == "error"]
+    if failed:
+        raise RuntimeError(f"Publishing failed on {', '.join(failed)}")
+    if not any(result["status"] in ("posted", "simulated") for result in results.values()):
+        raise RuntimeError("No connected platform to publish to")
+
+
+async def platform_images(social_post, platforms):
+    """Media URLs of the post's image sized for each platform.
+
+    The image is downloaded once and the sizes it is missing rendered
+    together in the media store's worker pool, then reused for every post
+    and retry using them. If rendering fails the platforms get the post's
+    own image URL.
+    """
+    if media_store is None:
+        return {}
+    image_url = social_post.get("upscaled_image_url") or social_post.get("image_url")
+    if not image_url:
+        return {}
+    specs = {platform: PLATFORM_RENDITIONS[platform] for platform in platforms if platform in PLATFORM_RENDITIONS}
+    try:
+        digest = media_store.digest_of(image_url) or await media_store.fetch(image_url)
+        await media_store.renditions(digest, specs.values())
+    except Exception as e:
+        print(f"Sending the original image {image_url}: {e}")
+        return {}
+    return {platform: media_store.url(digest, spec) for platform, spec in specs.items()}
 
 
 def log_error_to_monitoring(post_id, error_message):
@@ -216,6 +393,31 @@ def log_status_change(post_id, old_status, new_status):
     print(f"Post {post_id} status changed from {old_status} to {new_status}")
 
 
+def on_post_status(post, old_status, new_status):
+    log_status_change(post["id"], old_status, new_status)
+    if new_status == "error":
+        log_error_to_monitoring(post["id"], post["error_message"])
+
+
+post_dispatcher = PostDispatcher(process_post, on_post_status, settings.POST_DISPATCH_CONCURRENCY)
+
+
+@router.on_event("startup")
+async def start_post_dispatcher():
+    for post in mock_scheduled_posts.find(post_status="planned"):
+        post_dispatcher.schedule(post)
+    post_dispatcher.start()
+
+
+@router.on_event("shutdown")
+async def stop_post_dispatcher():
+    await post_dispatcher.stop()
+    await platform_publisher.close()
+    await image_jobs.stop()
+    if media_store is not None:
+        await media_store.close()
+
+
 @router.post("/verify", response_model=dict)
 async def verify_post_flow():
     """Verification endpoint to test the post flow."""
@@ -240,13 +442,13 @@ async def verify_post_flow():
             upscale_with_vizzy=post.vizzy_upscale
         )
         
-        image_response = await generate_image(image_request)
+        image_response = await generate_image(image_request, background=False)
         
-        if not image_response.success:
+        if image_response.status != "done":
             return {
                 "success": False,
                 "step": "image_generation",
-                "error": image_response.error_message
+                "error": image_response.error_message or f"Image job still {image_response.status}"
             }
         
         scheduled_post = ScheduledPostCreate(
@@ -258,25 +460,20 @@ async def verify_post_flow():
         
         scheduled = await schedule_post(scheduled_post)
         
-        post_updated = False
-        for i, post_item in enumerate(mock_scheduled_posts):
-            if post_item["id"] == str(scheduled.id):
-                mock_scheduled_posts[i]["post_status"] = "ready"
-                mock_scheduled_posts[i]["updated_at"] = datetime.utcnow()
-                log_status_change(post_item["id"], "planned", "ready")
-                post_updated = True
-                break
+        post_dispatcher.start()
+        post_updated = await post_dispatcher.wait(scheduled.id, timeout=10)
+        status = mock_scheduled_posts.get(scheduled.id)["post_status"]
         
         return {
-            "success": True,
+            "success": status == "posted",
             "post_id": str(created_post.id),
             "scheduled_id": str(scheduled.id),
             "image_url": image_response.image_url,
             "upscaled_image_url": image_response.upscaled_image_url,
             "platforms": test_platforms,
-            "status": "ready",
+            "status": status,
             "post_updated": post_updated,
-            "message": "Post successfully verified: planned → ready"
+            "message": f"Post successfully verified: planned → ready → {status}"
         }
     except Exception as e:
         print(f"Error in verify_post_flow: {str(e)}")
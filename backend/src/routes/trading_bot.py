@@ -1,14 +1,15 @@
+import json
 from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
 from typing import List, Optional, Dict, Any
 from uuid import UUID, uuid4
-import base64
-import os
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
+from cryptography.fernet import InvalidToken
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 from models.trading_bot import (
     TradingStrategy,
@@ -17,40 +18,39 @@ from models.trading_bot import (
     APIKey,
     APIKeyCreate,
     APIKeyUpdate,
+    APIKeyRotation,
     Trade,
     TradeCreate,
     TradeUpdate,
+    TradeImport,
+    TradeImportResult,
     TradingStatistics,
+    BacktestRequest,
+    BacktestResult,
+    OptimizationRequest,
 )
+from config.settings import settings
+from services import strategy_optimizer
+from services.backtesting import CANDLE_COLUMNS, BacktestError, load_symbol_candles, resolve_candle_path, run_backtest
+from services.grid_engine import Fill, GridEngine
+from services.key_management import key_manager, key_fingerprint
+from services.market_data import MarketDataFeed, stream_names, websocket_connector
+from services.repository import InMemoryRepository
+from services.strategy_scheduler import Decision, StrategyScheduler, close_profit_loss
+from services.trade_io import export_lines, import_rows, iter_lines, parse_rows
+from services.trade_store import TradeStore
 
 router = APIRouter()
 
-def get_encryption_key():
-    """Get or generate encryption key for API keys."""
-    salt = b'krake_salt_for_encryption'
-    password = b'krake_secure_password'
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100000,
-    )
-    key = base64.urlsafe_b64encode(kdf.derive(password))
-    return key
-
 def encrypt_api_key(api_key: str) -> str:
     """Encrypt API key."""
-    key = get_encryption_key()
-    f = Fernet(key)
-    return f.encrypt(api_key.encode()).decode()
+    return key_manager.encrypt(api_key)
 
 def decrypt_api_key(encrypted_key: str) -> str:
     """Decrypt API key."""
-    key = get_encryption_key()
-    f = Fernet(key)
-    return f.decrypt(encrypted_key.encode()).decode()
+    return key_manager.decrypt(encrypted_key)
 
-mock_strategies = [
+mock_strategies = InMemoryRepository(indexes=("is_active", "strategy_type"), records=[
     {
         "id": str(uuid4()),
         "name": "Smart Grid Strategy",
@@ -104,9 +104,10 @@ mock_strategies = [
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
     },
-]
+])
+seed_strategy_ids = [strategy["id"] for strategy in mock_strategies]
 
-mock_api_keys = [
+mock_api_keys = InMemoryRepository(indexes=("platform", "is_active"), records=[
     {
         "id": str(uuid4()),
         "platform": "Binance",
@@ -127,12 +128,12 @@ mock_api_keys = [
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
     },
-]
+])
 
-mock_trades = [
+seed_trades = [
     {
         "id": str(uuid4()),
-        "strategy_id": mock_strategies[0]["id"],
+        "strategy_id": seed_strategy_ids[0],
         "symbol": "BTC/USDT",
         "side": "buy",
         "quantity": 0.05,
@@ -146,7 +147,7 @@ mock_trades = [
     },
     {
         "id": str(uuid4()),
-        "strategy_id": mock_strategies[0]["id"],
+        "strategy_id": seed_strategy_ids[0],
         "symbol": "ETH/USDT",
         "side": "buy",
         "quantity": 0.5,
@@ -160,7 +161,7 @@ mock_trades = [
     },
     {
         "id": str(uuid4()),
-        "strategy_id": mock_strategies[2]["id"],
+        "strategy_id": seed_strategy_ids[2],
         "symbol": "SOL/USDT",
         "side": "sell",
         "quantity": 10.0,
@@ -174,23 +175,24 @@ mock_trades = [
     },
 ]
 
+trade_store = TradeStore(settings.TRADE_STORE_DIR or None)
+if not settings.TRADE_STORE_DIR:
+    trade_store.add_many(seed_trades)
+
 
 @router.get("/strategies", response_model=List[TradingStrategy])
 async def get_trading_strategies(is_active: Optional[bool] = None):
     """Get all trading strategies, optionally filtered by active status."""
-    strategies = mock_strategies
-    if is_active is not None:
-        strategies = [s for s in strategies if s["is_active"] == is_active]
-    return strategies
+    return mock_strategies.find(is_active=is_active)
 
 
 @router.get("/strategies/{strategy_id}", response_model=TradingStrategy)
 async def get_trading_strategy(strategy_id: UUID):
     """Get specific trading strategy."""
-    for strategy in mock_strategies:
-        if strategy["id"] == str(strategy_id):
-            return strategy
-    raise HTTPException(status_code=404, detail="Strategy not found")
+    strategy = mock_strategies.get(strategy_id)
+    if strategy is None:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    return strategy
 
 
 @router.post("/strategies", response_model=TradingStrategy)
@@ -202,79 +204,412 @@ async def create_trading_strategy(strategy: TradingStrategyCreate):
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
     }
-    mock_strategies.append(new_strategy)
+    mock_strategies.add(new_strategy)
     return new_strategy
 
 
 @router.put("/strategies/{strategy_id}", response_model=TradingStrategy)
 async def update_trading_strategy(strategy_id: UUID, strategy_update: TradingStrategyUpdate):
     """Update trading strategy."""
-    for i, strategy in enumerate(mock_strategies):
-        if strategy["id"] == str(strategy_id):
-            update_data = strategy_update.dict(exclude_unset=True)
-            mock_strategies[i].update({
-                **update_data,
-                "updated_at": datetime.utcnow()
-            })
-            return mock_strategies[i]
-    raise HTTPException(status_code=404, detail="Strategy not found")
+    update_data = strategy_update.dict(exclude_unset=True)
+    strategy = mock_strategies.update(strategy_id, {
+        **update_data,
+        "updated_at": datetime.utcnow()
+    })
+    if strategy is None:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    if strategy["is_active"]:
+        schedule_strategy(strategy)
+    else:
+        unschedule_strategy(strategy_id)
+    return strategy
 
 
 @router.delete("/strategies/{strategy_id}")
 async def delete_trading_strategy(strategy_id: UUID):
     """Delete trading strategy."""
-    for i, strategy in enumerate(mock_strategies):
-        if strategy["id"] == str(strategy_id):
-            del mock_strategies[i]
-            return {"message": "Strategy deleted successfully"}
-    raise HTTPException(status_code=404, detail="Strategy not found")
+    if mock_strategies.delete(strategy_id) is None:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    unschedule_strategy(strategy_id)
+    return {"message": "Strategy deleted successfully"}
 
 
 @router.post("/strategies/{strategy_id}/activate", response_model=TradingStrategy)
 async def activate_trading_strategy(strategy_id: UUID):
     """Activate a trading strategy."""
-    for i, strategy in enumerate(mock_strategies):
-        mock_strategies[i]["is_active"] = False
-        
-    for i, strategy in enumerate(mock_strategies):
-        if strategy["id"] == str(strategy_id):
-            mock_strategies[i]["is_active"] = True
-            mock_strategies[i]["updated_at"] = datetime.utcnow()
-            return mock_strategies[i]
-            
-    raise HTTPException(status_code=404, detail="Strategy not found")
+    if strategy_id not in mock_strategies:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+
+    for strategy in mock_strategies.find(is_active=True):
+        mock_strategies.update(strategy["id"], {"is_active": False})
+        unschedule_strategy(strategy["id"])
+
+    strategy = mock_strategies.update(strategy_id, {
+        "is_active": True,
+        "updated_at": datetime.utcnow()
+    })
+    schedule_strategy(strategy)
+    return strategy
 
 
 @router.post("/strategies/{strategy_id}/deactivate", response_model=TradingStrategy)
 async def deactivate_trading_strategy(strategy_id: UUID):
     """Deactivate a trading strategy."""
-    for i, strategy in enumerate(mock_strategies):
-        if strategy["id"] == str(strategy_id):
-            mock_strategies[i]["is_active"] = False
-            mock_strategies[i]["updated_at"] = datetime.utcnow()
-            return mock_strategies[i]
-            
-    raise HTTPException(status_code=404, detail="Strategy not found")
+    strategy = mock_strategies.update(strategy_id, {
+        "is_active": False,
+        "updated_at": datetime.utcnow()
+    })
+    if strategy is None:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    unschedule_strategy(strategy_id)
+    return strategy
+
+
+@router.post("/strategies/{strategy_id}/backtest", response_model=BacktestResult)
+async def backtest_trading_strategy(strategy_id: UUID, request: BacktestRequest):
+    """Backtest a trading strategy's config against historical candles."""
+    strategy = mock_strategies.get(strategy_id)
+    if strategy is None:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+
+    config = strategy["config"]
+    symbols = request.symbols or config.get("symbols") or ["BTC/USDT"]
+    timeframe = request.timeframe or (config.get("timeframes") or ["1h"])[0]
+
+    start = perf_counter()
+    try:
+        candles = await run_in_threadpool(
+            load_symbol_candles, Path(settings.BACKTEST_DATA_DIR), symbols, timeframe, request.start, request.end
+        )
+        statistics = await run_in_threadpool(
+            run_backtest, strategy["strategy_type"], config, candles, request.capital, request.fee_rate
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BacktestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        **statistics,
+        "period": "backtest",
+        "strategy_id": strategy["id"],
+        "strategy_type": strategy["strategy_type"],
+        "symbols": symbols,
+        "timeframe": timeframe,
+        "elapsed_ms": (perf_counter() - start) * 1000,
+    }
+
+
+@router.post("/strategies/{strategy_id}/optimize")
+async def optimize_trading_strategy(strategy_id: UUID, request: OptimizationRequest):
+    """Sweep a trading strategy's config parameters and stream the best results.
+
+    The response is newline-delimited JSON: one line each time the best
+    ``top_n`` configs change, then a final line with ``"done": true``.
+    """
+    strategy = mock_strategies.get(strategy_id)
+    if strategy is None:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+
+    config = strategy["config"]
+    symbols = request.symbols or config.get("symbols") or ["BTC/USDT"]
+    timeframe = request.timeframe or (config.get("timeframes") or ["1h"])[0]
+    parameters = {
+        name: space if isinstance(space, list) else space.dict()
+        for name, space in request.parameters.items()
+    }
+
+    try:
+        if request.objective not in strategy_optimizer.OBJECTIVES:
+            raise BacktestError(f"Unknown objective: {request.objective}")
+        candidates, total = strategy_optimizer.build_candidates(
+            parameters, request.search, request.samples, request.seed, settings.OPTIMIZER_MAX_CANDIDATES
+        )
+        data_dir = Path(settings.BACKTEST_DATA_DIR)
+        sources = {symbol: resolve_candle_path(data_dir, symbol, timeframe) for symbol in symbols}
+        paths = await run_in_threadpool(
+            strategy_optimizer.share_candles, sources, Path(settings.OPTIMIZER_CACHE_DIR)
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BacktestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def results():
+        started = perf_counter()
+        async for update in strategy_optimizer.optimize(
+            paths,
+            strategy["strategy_type"],
+            config,
+            candidates,
+            total,
+            start=request.start,
+            end=request.end,
+            capital=request.capital,
+            fee_rate=request.fee_rate,
+            objective=request.objective,
+            maximize=request.maximize,
+            top_n=request.top_n,
+            workers=settings.OPTIMIZER_WORKERS or None,
+        ):
+            update["elapsed_ms"] = (perf_counter() - started) * 1000
+            yield json.dumps(update, default=str) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.on_event("shutdown")
+async def shutdown_optimizer_pool():
+    strategy_optimizer.shutdown_pool()
+
+
+@router.on_event("shutdown")
+async def flush_trade_store():
+    trade_store.flush()
+
+
+market_feed: Optional[MarketDataFeed] = None
+strategy_scheduler: Optional[StrategyScheduler] = None
+grid_engine = GridEngine()
+
+
+def schedule_strategy(strategy: Dict[str, Any]) -> None:
+    if strategy["strategy_type"] == "Smart Grid":
+        symbol = (strategy["config"].get("symbols") or ["BTC/USDT"])[0]
+        try:
+            grid_engine.add(
+                strategy["id"],
+                symbol,
+                strategy["config"],
+                trade_store.find(strategy_id=str(strategy["id"]), symbol=symbol, status="open"),
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif strategy_scheduler is not None:
+        strategy_scheduler.register(strategy)
+
+
+def unschedule_strategy(strategy_id: Any) -> None:
+    grid_engine.remove(strategy_id)
+    if strategy_scheduler is not None:
+        strategy_scheduler.unregister(strategy_id)
+
+
+def record_fills(fills: List[Fill]) -> None:
+    """Record grid fills: buys open a trade, sells close it."""
+    now = datetime.utcnow()
+    for fill in fills:
+        if fill.side == "buy":
+            trade_store.add({
+                "id": fill.trade_id,
+                "strategy_id": fill.grid_id,
+                "symbol": fill.symbol,
+                "side": "buy",
+                "quantity": fill.quantity,
+                "price": fill.price,
+                "status": "open",
+                "profit_loss": None,
+                "close_price": None,
+                "close_time": None,
+                "created_at": now,
+                "updated_at": now,
+            })
+        else:
+            trade_store.update(fill.trade_id, {
+                "status": "closed",
+                "profit_loss": fill.profit_loss,
+                "close_price": fill.price,
+                "close_time": now,
+                "updated_at": now,
+            })
+
+
+def on_price_tick(symbol: str, price: float, received_at: float) -> None:
+    fills = grid_engine.on_price(symbol, price)
+    if fills:
+        record_fills(fills)
+
+
+async def submit_decision(strategy: Dict[str, Any], decision: Decision) -> Optional[Dict[str, Any]]:
+    """Record a scheduler decision as a paper trade."""
+    now = datetime.utcnow()
+    if decision.action == "open":
+        return trade_store.add({
+            "id": str(uuid4()),
+            "strategy_id": str(strategy["id"]),
+            "symbol": decision.symbol,
+            "side": "buy",
+            "quantity": decision.quantity,
+            "price": decision.price,
+            "status": "open",
+            "profit_loss": None,
+            "close_price": None,
+            "close_time": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+    trade = trade_store.get(decision.trade_id)
+    if trade is None:
+        return None
+    return trade_store.update(decision.trade_id, {
+        "status": "closed",
+        "profit_loss": close_profit_loss(trade, decision.price),
+        "close_price": decision.price,
+        "close_time": now,
+        "updated_at": now,
+    })
+
+
+@router.on_event("startup")
+async def start_market_feed():
+    global market_feed, strategy_scheduler
+    symbols = [symbol.strip() for symbol in settings.MARKET_DATA_SYMBOLS.split(",") if symbol.strip()]
+    if not symbols:
+        return
+    intervals = [interval.strip() for interval in settings.MARKET_DATA_INTERVALS.split(",") if interval.strip()]
+
+    strategy_scheduler = StrategyScheduler(
+        lambda symbol, interval, limit: market_feed.candles(symbol, interval, limit) if market_feed else None,
+        lambda strategy_id, symbol: trade_store.find(strategy_id=strategy_id, symbol=symbol, status="open"),
+        submit_decision,
+        concurrency_per_key=settings.STRATEGY_SCHEDULER_CONCURRENCY,
+        window=settings.MARKET_DATA_BUFFER_SIZE,
+    )
+    for strategy in mock_strategies.find(is_active=True):
+        schedule_strategy(strategy)
+
+    # Also stream the pairs and grid symbols of strategies that are active right now.
+    streams = stream_names(symbols, intervals) + [
+        f"{symbol.lower()}@kline_{timeframe}" for symbol, timeframe in strategy_scheduler.pairs()
+    ] + [f"{symbol.lower()}@miniTicker" for symbol in grid_engine.symbols()]
+    market_feed = MarketDataFeed(
+        websocket_connector(settings.MARKET_DATA_URL),
+        list(dict.fromkeys(streams)),
+        capacity=settings.MARKET_DATA_BUFFER_SIZE,
+    )
+    market_feed.add_listener(strategy_scheduler.on_candle)
+    market_feed.add_price_listener(on_price_tick)
+    market_feed.start()
+    strategy_scheduler.start()
+
+
+@router.on_event("shutdown")
+async def stop_market_feed():
+    if strategy_scheduler is not None:
+        await strategy_scheduler.stop()
+    if market_feed is not None:
+        await market_feed.stop()
+
+
+@router.get("/scheduler/stats", response_model=Dict[str, Any])
+async def get_scheduler_stats():
+    """Get evaluation counts and tick-to-decision latency of the live strategy scheduler."""
+    if strategy_scheduler is None:
+        return {"running": False}
+    return strategy_scheduler.stats()
+
+
+@router.get("/grids/stats", response_model=Dict[str, Any])
+async def get_grid_stats():
+    """Get grid counts, fills and per-tick latency of the Smart Grid engine."""
+    return grid_engine.stats()
+
+
+@router.get("/strategies/{strategy_id}/grid", response_model=Dict[str, Any])
+async def get_strategy_grid(strategy_id: UUID):
+    """Get the resting buy, sell and idle levels of an active Smart Grid strategy."""
+    grid = grid_engine.get(strategy_id)
+    if grid is None:
+        raise HTTPException(status_code=404, detail="No running grid for this strategy")
+    return grid.snapshot()
+
+
+@router.get("/market-data/stats", response_model=Dict[str, Any])
+async def get_market_data_stats():
+    """Get ingestion throughput, queue depth and latency of the market-data feed."""
+    if market_feed is None:
+        return {"running": False}
+    return market_feed.stats()
+
+
+@router.get("/market-data/candles", response_model=List[Dict[str, Any]])
+async def get_market_data_candles(
+    symbol: str,
+    interval: str = "1m",
+    limit: int = Query(100, ge=1),
+):
+    """Get the latest candles received for a symbol; use interval=ticker for 24h mini tickers."""
+    candles = market_feed.candles(symbol, interval, limit) if market_feed is not None else None
+    if candles is None:
+        raise HTTPException(status_code=404, detail="No market data for this symbol and interval")
+    columns = [column.tolist() for column in candles]
+    return [dict(zip(CANDLE_COLUMNS, row)) for row in zip(*columns)]
 
 
 @router.get("/api-keys", response_model=List[APIKey])
 async def get_api_keys(platform: Optional[str] = None, is_active: Optional[bool] = None):
     """Get all API keys, optionally filtered by platform and active status."""
-    keys = mock_api_keys
-    if platform:
-        keys = [k for k in keys if k["platform"] == platform]
-    if is_active is not None:
-        keys = [k for k in keys if k["is_active"] == is_active]
-    return keys
+    return mock_api_keys.find(platform=platform or None, is_active=is_active)
+
+
+@router.get("/api-keys/encryption-stats", response_model=Dict[str, Any])
+async def get_api_key_encryption_stats():
+    """Get key fingerprints and encryption latency for API key storage."""
+    return key_manager.stats()
+
+
+@router.post("/api-keys/rotate", response_model=Dict[str, Any])
+async def rotate_api_key_encryption(rotation: APIKeyRotation):
+    """Rotate the API key encryption key and re-encrypt every stored API key.
+
+    That includes the affiliate networks' API keys, which share the cipher.
+
+    The new key only takes effect once every stored key has been
+    re-encrypted under it; a key that fails leaves the old encryption in
+    place. Without ``API_KEY_KEYRING_FILE`` the new key is not persisted:
+    add it to ``API_KEY_PREVIOUS_KEYS`` before restarting, and old keys
+    cannot be retired, since they would be the only ones left after it.
+    """
+    if rotation.retire_old_keys and not key_manager.persistent:
+        raise HTTPException(
+            status_code=409,
+            detail="Retiring old keys requires API_KEY_KEYRING_FILE, or the new key is lost on restart",
+        )
+    start = perf_counter()
+    try:
+        new_key, reencrypted, retired_keys = key_manager.rotate(
+            rotation.key.encode(),
+            mock_api_keys,
+            batch_size=rotation.batch_size,
+            retire_old_keys=rotation.retire_old_keys,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Fernet key")
+    except InvalidToken:
+        raise HTTPException(status_code=409, detail="A stored API key cannot be decrypted; nothing was rotated")
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save the keyring; nothing was rotated: {str(e)}")
+    elapsed_ms = (perf_counter() - start) * 1000
+
+    result = {
+        "primary_key": key_fingerprint(new_key),
+        "reencrypted_keys": reencrypted,
+        "retired_keys": retired_keys,
+        "persisted": key_manager.persistent,
+        "elapsed_ms": elapsed_ms,
+    }
+    if not key_manager.persistent:
+        result["warning"] = "The new key is not persisted; add it to API_KEY_PREVIOUS_KEYS before restarting"
+    return result
 
 
 @router.get("/api-keys/{key_id}", response_model=APIKey)
 async def get_api_key(key_id: UUID):
     """Get specific API key."""
-    for key in mock_api_keys:
-        if key["id"] == str(key_id):
-            return key
-    raise HTTPException(status_code=404, detail="API key not found")
+    key = mock_api_keys.get(key_id)
+    if key is None:
+        raise HTTPException(status_code=404, detail="API key not found")
+    return key
 
 
 @router.post("/api-keys", response_model=APIKey)
@@ -293,88 +628,144 @@ async def create_api_key(key: APIKeyCreate):
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
     }
-    mock_api_keys.append(new_key)
+    mock_api_keys.add(new_key)
     return new_key
 
 
 @router.put("/api-keys/{key_id}", response_model=APIKey)
 async def update_api_key(key_id: UUID, key_update: APIKeyUpdate):
     """Update API key."""
-    for i, key in enumerate(mock_api_keys):
-        if key["id"] == str(key_id):
-            update_data = key_update.dict(exclude_unset=True)
-            
-            if "key" in update_data:
-                update_data["encrypted_key"] = encrypt_api_key(update_data.pop("key"))
-            if "secret" in update_data:
-                update_data["encrypted_secret"] = encrypt_api_key(update_data.pop("secret"))
-                
-            mock_api_keys[i].update({
-                **update_data,
-                "updated_at": datetime.utcnow()
-            })
-            return mock_api_keys[i]
-    raise HTTPException(status_code=404, detail="API key not found")
+    if key_id not in mock_api_keys:
+        raise HTTPException(status_code=404, detail="API key not found")
+
+    update_data = key_update.dict(exclude_unset=True)
+    
+    if "key" in update_data:
+        update_data["encrypted_key"] = encrypt_api_key(update_data.pop("key"))
+    if "secret" in update_data:
+        update_data["encrypted_secret"] = encrypt_api_key(update_data.pop("secret"))
+        
+    return mock_api_keys.update(key_id, {
+        **update_data,
+        "updated_at": datetime.utcnow()
+    })
 
 
 @router.delete("/api-keys/{key_id}")
 async def delete_api_key(key_id: UUID):
     """Delete API key."""
-    for i, key in enumerate(mock_api_keys):
-        if key["id"] == str(key_id):
-            del mock_api_keys[i]
-            return {"message": "API key deleted successfully"}
-    raise HTTPException(status_code=404, detail="API key not found")
+    if mock_api_keys.delete(key_id) is None:
+        raise HTTPException(status_code=404, detail="API key not found")
+    return {"message": "API key deleted successfully"}
 
 
 @router.post("/api-keys/{key_id}/validate", response_model=Dict[str, Any])
 async def validate_api_key(key_id: UUID):
     """Validate an API key with the exchange."""
-    for key in mock_api_keys:
-        if key["id"] == str(key_id):
-            return {
-                "valid": True,
-                "permissions": ["spot", "futures", "margin"],
-                "message": "API key is valid"
-            }
-    raise HTTPException(status_code=404, detail="API key not found")
+    key = mock_api_keys.get(key_id)
+    if key is None:
+        raise HTTPException(status_code=404, detail="API key not found")
+
+    start = perf_counter()
+    api_key = decrypt_api_key(key["encrypted_key"])
+    api_secret = decrypt_api_key(key["encrypted_secret"])
+    crypto_latency_us = (perf_counter() - start) * 1_000_000
+    return {
+        "valid": bool(api_key and api_secret),
+        "permissions": ["spot", "futures", "margin"],
+        "message": "API key is valid",
+        "crypto_latency_us": crypto_latency_us,
+    }
 
 
 @router.get("/trades", response_model=List[Trade])
 async def get_trades(
     strategy_id: Optional[UUID] = None,
     symbol: Optional[str] = None,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
 ):
     """Get all trades, optionally filtered by strategy, symbol, and status."""
-    trades = mock_trades
-    if strategy_id:
-        trades = [t for t in trades if t["strategy_id"] == str(strategy_id)]
-    if symbol:
-        trades = [t for t in trades if t["symbol"] == symbol]
-    if status:
-        trades = [t for t in trades if t["status"] == status]
-    return trades
+    return trade_store.find(
+        strategy_id=str(strategy_id) if strategy_id else None,
+        symbol=symbol or None,
+        status=status or None,
+        limit=limit,
+        offset=offset,
+    )
+
+
+def validate_imported_trade(row: Dict[str, Any]) -> Dict[str, Any]:
+    trade = TradeImport(**row)
+    if trade.strategy_id not in mock_strategies:
+        raise ValueError(f"Strategy not found: {trade.strategy_id}")
+    now = datetime.utcnow()
+    return {
+        **trade.dict(),
+        "id": str(trade.id or uuid4()),
+        "strategy_id": str(trade.strategy_id),
+        "created_at": trade.created_at or now,
+        "updated_at": trade.updated_at or trade.created_at or now,
+    }
+
+
+@router.post("/trades/import", response_model=TradeImportResult)
+async def import_trades(request: Request, format: Optional[str] = Query(None, regex="^(ndjson|csv)$")):
+    """Bulk-import trades from an NDJSON or CSV request body.
+
+    The body is read as a stream and rows are validated and inserted in
+    batches, so uploads of any size use constant memory. Rows with an
+    existing id overwrite that trade. The format defaults to CSV for
+    ``text/csv`` bodies and NDJSON otherwise.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    rows = parse_rows(iter_lines(request.stream()), fmt)
+    return await import_rows(rows, trade_store, validate_imported_trade)
+
+
+@router.get("/trades/export")
+async def export_trades(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    cursor: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    strategy_id: Optional[UUID] = None,
+    symbol: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """Stream trades as NDJSON or CSV, oldest first.
+
+    Without ``limit`` every matching trade from ``cursor`` on is streamed.
+    With it, the response holds one page and, if more trades follow, an
+    ``X-Next-Cursor`` header to pass as ``cursor`` for the next page.
+    """
+    filters = {
+        "strategy_id": str(strategy_id) if strategy_id else None,
+        "symbol": symbol or None,
+        "status": status or None,
+    }
+    stop = trade_store.page_end(cursor, limit, **filters) if limit else None
+    headers = {"X-Next-Cursor": str(stop)} if stop is not None else {}
+    return StreamingResponse(
+        export_lines(trade_store, format, cursor, stop, **filters),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers=headers,
+    )
 
 
 @router.get("/trades/{trade_id}", response_model=Trade)
 async def get_trade(trade_id: UUID):
     """Get specific trade."""
-    for trade in mock_trades:
-        if trade["id"] == str(trade_id):
-            return trade
-    raise HTTPException(status_code=404, detail="Trade not found")
+    trade = trade_store.get(trade_id)
+    if trade is None:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    return trade
 
 
 @router.post("/trades", response_model=Trade)
 async def create_trade(trade: TradeCreate):
     """Create new trade."""
-    strategy_found = False
-    for strategy in mock_strategies:
-        if str(trade.strategy_id) == strategy["id"]:
-            strategy_found = True
-            break
-    if not strategy_found:
+    if trade.strategy_id not in mock_strategies:
         raise HTTPException(status_code=404, detail="Strategy not found")
 
     new_trade = {
@@ -384,80 +775,42 @@ async def create_trade(trade: TradeCreate):
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
     }
-    mock_trades.append(new_trade)
-    return new_trade
+    try:
+        trade_store.check(new_trade)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return trade_store.add(new_trade)
 
 
 @router.put("/trades/{trade_id}", response_model=Trade)
 async def update_trade(trade_id: UUID, trade_update: TradeUpdate):
     """Update trade."""
-    for i, trade in enumerate(mock_trades):
-        if trade["id"] == str(trade_id):
-            update_data = trade_update.dict(exclude_unset=True)
-            mock_trades[i].update({
-                **update_data,
-                "updated_at": datetime.utcnow()
-            })
-            return mock_trades[i]
-    raise HTTPException(status_code=404, detail="Trade not found")
+    update_data = trade_update.dict(exclude_unset=True)
+    try:
+        trade_store.check(update_data)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    trade = trade_store.update(trade_id, {
+        **update_data,
+        "updated_at": datetime.utcnow()
+    })
+    if trade is None:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    return trade
 
 
 @router.delete("/trades/{trade_id}")
 async def delete_trade(trade_id: UUID):
     """Delete trade."""
-    for i, trade in enumerate(mock_trades):
-        if trade["id"] == str(trade_id):
-            del mock_trades[i]
-            return {"message": "Trade deleted successfully"}
-    raise HTTPException(status_code=404, detail="Trade not found")
+    if trade_store.delete(trade_id) is None:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    return {"message": "Trade deleted successfully"}
 
 
 @router.get("/statistics", response_model=TradingStatistics)
 async def get_trading_statistics(period: str = "all-time"):
     """Get trading statistics for a specific period."""
-    filtered_trades = mock_trades
-    if period == "daily":
-        filtered_trades = [t for t in mock_trades if t["created_at"] >= datetime.utcnow() - timedelta(days=1)]
-    elif period == "weekly":
-        filtered_trades = [t for t in mock_trades if t["created_at"] >= datetime.utcnow() - timedelta(weeks=1)]
-    elif period == "monthly":
-        filtered_trades = [t for t in mock_trades if t["created_at"] >= datetime.utcnow() - timedelta(days=30)]
-    
-    total_trades = len(filtered_trades)
-    closed_trades = [t for t in filtered_trades if t["status"] == "closed"]
-    winning_trades = sum(1 for t in closed_trades if t["profit_loss"] and t["profit_loss"] > 0)
-    losing_trades = sum(1 for t in closed_trades if t["profit_loss"] and t["profit_loss"] < 0)
-    
-    win_rate = 0
-    if len(closed_trades) > 0:
-        win_rate = (winning_trades / len(closed_trades)) * 100
-        
-    profit_loss = sum(t["profit_loss"] for t in closed_trades if t["profit_loss"])
-    
-    max_drawdown = 0
-    if losing_trades > 0:
-        max_drawdown = min(t["profit_loss"] for t in closed_trades if t["profit_loss"] and t["profit_loss"] < 0)
-    
-    durations = []
-    for trade in closed_trades:
-        if trade["close_time"] and isinstance(trade["created_at"], datetime) and isinstance(trade["close_time"], datetime):
-            duration = (trade["close_time"] - trade["created_at"]).total_seconds() / 3600  # hours
-            durations.append(duration)
-    
-    avg_trade_duration = 0
-    if durations:
-        avg_trade_duration = sum(durations) / len(durations)
-    
-    return {
-        "total_trades": total_trades,
-        "winning_trades": winning_trades,
-        "losing_trades": losing_trades,
-        "win_rate": win_rate,
-        "profit_loss": profit_loss,
-        "max_drawdown": abs(max_drawdown),  # Return as positive value
-        "avg_trade_duration": avg_trade_duration,
-        "period": period
-    }
+    return trade_store.statistics(period)
 
 
 @router.post("/system-test", response_model=Dict[str, Any])
@@ -471,7 +824,7 @@ async def run_system_test():
                 "message": "Strategy management is working properly",
                 "details": {
                     "total_strategies": len(mock_strategies),
-                    "active_strategies": sum(1 for s in mock_strategies if s["is_active"]),
+                    "active_strategies": mock_strategies.count(is_active=True),
                 }
             },
             "api_key_management": {
@@ -479,16 +832,16 @@ async def run_system_test():
                 "message": "API key management is working properly",
                 "details": {
                     "total_keys": len(mock_api_keys),
-                    "active_keys": sum(1 for k in mock_api_keys if k["is_active"]),
+                    "active_keys": mock_api_keys.count(is_active=True),
                 }
             },
             "trade_execution": {
                 "status": "success",
                 "message": "Trade execution is working properly",
                 "details": {
-                    "total_trades": len(mock_trades),
-                    "open_trades": sum(1 for t in mock_trades if t["status"] == "open"),
-                    "closed_trades": sum(1 for t in mock_trades if t["status"] == "closed"),
+                    "total_trades": len(trade_store),
+                    "open_trades": trade_store.count(status="open"),
+                    "closed_trades": trade_store.count(status="closed"),
                 }
             },
             "risk_management": {
@@ -0,0 +1,76 @@
+from .affiliate_metrics import AffiliateMetrics
+from .backtesting import BacktestError, Candles, load_candles, run_backtest
+from .catalog_sync import CatalogSync
+from .click_filter import BloomFilter, ClickFilter, HyperLogLog, SlidingWindowCounter
+from .click_tracking import Click, ClickBuffer, LinkIndex
+from .dashboard import DashboardSnapshot, GroupTotals
+from .earnings_reconciliation import iter_json_batches, reconcile_rows
+from .grid_engine import Fill, GridEngine
+from .http_caching import not_modified
+from .image_jobs import ImageJob, ImageJobQueue, prompt_key
+from .key_management import KeyManager, key_manager
+from .market_data import MarketDataFeed, RingBuffer
+from .link_counters import LinkCounters
+from .link_health import Health, LinkHealthChecker
+from .media_store import MediaError, MediaStore
+from .metrics import LatencyHistogram
+from .platform_publisher import PlatformPublisher
+from .post_dispatcher import PostDispatcher
+from .product_ranking import ProductRanking
+from .product_search import ProductIndex
+from .rate_limit import TokenBucket
+from .repository import InMemoryRepository
+from .strategy_optimizer import build_candidates, optimize, share_candles
+from .strategy_scheduler import Decision, StrategyScheduler
+from .trade_io import export_lines, import_rows
+from .trade_store import TradeStore
+
+__all__ = [
+    "AffiliateMetrics",
+    "BacktestError",
+    "Candles",
+    "load_candles",
+    "run_backtest",
+    "CatalogSync",
+    "BloomFilter",
+    "ClickFilter",
+    "HyperLogLog",
+    "SlidingWindowCounter",
+    "Click",
+    "ClickBuffer",
+    "LinkIndex",
+    "DashboardSnapshot",
+    "GroupTotals",
+    "iter_json_batches",
+    "reconcile_rows",
+    "Fill",
+    "GridEngine",
+    "not_modified",
+    "ImageJob",
+    "ImageJobQueue",
+    "prompt_key",
+    "KeyManager",
+    "key_manager",
+    "MarketDataFeed",
+    "RingBuffer",
+    "LinkCounters",
+    "Health",
+    "LinkHealthChecker",
+    "MediaError",
+    "MediaStore",
+    "LatencyHistogram",
+    "PlatformPublisher",
+    "PostDispatcher",
+    "ProductRanking",
+    "ProductIndex",
+    "TokenBucket",
+    "InMemoryRepository",
+    "build_candidates",
+    "optimize",
+    "share_candles",
+    "Decision",
+    "StrategyScheduler",
+    "export_lines",
+    "import_rows",
+    "TradeStore",
+]
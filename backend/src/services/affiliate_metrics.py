@@ -0,0 +1,110 @@
+from time import time
+from typing import Dict, List, Optional
+
+ALL_LINKS = "*"
+RESOLUTIONS = (60, 3_600, 86_400)  # minute, hour, day buckets
+
+
+class AffiliateMetrics:
+    """Clicks, conversions and revenue per affiliate link in time buckets that roll up as they age.
+
+    New events land in minute buckets. ``compact`` folds minute buckets
+    older than ``minute_retention`` seconds into hour buckets, and hour
+    buckets older than ``hour_retention`` into day buckets, so the number
+    of buckets grows with the age of the data in days, not with traffic.
+    Each bucket holds every link's values plus their sum under
+    ``ALL_LINKS``; period totals and sparklines visit buckets, never links.
+
+    A window is answered at the resolution of the oldest buckets it
+    reaches: a bucket counts if any part of it falls inside the window.
+    """
+
+    def __init__(self, minute_retention: float = 2 * 3_600, hour_retention: float = 3 * 86_400):
+        self._retention = (minute_retention, hour_retention)
+        self._buckets: List[Dict[int, Dict[str, List[float]]]] = [{} for _ in RESOLUTIONS]
+        self._compacted_at = time()
+
+    def __len__(self) -> int:
+        """Number of stored buckets across all resolutions."""
+        return sum(len(buckets) for buckets in self._buckets)
+
+    def record(self, link_id: str, timestamp: float, clicks: int = 0, conversions: int = 0, revenue: float = 0.0) -> None:
+        """Add events at ``timestamp``, into the bucket its age would have been compacted to."""
+        level = self._level(self._compacted_at - timestamp)
+        size = RESOLUTIONS[level]
+        bucket = self._buckets[level].setdefault(int(timestamp // size) * size, {})
+        for key in (link_id, ALL_LINKS):
+            values = bucket.get(key)
+            if values is None:
+                bucket[key] = [clicks, conversions, revenue]
+            else:
+                values[0] += clicks
+                values[1] += conversions
+                values[2] += revenue
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Roll aged buckets up a resolution and return how many were folded."""
+        now = time() if now is None else now
+        self._compacted_at = now
+        folded = 0
+        for level, retention in enumerate(self._retention):
+            source, target = self._buckets[level], self._buckets[level + 1]
+            size = RESOLUTIONS[level + 1]
+            for start in [start for start in source if now - start > retention]:
+                bucket = target.setdefault(start // size * size, {})
+                for key, values in source.pop(start).items():
+                    into = bucket.get(key)
+                    if into is None:
+                        bucket[key] = values
+                    else:
+                        into[0] += values[0]
+                        into[1] += values[1]
+                        into[2] += values[2]
+                folded += 1
+        return folded
+
+    def totals(self, since: Optional[float] = None, link_id: str = ALL_LINKS) -> List[float]:
+        """Clicks, conversions and revenue from ``since`` (epoch seconds) on, or over all time."""
+        values: List[float] = [0, 0, 0.0]
+        for size, buckets in zip(RESOLUTIONS, self._buckets):
+            for start, bucket in buckets.items():
+                if since is not None and start + size <= since:
+                    continue
+                found = bucket.get(link_id)
+                if found is not None:
+                    values[0] += found[0]
+                    values[1] += found[1]
+                    values[2] += found[2]
+        return values
+
+    def series(self, start: float, end: float, points: int, link_id: str = ALL_LINKS) -> List[List[float]]:
+        """``points`` equal steps of clicks, conversions and revenue between ``start`` and ``end``.
+
+        Buckets coarser than a step land whole in the step they start in.
+        """
+        step = (end - start) / points
+        series: List[List[float]] = [[0, 0, 0.0] for _ in range(points)]
+        for size, buckets in zip(RESOLUTIONS, self._buckets):
+            for bucket_start, bucket in buckets.items():
+                if bucket_start + size <= start or bucket_start >= end:
+                    continue
+                found = bucket.get(link_id)
+                if found is None:
+                    continue
+                point = series[min(points - 1, max(0, int((bucket_start - start) // step)))]
+                point[0] += found[0]
+                point[1] += found[1]
+                point[2] += found[2]
+        return series
+
+    def forget(self, link_id: str) -> None:
+        """Drop a deleted link's series; the all-links sums keep its history."""
+        for buckets in self._buckets:
+            for bucket in buckets.values():
+                bucket.pop(link_id, None)
+
+    def _level(self, age: float) -> int:
+        for level, retention in enumerate(self._retention):
+            if age <= retention:
+                return level
+        return len(self._retention)
@@ -0,0 +1,427 @@
+import calendar
+import math
+import os
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+CANDLE_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+CANDLE_SUFFIXES = (".npy", ".parquet", ".csv")
+
+MS_PER_HOUR = 3_600_000
+
+
+class BacktestError(ValueError):
+    """Raised when a strategy config or candle file cannot be backtested."""
+
+
+class Candles(NamedTuple):
+    """OHLCV columns; ``timestamp`` is milliseconds since the epoch."""
+
+    timestamp: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def between(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> "Candles":
+        lo = 0 if start_ms is None else int(np.searchsorted(self.timestamp, start_ms, side="left"))
+        hi = len(self) if end_ms is None else int(np.searchsorted(self.timestamp, end_ms, side="right"))
+        return Candles(*(column[lo:hi] for column in self))
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray) -> "Candles":
+        """Build from an (n, 6) array in ``CANDLE_COLUMNS`` order."""
+        if matrix.ndim != 2 or matrix.shape[1] < len(CANDLE_COLUMNS):
+            raise BacktestError("Candle data must have timestamp, open, high, low, close and volume columns")
+        timestamp = matrix[:, 0].astype(np.int64)
+        return cls(timestamp, *(np.asarray(matrix[:, i], dtype=np.float64) for i in range(1, 6)))
+
+
+class SymbolResult(NamedTuple):
+    """Backtest output for one symbol.
+
+    ``pnl`` holds one entry per closed trade, ``equity`` is the
+    mark-to-market P&L at every candle and ``holding_hours`` is the summed
+    time positions were held.
+    """
+
+    pnl: np.ndarray
+    equity: np.ndarray
+    holding_hours: float
+
+
+def symbol_filename(symbol: str, timeframe: str) -> str:
+    return f"{symbol.replace('/', '').upper()}_{timeframe}"
+
+
+def resolve_candle_path(data_dir: Path, symbol: str, timeframe: str) -> Path:
+    """Find the candle file for ``symbol``/``timeframe`` in ``data_dir``."""
+    stem = symbol_filename(symbol, timeframe)
+    for suffix in CANDLE_SUFFIXES:
+        path = data_dir / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No candle data for {symbol} {timeframe} in {data_dir}")
+
+
+def to_epoch_ms(moment: datetime) -> int:
+    """Milliseconds since the epoch; naive datetimes are taken as UTC."""
+    return calendar.timegm(moment.utctimetuple()) * 1000
+
+
+def load_symbol_candles(
+    data_dir: Path,
+    symbols: List[str],
+    timeframe: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, Candles]:
+    """Load and trim the candles of every symbol for a backtest."""
+    start_ms = to_epoch_ms(start) if start else None
+    end_ms = to_epoch_ms(end) if end else None
+    return {
+        symbol: load_candles(resolve_candle_path(data_dir, symbol, timeframe)).between(start_ms, end_ms)
+        for symbol in symbols
+    }
+
+
+def load_candles(path: Path) -> Candles:
+    """Load OHLCV candles from a ``.csv``, ``.parquet`` or ``.npy`` file.
+
+    Parsed files are cached per process and invalidated when the file's
+    modification time changes. ``.npy`` files are memory-mapped.
+    """
+    path = Path(path)
+    return _load_candles(str(path), path.stat().st_mtime_ns)
+
+
+@lru_cache(maxsize=64)
+def _load_candles(path: str, mtime_ns: int) -> Candles:
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".npy":
+        matrix = np.load(path, mmap_mode="r")
+    elif suffix == ".csv":
+        with open(path) as f:
+            first = f.readline()
+        has_header = not first.split(",")[0].strip().lstrip("-").replace(".", "", 1).isdigit()
+        matrix = np.loadtxt(path, delimiter=",", skiprows=1 if has_header else 0, usecols=range(6), ndmin=2)
+    elif suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise BacktestError("Reading Parquet candle files requires pyarrow")
+        table = pq.read_table(path, columns=list(CANDLE_COLUMNS))
+        matrix = np.column_stack([table.column(name).to_numpy() for name in CANDLE_COLUMNS])
+    else:
+        raise BacktestError(f"Unsupported candle file type: {suffix}")
+    return Candles.from_matrix(matrix)
+
+
+def ema(values: np.ndarray, span: Optional[float] = None, alpha: Optional[float] = None) -> np.ndarray:
+    """Exponential moving average seeded with the first value.
+
+    The recurrence ``y[k] = d * y[k-1] + a * x[k]`` is evaluated block by
+    block in closed form, so the Python loop runs once per block instead of
+    once per value.
+    """
+    a = alpha if alpha is not None else 2.0 / (span + 1.0)
+    values = np.asarray(values, dtype=np.float64)
+    if a >= 1.0 or len(values) == 0:
+        return values.copy()
+    d = 1.0 - a
+    # Keep d ** -block well inside float64 range.
+    block = int(max(1, min(4096, 200.0 / -math.log10(d))))
+    exponents = np.arange(block, dtype=np.float64)
+    decay = d ** exponents
+    growth = d ** -exponents
+    out = np.empty_like(values)
+    state = values[0]
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        m = len(chunk)
+        weighted = np.cumsum(chunk * growth[:m])
+        out[start:start + m] = decay[:m] * (d * state + a * weighted)
+        state = out[start + m - 1]
+    return out
+
+
+def rsi(close: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's relative strength index."""
+    delta = np.diff(close, prepend=close[:1])
+    avg_gain = ema(np.maximum(delta, 0.0), alpha=1.0 / period)
+    avg_loss = ema(np.maximum(-delta, 0.0), alpha=1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+    out = 100.0 - 100.0 / (1.0 + rs)
+    out[avg_loss == 0] = 100.0
+    out[(avg_loss == 0) & (avg_gain == 0)] = 50.0
+    return out
+
+
+def _first_true(mask: np.ndarray) -> Optional[int]:
+    index = int(np.argmax(mask)) if len(mask) else 0
+    return index if len(mask) and mask[index] else None
+
+
+def backtest_smart_grid(candles: Candles, config: Dict[str, Any], capital: float, fee_rate: float) -> SymbolResult:
+    """Geometric grid centred on the first close.
+
+    Each level buys ``capital / grid_levels`` of quote currency and sells one
+    level higher. With ``L`` the level index of the close and ``H`` its
+    running maximum, the filled-but-unsold buys are exactly the levels
+    ``L..H-1``, which makes inventory, realized round trips and
+    mark-to-market equity closed-form array expressions.
+    """
+    levels = int(config.get("grid_levels", 10))
+    spacing = float(config.get("grid_spacing", 1.0)) / 100
+    if levels < 1 or spacing <= 0:
+        raise BacktestError("Smart Grid needs grid_levels >= 1 and grid_spacing > 0")
+    close = candles.close
+    ratio = 1.0 + spacing
+    lower = close[0] / ratio ** (levels / 2)
+    quote = capital / levels
+    round_trip_pnl = quote * spacing - fee_rate * quote * (2.0 + spacing)
+
+    level = np.clip(np.floor(np.log(close / lower) / math.log(ratio)), 0, levels).astype(np.int64)
+    high_water = np.maximum.accumulate(level)
+    inventory = high_water - level
+
+    # Cost of the open levels is quote each; their value follows the close.
+    inv_ratio = 1.0 / ratio
+    inv_powers = inv_ratio ** np.arange(levels + 1)
+    level_value = quote * close / lower * inv_powers[level] * (1.0 - inv_powers[inventory]) / (1.0 - inv_ratio)
+    unrealized = level_value - inventory * quote
+
+    ups = np.concatenate(([0], np.maximum(np.diff(level), 0))).cumsum()
+    round_trips = ups - (high_water - high_water[0])
+    equity = round_trips * round_trip_pnl + unrealized
+
+    stop = len(close) - 1
+    stop_loss = config.get("stop_loss")
+    if stop_loss:
+        hit = _first_true(close <= lower * (1.0 - float(stop_loss) / 100))
+        if hit is not None:
+            stop = hit
+    take_profit = config.get("take_profit")
+    if take_profit:
+        hit = _first_true(equity[: stop + 1] >= capital * float(take_profit) / 100)
+        if hit is not None:
+            stop = hit
+
+    open_levels = np.arange(level[stop], high_water[stop])
+    liquidation = quote * close[stop] / (lower * ratio ** open_levels) * (1.0 - fee_rate) - quote * (1.0 + fee_rate)
+    pnl = np.concatenate((np.full(int(round_trips[stop]), round_trip_pnl), liquidation))
+
+    equity = equity[: stop + 1].copy()
+    equity[-1] = round_trips[stop] * round_trip_pnl + liquidation.sum()
+    dt_hours = np.diff(candles.timestamp[: stop + 1], append=candles.timestamp[stop]) / MS_PER_HOUR
+    holding = float(np.dot(inventory[: stop + 1], dt_hours))
+    return SymbolResult(pnl, equity, holding)
+
+
+def backtest_dca(candles: Candles, config: Dict[str, Any], capital: float, fee_rate: float) -> SymbolResult:
+    """Dollar-cost averaging in take-profit cycles.
+
+    A cycle buys ``initial_buy`` and then ``dca_amount`` every
+    ``dca_interval`` hours (up to ``max_buys`` buys), and sells everything
+    once the position is ``take_profit`` percent above its average cost.
+    Only the loop over cycles runs in Python; each cycle's buys, cost basis
+    and exit search are vectorized.
+    """
+    initial = float(config.get("initial_buy", capital / 10))
+    amount = float(config.get("dca_amount", initial))
+    interval_ms = float(config.get("dca_interval", 24)) * MS_PER_HOUR
+    take_profit = float(config.get("take_profit", 10.0)) / 100
+    max_buys = int(config.get("max_buys", 10))
+    if interval_ms <= 0 or max_buys < 1:
+        raise BacktestError("DCA needs dca_interval > 0 and max_buys >= 1")
+
+    ts, close = candles.timestamp, candles.close
+    n = len(close)
+    equity = np.empty(n)
+    pnl: List[float] = []
+    holding = 0.0
+    realized = 0.0
+    start = 0
+    while start < n:
+        buy_times = ts[start] + interval_ms * np.arange(max_buys)
+        buy_index = np.unique(np.searchsorted(ts, buy_times, side="left"))
+        buy_index = buy_index[buy_index < n]
+        spend = np.full(len(buy_index), amount)
+        spend[0] = initial
+        cum_cost = np.cumsum(spend * (1.0 + fee_rate))
+        cum_qty = np.cumsum(spend / close[buy_index])
+
+        # Search for the exit in growing windows so a short cycle does not
+        # pay for valuing the candles after it.
+        exit_index = None
+        lo, width = start, 1024
+        while lo < n and exit_index is None:
+            hi = min(n, lo + width)
+            held = np.searchsorted(buy_index, np.arange(lo, hi), side="right") - 1
+            value = cum_qty[held] * close[lo:hi] * (1.0 - fee_rate)
+            cost = cum_cost[held]
+            equity[lo:hi] = realized + value - cost
+            hit = _first_true(value >= cost * (1.0 + take_profit))
+            if hit is not None:
+                exit_index = lo + hit
+            lo, width = hi, width * 2
+
+        end = exit_index if exit_index is not None else n - 1
+        held = int(np.searchsorted(buy_index, end, side="right")) - 1
+        trade_pnl = cum_qty[held] * close[end] * (1.0 - fee_rate) - cum_cost[held]
+        pnl.append(float(trade_pnl))
+        realized += trade_pnl
+        equity[end] = realized
+        holding += (ts[end] - ts[start]) / MS_PER_HOUR
+        start = end + 1
+    return SymbolResult(np.asarray(pnl), equity, holding)
+
+
+def backtest_trend(candles: Candles, config: Dict[str, Any], capital: float, fee_rate: float) -> SymbolResult:
+    """EMA crossover with an RSI filter and optional take-profit/stop-loss.
+
+    A position opens when the short EMA crosses above the long EMA while RSI
+    is below ``rsi_overbought`` and closes at the next cross back down, or
+    earlier if take-profit or stop-loss is hit. Each uptrend holds at most
+    one position, so the trades and their exits are fully vectorized.
+    """
+    close = candles.close
+    n = len(close)
+    fast = ema(close, span=float(config.get("ema_short", 9)))
+    slow = ema(close, span=float(config.get("ema_long", 21)))
+    strength = rsi(close, int(config.get("rsi_period", 14)))
+    overbought = float(config.get("rsi_overbought", 70))
+    take_profit = float(config.get("take_profit", 0) or 0) / 100
+    stop_loss = float(config.get("stop_loss", 0) or 0) / 100
+
+    above = fast > slow
+    cross_up = np.flatnonzero(above[1:] & ~above[:-1]) + 1
+    cross_down = np.flatnonzero(~above[1:] & above[:-1]) + 1
+    entries = cross_up[strength[cross_up] < overbought]
+    if len(entries) == 0:
+        return SymbolResult(np.empty(0), np.zeros(n), 0.0)
+
+    down = np.searchsorted(cross_down, entries, side="right")
+    exits = np.where(down < len(cross_down), cross_down[np.minimum(down, len(cross_down) - 1)], n - 1)
+
+    # Label every candle inside a position with its trade number. Entries
+    # are unique and so are exits, since positions never overlap.
+    marks = np.zeros(n + 1, dtype=np.int64)
+    marks[entries] += 1
+    marks[exits + 1] -= 1
+    in_position = np.cumsum(marks[:n]) > 0
+    is_entry = np.zeros(n, dtype=bool)
+    is_entry[entries] = True
+    trade_of = np.cumsum(is_entry) - 1
+
+    entry_price = close[entries]
+    if take_profit or stop_loss:
+        candle = np.flatnonzero(in_position)
+        trade = trade_of[candle]
+        move = close[candle] / entry_price[trade]
+        hit = candle > entries[trade]
+        limit = np.zeros_like(hit)
+        if take_profit:
+            limit |= move >= 1.0 + take_profit
+        if stop_loss:
+            limit |= move <= 1.0 - stop_loss
+        hit &= limit
+        hit_trades, first = np.unique(trade[hit], return_index=True)
+        exits[hit_trades] = np.minimum(exits[hit_trades], candle[hit][first])
+
+    quantity = capital * (1.0 - fee_rate) / entry_price
+    exit_price = close[exits]
+    pnl = quantity * exit_price * (1.0 - fee_rate) - capital
+
+    marks[:] = 0
+    marks[entries] += 1
+    marks[exits] -= 1
+    holding_now = np.cumsum(marks[:n]) > 0
+    realized = np.zeros(n)
+    realized[exits] = pnl
+    equity = np.cumsum(realized)
+    open_trade = trade_of[holding_now]
+    equity[holding_now] += quantity[open_trade] * close[holding_now] * (1.0 - fee_rate) - capital
+
+    holding = float((candles.timestamp[exits] - candles.timestamp[entries]).sum()) / MS_PER_HOUR
+    return SymbolResult(pnl, equity, holding)
+
+
+def backtest_arbitrage(candles: Candles, config: Dict[str, Any], capital: float, fee_rate: float) -> SymbolResult:
+    raise BacktestError("Arbitrage strategies need order books from two venues and cannot be replayed from candles")
+
+
+BACKTESTERS: Dict[str, Callable[[Candles, Dict[str, Any], float, float], SymbolResult]] = {
+    "Smart Grid": backtest_smart_grid,
+    "DCA": backtest_dca,
+    "Trend": backtest_trend,
+    "Arbitrage": backtest_arbitrage,
+}
+
+
+def combine_equity(results: Dict[str, SymbolResult], candles: Dict[str, Candles]) -> np.ndarray:
+    """Sum per-symbol equity curves on the union of their timestamps.
+
+    A curve that stops early (e.g. a grid that hit its stop-loss) stays
+    flat at its final value.
+    """
+    curves = [(candles[symbol].timestamp[: len(r.equity)], r.equity) for symbol, r in results.items()]
+    if len(curves) == 1:
+        return curves[0][1]
+    first = candles[next(iter(results))].timestamp
+    if all(np.array_equal(candles[symbol].timestamp, first) for symbol in results):
+        total = np.zeros(len(first))
+        for _, equity in curves:
+            total[: len(equity)] += equity
+            total[len(equity):] += equity[-1]
+        return total
+    timeline = np.unique(np.concatenate([ts for ts, _ in curves]))
+    total = np.zeros(len(timeline))
+    for ts, equity in curves:
+        at = np.searchsorted(ts, timeline, side="right") - 1
+        total += np.where(at >= 0, equity[np.maximum(at, 0)], 0.0)
+    return total
+
+
+def run_backtest(
+    strategy_type: str,
+    config: Dict[str, Any],
+    candles: Dict[str, Candles],
+    capital: float = 1000.0,
+    fee_rate: float = 0.001,
+) -> Dict[str, Any]:
+    """Backtest ``config`` over every symbol's candles and return ``TradingStatistics`` fields."""
+    backtester = BACKTESTERS.get(strategy_type)
+    if backtester is None:
+        raise BacktestError(f"Unknown strategy type: {strategy_type}")
+
+    results = {}
+    for symbol, symbol_candles in candles.items():
+        if len(symbol_candles) < 2:
+            raise BacktestError(f"Not enough candles to backtest {symbol}")
+        results[symbol] = backtester(symbol_candles, config, capital, fee_rate)
+
+    pnl = np.concatenate([r.pnl for r in results.values()])
+    equity = combine_equity(results, candles)
+    peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    closed = len(pnl)
+    winning = int((pnl > 0).sum())
+    return {
+        "total_trades": closed,
+        "winning_trades": winning,
+        "losing_trades": int((pnl < 0).sum()),
+        "win_rate": (winning / closed) * 100 if closed else 0,
+        "profit_loss": float(pnl.sum()),
+        "max_drawdown": float((peak - equity).max()) if len(equity) else 0.0,
+        "avg_trade_duration": sum(r.holding_hours for r in results.values()) / closed if closed else 0,
+        "candles": sum(len(c) for c in candles.values()),
+    }
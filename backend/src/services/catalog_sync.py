@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import logging
+import random
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from uuid import uuid4
+
+import httpx
+
+from services.rate_limit import TokenBucket
+from services.repository import InMemoryRepository
+
+PRODUCT_FIELDS = ("name", "description", "image_url", "price", "commission_rate", "category", "tags")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class _PageState(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: bytes
+    pages: int
+
+
+class CatalogSync:
+    """Pulls product catalogs from affiliate networks into ``products``.
+
+    A network's catalog is read from ``<api_url>/products?page=N``, which
+    answers ``{"products": [...], "pages": <total>}``. The first page gives
+    the page count; the rest are fetched with up to ``page_concurrency`` in
+    flight, at most ``rate`` requests per second per network, over one
+    connection pool shared by all networks.
+
+    Every page is requested conditionally with the ETag and Last-Modified
+    it was last served with. A 304, or a body identical to the last one,
+    skips the page; otherwise its products are diffed against the stored
+    ones, keyed by network and ``product_url``, and only new or changed
+    products are written and passed to ``on_change``.
+
+    ``api_key`` returns the bearer token for a network, or None to send
+    none; by default it is the network's ``api_key`` field. A ``ValueError``
+    from it fails that network's sync.
+    """
+
+    def __init__(
+        self,
+        products: InMemoryRepository,
+        rate: float = 10.0,
+        page_concurrency: int = 4,
+        max_connections: int = 20,
+        timeout: float = 10.0,
+        retries: int = 3,
+        on_change: Optional[Callable[[Dict[str, Any]], None]] = None,
+        api_key: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+    ):
+        self._products = products
+        self._on_change = on_change
+        self._api_key = api_key or (lambda network: network.get("api_key"))
+        self._rate = rate
+        self._page_concurrency = page_concurrency
+        self._max_connections = max_connections
+        self._timeout = timeout
+        self._retries = retries
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limiters: Dict[str, TokenBucket] = {}
+        self._pages: Dict[Tuple[str, int], _PageState] = {}
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.runs = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    async def sync(self, networks: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sync every network in ``networks`` concurrently and summarize the run."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=httpx.Limits(max_connections=self._max_connections, max_keepalive_connections=self._max_connections),
+            )
+        started = perf_counter()
+        results = await asyncio.gather(*(self._sync_network(network) for network in networks))
+        elapsed = perf_counter() - started
+        totals = {
+            field: sum(result[field] for result in results)
+            for field in ("pages", "not_modified", "unchanged_pages", "products", "created", "updated", "unchanged", "invalid")
+        }
+        self.runs += 1
+        self.last_run = {
+            "finished_at": datetime.utcnow(),
+            "seconds": elapsed,
+            "products_per_second": totals["products"] / elapsed if elapsed else 0.0,
+            **totals,
+            "networks": results,
+        }
+        return self.last_run
+
+    def start(self, networks: Callable[[], Iterable[Dict[str, Any]]], interval: float) -> None:
+        """Sync the networks returned by ``networks`` every ``interval`` seconds."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(networks, interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def forget(self, network_id: Any) -> None:
+        """Drop a network's page validators so its next sync fetches everything."""
+        network_id = str(network_id)
+        self._limiters.pop(network_id, None)
+        for key in [key for key in self._pages if key[0] == network_id]:
+            del self._pages[key]
+
+    async def _run(self, networks: Callable[[], Iterable[Dict[str, Any]]], interval: float) -> None:
+        while True:
+            try:
+                await self.sync(networks())
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Catalog sync run failed")
+            await asyncio.sleep(interval)
+
+    async def _sync_network(self, network: Dict[str, Any]) -> Dict[str, Any]:
+        network_id = str(network["id"])
+        result: Dict[str, Any] = {
+            "network_id": network_id,
+            "name": network.get("name"),
+            "pages": 0,
+            "not_modified": 0,
+            "unchanged_pages": 0,
+            "products": 0,
+            "created": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "invalid": 0,
+            "error": None,
+        }
+        limiter = self._limiters.get(network_id)
+        if limiter is None:
+            limiter = self._limiters[network_id] = TokenBucket(self._rate, self._page_concurrency)
+        try:
+            api_key = self._api_key(network)
+            auth = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+            pages = await self._sync_page(network, 1, auth, limiter, result)
+            limit = asyncio.Semaphore(self._page_concurrency)
+
+            async def sync_page(page: int) -> None:
+                async with limit:
+                    await self._sync_page(network, page, auth, limiter, result)
+
+            await asyncio.gather(*(sync_page(page) for page in range(2, pages + 1)))
+        except (httpx.HTTPError, ValueError, KeyError, TypeError, AttributeError) as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    async def _sync_page(
+        self, network: Dict[str, Any], page: int, auth: Dict[str, str], limiter: TokenBucket, result: Dict[str, Any]
+    ) -> int:
+        """Fetch and apply one page; returns the catalog's page count."""
+        network_id = str(network["id"])
+        state = self._pages.get((network_id, page))
+        headers = dict(auth)
+        if state is not None:
+            if state.etag:
+                headers["If-None-Match"] = state.etag
+            if state.last_modified:
+                headers["If-Modified-Since"] = state.last_modified
+
+        response = await self._get(f"{network['api_url'].rstrip('/')}/products", page, headers, limiter)
+        result["pages"] += 1
+        if response.status_code == 304 and state is not None:
+            result["not_modified"] += 1
+            return state.pages
+        response.raise_for_status()
+
+        digest = hashlib.sha1(response.content).digest()
+        body = response.json()
+        pages = max(1, int(body.get("pages", 1)))
+        self._pages[(network_id, page)] = _PageState(
+            response.headers.get("etag"), response.headers.get("last-modified"), digest, pages
+        )
+        if state is not None and state.digest == digest:
+            result["unchanged_pages"] += 1
+            return pages
+        self._apply(network_id, body.get("products", []), result)
+        return pages
+
+    async def _get(self, url: str, page: int, headers: Dict[str, str], limiter: TokenBucket) -> httpx.Response:
+        assert self._client is not None
+        for attempt in range(self._retries + 1):
+            await limiter.acquire()
+            try:
+                response = await self._client.get(url, params={"page": page}, headers=headers)
+            except httpx.TransportError:
+                if attempt == self._retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self._retries:
+                    return response
+            await asyncio.sleep(random.uniform(0, 0.5 * 2 ** attempt))
+        raise AssertionError("unreachable")
+
+    def _apply(self, network_id: str, items: List[Dict[str, Any]], result: Dict[str, Any]) -> None:
+        now = datetime.utcnow()
+        for item in items:
+            result["products"] += 1
+            try:
+                url = str(item["product_url"])
+                changes = {field: item[field] for field in PRODUCT_FIELDS if field in item}
+                for field in ("price", "commission_rate"):
+                    if field in changes:
+                        changes[field] = float(changes[field])
+            except (KeyError, TypeError, ValueError):
+                result["invalid"] += 1
+                continue
+
+            existing = self._products.find_one(network_id=network_id, product_url=url)
+            if existing is None:
+                if not {"name", "price", "commission_rate"} <= changes.keys():
+                    result["invalid"] += 1
+                    continue
+                record = self._products.add({
+                    "id": str(uuid4()),
+                    "description": None,
+                    "image_url": None,
+                    "category": None,
+                    "tags": [],
+                    **changes,
+                    "network_id": network_id,
+                    "product_url": url,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+                result["created"] += 1
+            else:
+                diff = {field: value for field, value in changes.items() if existing.get(field) != value}
+                if not diff:
+                    result["unchanged"] += 1
+                    continue
+                record = self._products.update(existing["id"], {**diff, "updated_at": now})
+                result["updated"] += 1
+            if self._on_change is not None:
+                self._on_change(record)
+
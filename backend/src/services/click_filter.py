@@ -0,0 +1,244 @@
+import math
+import re
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from services.click_tracking import Click
+
+_MASK64 = (1 << 64) - 1
+_UA_TOKEN = re.compile(r"[a-z][a-z0-9_-]*")
+
+# Lower-cased user agent tokens of crawlers, monitors and HTTP libraries.
+BOT_SIGNATURES = (
+    "bot", "crawler", "spider", "scraper", "headlesschrome", "phantomjs", "selenium", "puppeteer",
+    "googlebot", "bingbot", "yandexbot", "baiduspider", "duckduckbot", "applebot", "slurp", "petalbot",
+    "ahrefsbot", "semrushbot", "mj12bot", "dotbot", "bytespider", "gptbot", "ccbot", "facebookexternalhit",
+    "twitterbot", "linkedinbot", "slackbot", "discordbot", "telegrambot", "whatsapp", "pingdom", "uptimerobot",
+    "curl", "wget", "httpie", "python-requests", "python-urllib", "python-httpx", "aiohttp", "scrapy",
+    "go-http-client", "okhttp", "java", "apache-httpclient", "libwww-perl", "node-fetch", "axios", "postmanruntime",
+)
+
+
+def _hash(value: str) -> int:
+    """64-bit hash of ``value``; stable within a process, which is all in-memory sketches need."""
+    return hash(value) & _MASK64
+
+
+class BloomFilter:
+    """Set membership in ``capacity``-sized fixed memory, with false positives at about ``error_rate``."""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, value: str) -> None:
+        h = _hash(value)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(self.hashes):
+            bit = (h1 + i * h2) % self.size
+            self._bits[bit >> 3] |= 1 << (bit & 7)
+
+    def __contains__(self, value: str) -> bool:
+        # Most lookups are misses, which usually stop at the first probe.
+        h = _hash(value)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        bits, size = self._bits, self.size
+        for i in range(self.hashes):
+            bit = (h1 + i * h2) % size
+            if not bits[bit >> 3] & (1 << (bit & 7)):
+                return False
+        return True
+
+
+class HyperLogLog:
+    """Distinct count estimate in ``2 ** precision`` one-byte registers (about 1.04 / sqrt(2 ** precision) error)."""
+
+    def __init__(self, precision: int = 12):
+        self._shift = 64 - precision
+        self._rest = (1 << self._shift) - 1
+        self._registers = bytearray(1 << precision)
+
+    def add_hash(self, h: int) -> None:
+        """Add a value by its 64-bit hash."""
+        index = h >> self._shift
+        rank = self._shift - (h & self._rest).bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def add(self, value: str) -> None:
+        self.add_hash(_hash(value))
+
+    def count(self) -> int:
+        registers = np.frombuffer(self._registers, dtype=np.uint8)
+        m = len(registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def __len__(self) -> int:
+        return len(self._registers)
+
+
+class SlidingWindowCounter:
+    """Approximate per-key event counts over the last ``window`` seconds in fixed memory.
+
+    Counts live in two count-min sketches of ``depth`` rows by ``width``
+    counters, one for the current fixed window and one for the previous;
+    the sliding count weighs the previous window by how much of it still
+    overlaps. Collisions can only overestimate a key's count.
+
+    Each row indexes its counters with its own slice of the key's 64-bit
+    hash, so ``width`` must be a power of two and ``depth`` slices must
+    fit in 64 bits.
+    """
+
+    def __init__(self, window: float = 60.0, width: int = 1 << 16, depth: int = 4):
+        bits = width.bit_length() - 1
+        if width != 1 << bits or depth * bits > 64:
+            raise ValueError("width must be a power of two with depth * log2(width) <= 64")
+        self.window = window
+        self._mask = width - 1
+        self._rows = [(row * bits, row * width) for row in range(depth)]
+        self._zeros = bytes(4 * width * depth)
+        self._current = array("I", self._zeros)
+        self._previous = array("I", self._zeros)
+        self._epoch = 0
+
+    def add(self, key: str, now: float) -> float:
+        """Count one event for ``key`` at ``now`` and return the key's sliding count, this event included."""
+        epoch = int(now // self.window)
+        if epoch > self._epoch:
+            self._previous = self._current if epoch == self._epoch + 1 else array("I", self._zeros)
+            self._current = array("I", self._zeros)
+            self._epoch = epoch
+        overlap = 1.0 - (now - epoch * self.window) / self.window
+        h = _hash(key)
+        current, previous, mask = self._current, self._previous, self._mask
+        estimate = math.inf
+        for shift, offset in self._rows:
+            slot = offset + (h >> shift & mask)
+            count = current[slot] + 1
+            current[slot] = count
+            count += previous[slot] * overlap
+            if count < estimate:
+                estimate = count
+        return estimate
+
+    @property
+    def nbytes(self) -> int:
+        return 2 * len(self._zeros)
+
+
+class ClickFilter:
+    """Classifies clicks as human or not before they are counted.
+
+    A click is rejected, in this order, for an empty user agent, a user
+    agent token or IP in the ``signatures`` Bloom filter, more than
+    ``ip_limit`` clicks from its IP or more than ``repeat_limit`` clicks
+    on the same link from the same IP and user agent within the last
+    ``window`` seconds. Clicks that pass are added to HyperLogLog
+    estimates of unique visitors (IP and user agent), overall and per link.
+
+    Every structure has a fixed size: the rate sketches, the Bloom filter,
+    a user agent verdict cache cleared when it reaches ``cache_size``, and
+    one ``link_precision`` sketch per link, so memory does not grow with
+    traffic.
+    """
+
+    REASONS = ("no_user_agent", "bot_signature", "ip_rate", "repeat_click")
+
+    def __init__(
+        self,
+        window: float = 60.0,
+        ip_limit: int = 60,
+        repeat_limit: int = 5,
+        signatures: Iterable[str] = BOT_SIGNATURES,
+        cache_size: int = 10_000,
+        link_precision: int = 10,
+    ):
+        self.ip_limit = ip_limit
+        self.repeat_limit = repeat_limit
+        self._signatures = BloomFilter()
+        self._agents: Dict[str, bool] = {}
+        self._cache_size = cache_size
+        for signature in signatures:
+            self.block(signature)
+        self._ip_rate = SlidingWindowCounter(window)
+        self._repeat_rate = SlidingWindowCounter(window)
+        self._link_precision = link_precision
+        self._visitors = HyperLogLog(14)
+        self._link_visitors: Dict[str, HyperLogLog] = {}
+        self.seen = 0
+        self.passed = 0
+        self.rejected = {reason: 0 for reason in self.REASONS}
+
+    def block(self, signature: str) -> None:
+        """Reject clicks from an IP, or with a user agent token, equal to ``signature``."""
+        self._signatures.add(signature.lower())
+        self._agents.clear()
+
+    def classify(self, click: Click) -> Optional[str]:
+        """Return why ``click`` is not human, or None; rate windows advance with ``click.timestamp``."""
+        agent = click.user_agent
+        if not agent:
+            return "no_user_agent"
+        is_bot = self._agents.get(agent)
+        if is_bot is None:
+            if len(self._agents) >= self._cache_size:
+                self._agents.clear()
+            is_bot = self._agents[agent] = any(token in self._signatures for token in _UA_TOKEN.findall(agent.lower()))
+        if is_bot or (click.ip and click.ip in self._signatures):
+            return "bot_signature"
+        if click.ip and self._ip_rate.add(click.ip, click.timestamp) > self.ip_limit:
+            return "ip_rate"
+        visitor = f"{click.ip}\0{agent}"
+        if self._repeat_rate.add(f"{visitor}\0{click.link_id}", click.timestamp) > self.repeat_limit:
+            return "repeat_click"
+        h = _hash(visitor)
+        self._visitors.add_hash(h)
+        sketch = self._link_visitors.get(click.link_id)
+        if sketch is None:
+            sketch = self._link_visitors[click.link_id] = HyperLogLog(self._link_precision)
+        sketch.add_hash(h)
+        return None
+
+    def filter(self, clicks: List[Click]) -> List[Click]:
+        """The human clicks of ``clicks``, counting the rest by reason."""
+        human = []
+        for click in clicks:
+            reason = self.classify(click)
+            if reason is None:
+                human.append(click)
+            else:
+                self.rejected[reason] += 1
+        self.seen += len(clicks)
+        self.passed += len(human)
+        return human
+
+    def unique_visitors(self, link_id: Optional[str] = None) -> int:
+        """Estimated distinct visitors among passed clicks, overall or on one link."""
+        if link_id is None:
+            return self._visitors.count()
+        sketch = self._link_visitors.get(str(link_id))
+        return sketch.count() if sketch is not None else 0
+
+    def forget(self, link_id: Any) -> None:
+        self._link_visitors.pop(str(link_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seen": self.seen,
+            "passed": self.passed,
+            "rejected": dict(self.rejected),
+            "bot_share": 1 - self.passed / self.seen if self.seen else 0.0,
+            "unique_visitors": self.unique_visitors(),
+            "memory_bytes": (
+                self._ip_rate.nbytes + self._repeat_rate.nbytes + self._signatures.size // 8
+                + len(self._visitors) + sum(len(sketch) for sketch in self._link_visitors.values())
+            ),
+        }
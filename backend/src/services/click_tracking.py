@@ -0,0 +1,137 @@
+import asyncio
+from time import perf_counter, time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from services.metrics import LatencyHistogram
+
+
+class Click(NamedTuple):
+    """A redirect served for an affiliate link; ``timestamp`` is epoch seconds."""
+
+    link_id: str
+    timestamp: float
+    ip: str = ""
+    user_agent: str = ""
+
+
+class LinkIndex:
+    """Short link codes of active affiliate links mapped to their redirect targets.
+
+    A link is reachable by its ``custom_url`` and by its ``tracking_id``.
+    Resolving a code is one dict lookup; the index is kept current by the
+    routes that create, update and delete links and products.
+    """
+
+    def __init__(self) -> None:
+        self._targets: Dict[str, Tuple[str, str]] = {}
+        self._codes: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def resolve(self, code: str) -> Optional[Tuple[str, str]]:
+        """Return ``(link id, target url)`` for ``code``, or None."""
+        return self._targets.get(code)
+
+    def put(self, link: Dict[str, Any], target_url: Optional[str]) -> None:
+        """Index ``link``, or drop it if it is inactive or has no target."""
+        link_id = str(link["id"])
+        self.remove(link_id)
+        if not link.get("is_active", True) or not target_url:
+            return
+        codes = [code for code in (link.get("custom_url"), link.get("tracking_id")) if code]
+        for code in codes:
+            self._targets[code] = (link_id, target_url)
+        self._codes[link_id] = codes
+
+    def remove(self, link_id: Any) -> None:
+        link_id = str(link_id)
+        for code in self._codes.pop(link_id, ()):
+            if self._targets.get(code, ("",))[0] == link_id:
+                del self._targets[code]
+
+
+class ClickBuffer:
+    """Per-worker buffer of clicks, handed to ``flush`` in batches.
+
+    ``record`` only appends to a list owned by this process's event loop,
+    so a redirect never waits on a lock or on storage. A background task
+    swaps the list out every ``interval`` seconds, or as soon as
+    ``batch_size`` clicks are waiting, and passes the batch to ``flush``.
+    Each worker process has its own buffer and flushes independently.
+    """
+
+    def __init__(self, flush: Callable[[List[Click]], None], interval: float = 1.0, batch_size: int = 10000):
+        self._flush = flush
+        self._interval = interval
+        self._batch_size = batch_size
+        self._clicks: List[Click] = []
+        self._full = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.recorded = 0
+        self.flushed = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.latency = {
+            "redirect": LatencyHistogram(),
+            "flush": LatencyHistogram(),
+        }
+
+    def __len__(self) -> int:
+        return len(self._clicks)
+
+    def record(self, link_id: str, ip: str = "", user_agent: str = "") -> None:
+        self._clicks.append(Click(link_id, time(), ip, user_agent))
+        self.recorded += 1
+        if len(self._clicks) >= self._batch_size:
+            self._full.set()
+
+    def drain(self) -> int:
+        """Flush the waiting clicks now and return how many there were."""
+        clicks, self._clicks = self._clicks, []
+        self._full.clear()
+        if not clicks:
+            return 0
+        started = perf_counter()
+        try:
+            self._flush(clicks)
+        except Exception as e:
+            # Counts are best effort; a failed batch must not stop later ones.
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+        self.latency["flush"].record(perf_counter() - started)
+        self.flushed += len(clicks)
+        self.batches += 1
+        return len(clicks)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "pending": len(self._clicks),
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "latency": {name: histogram.snapshot() for name, histogram in self.latency.items()},
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self.drain()
@@ -0,0 +1,109 @@
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_UNBUILT = object()
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)  # UUIDs and other scalar ids
+
+
+class GroupTotals:
+    """Record count and sum of ``field`` per value of ``group``.
+
+    Pass an instance to ``InMemoryRepository.watch``: every insert, update
+    and delete adjusts the totals of the groups involved, so reading them
+    never scans the records.
+    """
+
+    def __init__(self, group: str, field: str):
+        self.group = group
+        self.field = field
+        self.counts: Dict[Hashable, int] = {}
+        self.sums: Dict[Hashable, float] = {}
+
+    def __call__(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        if old is not None:
+            key = old.get(self.group)
+            count = self.counts[key] - 1
+            if count:
+                self.counts[key] = count
+                self.sums[key] -= old.get(self.field) or 0
+            else:
+                del self.counts[key]  # also drops the float error accumulated in the sum
+                del self.sums[key]
+        if new is not None:
+            key = new.get(self.group)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.sums[key] = self.sums.get(key, 0.0) + (new.get(self.field) or 0)
+
+    def totals(self) -> Dict[Hashable, Dict[str, float]]:
+        return {key: {"count": count, "sum": self.sums[key]} for key, count in self.counts.items()}
+
+
+class _Section:
+    __slots__ = ("build", "version", "seen", "value", "builds")
+
+    def __init__(self, build: Callable[[], Any], version: Callable[[], Hashable]):
+        self.build = build
+        self.version = version
+        self.seen: Hashable = None
+        self.value: Any = _UNBUILT
+        self.builds = 0
+
+
+class DashboardSnapshot:
+    """A JSON document of named sections, each rebuilt only when its inputs change.
+
+    ``section`` registers a ``build`` function together with a cheap
+    ``version`` function, such as a repository's version counter or a
+    tuple of running totals. ``snapshot`` asks every section for its
+    version, rebuilds the ones whose version moved and serializes the
+    document again only if one did, so reading an unchanged dashboard
+    costs a few comparisons.
+
+    The ETag is a hash of the serialized body: it changes exactly when the
+    content does, whichever writes happened in between.
+    """
+
+    def __init__(self) -> None:
+        self._sections: Dict[str, _Section] = {}
+        self._body = b""
+        self._etag = ""
+        self.builds = 0
+
+    def section(self, name: str, build: Callable[[], Any], version: Callable[[], Hashable]) -> None:
+        self._sections[name] = _Section(build, version)
+
+    def snapshot(self) -> Tuple[bytes, str]:
+        """Return the current ``(body, etag)``."""
+        changed = not self._etag
+        for section in self._sections.values():
+            version = section.version()
+            if section.value is _UNBUILT or version != section.seen:
+                section.value = section.build()
+                section.seen = version
+                section.builds += 1
+                changed = True
+        if changed:
+            body = json.dumps(
+                {name: section.value for name, section in self._sections.items()},
+                default=_encode,
+                separators=(",", ":"),
+            ).encode()
+            if body != self._body:
+                self._body = body
+                self._etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+            self.builds += 1
+        return self._body, self._etag
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "builds": self.builds,
+            "bytes": len(self._body),
+            "section_builds": {name: section.builds for name, section in self._sections.items()},
+        }
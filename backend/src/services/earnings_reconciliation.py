@@ -0,0 +1,214 @@
+import codecs
+import json
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from services.repository import InMemoryRepository
+
+EARNING_STATUSES = ("pending", "approved", "paid")  # in the order earnings move through them
+REVERSED_STATUSES = ("reversed", "rejected", "cancelled")  # taken back by the network; not counted as conversions
+AMOUNT_TOLERANCE = 0.01
+MAX_PENDING_JSON = 1 << 20  # bytes buffered while looking for the end of one array item
+
+
+async def iter_json_batches(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[Tuple[int, Any]]]:
+    """Yield lists of ``(item number, item)``, one per chunk, from a byte stream holding one JSON array.
+
+    Items are decoded as soon as they are complete, so only the current
+    item is buffered. A syntax error, bytes that are not valid UTF-8 or an
+    item larger than ``MAX_PENDING_JSON`` yield an error message and end
+    the stream.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    number = 0
+    started = finished = invalid = False
+    chunks_iter = chunks.__aiter__()
+    more = True
+    while not finished:
+        if more:
+            try:
+                chunk = await chunks_iter.__anext__()
+            except StopAsyncIteration:
+                chunk, more = b"", False
+            try:
+                pending += text.decode(chunk, final=not more)
+            except UnicodeDecodeError:
+                # Items decoded before the bad bytes are still yielded.
+                more, invalid = False, True
+        position = 0
+        batch: List[Tuple[int, Any]] = []
+        while True:
+            while position < len(pending) and pending[position] in " \t\r\n,":
+                position += 1
+            if position == len(pending):
+                break
+            if not started:
+                if pending[position] != "[":
+                    yield [(number + 1, "expected a JSON array")]
+                    return
+                started = True
+                position += 1
+                continue
+            if pending[position] == "]":
+                finished = True
+                break
+            try:
+                item, end = decoder.raw_decode(pending, position)
+            except ValueError as e:
+                if not more:
+                    batch.append((number + 1, "invalid UTF-8" if invalid else f"invalid JSON: {e}"))
+                    yield batch
+                    return
+                break
+            if end == len(pending) and more:
+                break  # a number may continue in the next chunk
+            number += 1
+            batch.append((number, item if isinstance(item, dict) else "expected a JSON object"))
+            position = end
+        pending = pending[position:]
+        if not more and not finished:
+            if invalid:
+                batch.append((number + 1, "invalid UTF-8"))
+            else:
+                batch.append((number + 1, "unterminated JSON array" if started else "expected a JSON array"))
+        elif len(pending) > MAX_PENDING_JSON:
+            batch.append((number + 1, f"JSON item larger than {MAX_PENDING_JSON} bytes"))
+        else:
+            if batch:
+                yield batch
+            continue
+        yield batch
+        return
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp as naive UTC; reports repeat a few dates, hence the cache."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+async def reconcile_rows(
+    batches: AsyncIterator[List[Tuple[int, Any]]],
+    earnings: InMemoryRepository,
+    network_of: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+    network_id: Optional[str] = None,
+    dry_run: bool = False,
+    batch_size: int = 5000,
+    max_details: int = 100,
+    unit: str = "line",
+) -> Dict[str, Any]:
+    """Match payout report rows to earnings by ``transaction_id`` and apply their statuses.
+
+    ``batches`` yields lists of ``(line number, row dict or error
+    message)``, as ``parse_row_batches`` and ``iter_json_batches`` do.
+    A row needs ``transaction_id`` and ``status`` and may carry ``amount``,
+    ``payment_date`` and ``payment_method``. Each is looked up in the
+    earnings' unique transaction id index and, if it moves the earning
+    forward through ``EARNING_STATUSES``, queued as an update; updates are
+    applied ``batch_size`` at a time, or only counted with ``dry_run``.
+
+    Rows that cannot be parsed count as failed. Rows that parse but do not
+    agree with the earnings count as mismatched, by kind:
+    ``unknown_transaction``, ``wrong_network`` (when ``network_id`` is
+    given, per ``network_of``), ``amount`` (off by more than
+    ``AMOUNT_TOLERANCE``) and ``status_regression`` (which includes any
+    status reported for a reversed earning). The first
+    ``max_details`` problems are reported as "<unit> N: reason".
+    """
+    total = matched = updated = unchanged = failed = 0
+    mismatches: Dict[str, int] = {}
+    transitions: Dict[Tuple[str, str], int] = {}
+    details: List[str] = []
+    updates: Dict[str, Dict[str, Any]] = {}
+    rank = {status: index for index, status in enumerate(EARNING_STATUSES)}
+    now = datetime.utcnow()
+
+    def problem(number: int, reason: str) -> None:
+        if len(details) < max_details:
+            details.append(f"{unit} {number}: {reason}")
+
+    def flush() -> int:
+        if dry_run:
+            count = len(updates)
+        else:
+            count = earnings.update_many(updates.items())
+        updates.clear()
+        return count
+
+    async for rows in batches:
+        for number, row in rows:
+            total += 1
+            try:
+                if isinstance(row, str):
+                    raise ValueError(row)
+                transaction_id = row.get("transaction_id")
+                if transaction_id is None or transaction_id == "":
+                    raise ValueError("missing transaction_id")
+                status = row.get("status")
+                if status not in rank:
+                    status = str(status or "").strip().lower()
+                    if status not in rank:
+                        raise ValueError(f"unknown status {row.get('status')!r}")
+                amount = row.get("amount")
+                amount = float(amount) if amount is not None and amount != "" else None
+                payment_date = row.get("payment_date")
+                payment_date = _parse_date(str(payment_date)) if payment_date else None
+            except (ValueError, TypeError) as e:
+                failed += 1
+                problem(number, str(e) or type(e).__name__)
+                continue
+
+            earning = earnings.get_by("transaction_id", transaction_id if isinstance(transaction_id, str) else str(transaction_id))
+            kind = None
+            if earning is None:
+                kind, reason = "unknown_transaction", f"no earning with transaction_id {transaction_id}"
+            elif network_id is not None and network_of is not None and network_of(earning) != network_id:
+                kind, reason = "wrong_network", f"transaction {transaction_id} belongs to another network"
+            elif amount is not None and abs(amount - earning["amount"]) > AMOUNT_TOLERANCE:
+                kind, reason = "amount", f"transaction {transaction_id} reports {amount:.2f}, recorded {earning['amount']:.2f}"
+            else:
+                queued = updates.get(earning["id"])
+                current = (queued or earning)["status"]
+                if current in REVERSED_STATUSES or rank[status] < rank.get(current, 0):
+                    kind, reason = "status_regression", f"transaction {transaction_id} reports {status}, recorded {current}"
+            if kind is not None:
+                mismatches[kind] = mismatches.get(kind, 0) + 1
+                problem(number, reason)
+                continue
+
+            matched += 1
+            if status == current:
+                unchanged += 1
+                continue
+            changes = queued or {}
+            changes["status"] = status
+            changes["updated_at"] = now
+            if status == "paid":
+                changes["payment_date"] = payment_date or earning.get("payment_date") or now
+                if row.get("payment_method"):
+                    changes["payment_method"] = row["payment_method"]
+            updates[earning["id"]] = changes
+            transition = (current, status)
+            transitions[transition] = transitions.get(transition, 0) + 1
+            if len(updates) >= batch_size:
+                updated += flush()
+    updated += flush()
+
+    return {
+        "rows": total,
+        "matched": matched,
+        "updated": updated,
+        "unchanged": unchanged,
+        "mismatched": sum(mismatches.values()),
+        "failed": failed,
+        "dry_run": dry_run,
+        "transitions": {f"{old}->{new}": count for (old, new), count in transitions.items()},
+        "mismatches": mismatches,
+        "details": details,
+    }
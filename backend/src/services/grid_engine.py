@@ -0,0 +1,318 @@
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from uuid import uuid4
+
+from services.market_data import exchange_symbol
+from services.metrics import LatencyHistogram
+
+
+class Fill(NamedTuple):
+    """A grid order that the price reached.
+
+    A buy opens the trade ``trade_id``; the matching sell closes it with
+    ``profit_loss`` net of fees.
+    """
+
+    grid_id: str
+    symbol: str
+    side: str  # buy, sell
+    price: float
+    quantity: float
+    trade_id: str
+    profit_loss: Optional[float] = None
+
+
+class _Position:
+    __slots__ = ("price", "quantity", "trade_id", "target")
+
+    def __init__(self, price: float, quantity: float, trade_id: str, target: float):
+        self.price = price
+        self.quantity = quantity
+        self.trade_id = trade_id
+        self.target = target
+
+
+class Grid:
+    """Buy levels below the price, each selling one grid step above its buy.
+
+    Orders are kept in three sorted lists of ``(price, level)``: armed buys
+    below the price, sells of held levels at their targets, and idle
+    levels above the price that arm as buys once the price passes them. A
+    tick only bisects into the lists and moves the levels it crossed, so
+    its cost is O(log n + fills).
+
+    Changing the spacing re-places the idle levels around the last price;
+    held levels keep the target they were bought with.
+    """
+
+    def __init__(
+        self,
+        grid_id: str,
+        symbol: str,
+        levels: int,
+        spacing: float,
+        quote: float,
+        fee_rate: float = 0.0,
+        open_trades: Iterable[Dict[str, Any]] = (),
+    ):
+        self.grid_id = grid_id
+        self.symbol = symbol
+        self.levels = levels
+        self.spacing = spacing
+        self.quote = quote
+        self.fee_rate = fee_rate
+        self.last_price: Optional[float] = None
+        self._buys: List[Tuple[float, int]] = []
+        self._waiting: List[Tuple[float, int]] = []
+        self._sells: List[Tuple[float, int]] = []
+        self._held: Dict[int, _Position] = {}
+        self._next_level = 0
+        for trade in open_trades:
+            level = self._new_level()
+            target = trade["price"] * (1.0 + spacing)
+            self._held[level] = _Position(trade["price"], trade["quantity"], str(trade["id"]), target)
+            insort(self._sells, (target, level))
+
+    @property
+    def placed(self) -> bool:
+        return self.last_price is not None
+
+    @property
+    def down_trigger(self) -> Optional[float]:
+        """Price at or below which the next buy fills."""
+        return self._buys[-1][0] if self._buys else None
+
+    @property
+    def up_trigger(self) -> Optional[float]:
+        """Price at or above which the next sell fills or an idle level arms."""
+        candidates = [orders[0][0] for orders in (self._sells, self._waiting) if orders]
+        return min(candidates) if candidates else None
+
+    def place(self, price: float) -> None:
+        """Spread the levels that hold nothing around ``price``."""
+        idle = max(0, self.levels - len(self._held))
+        below = (idle + 1) // 2
+        ratio = 1.0 + self.spacing
+        self._buys = [(price / ratio ** step, self._new_level()) for step in range(below, 0, -1)]
+        self._waiting = [(price * ratio ** step, self._new_level()) for step in range(1, idle - below + 1)]
+        self.last_price = price
+
+    def reconfigure(self, levels: int, spacing: float, quote: float) -> None:
+        self.levels = levels
+        self.spacing = spacing
+        self.quote = quote
+        if self.last_price is not None:
+            self.place(self.last_price)
+
+    def on_price(self, price: float, fills: List[Fill]) -> None:
+        if self.last_price is None:
+            self.place(price)
+            return
+        self.last_price = price
+
+        # Held levels whose target was reached sell at it and re-arm their buy.
+        sold = bisect_right(self._sells, (price, float("inf")))
+        if sold:
+            for target, level in self._sells[:sold]:
+                position = self._held.pop(level)
+                proceeds = position.quantity * target
+                cost = position.quantity * position.price
+                profit = proceeds - cost - self.fee_rate * (proceeds + cost)
+                fills.append(Fill(self.grid_id, self.symbol, "sell", target, position.quantity, position.trade_id, profit))
+                insort(self._buys, (position.price, level))
+            del self._sells[:sold]
+
+        # Idle levels the price rose past become buys below it.
+        armed = bisect_left(self._waiting, (price, -1))
+        if armed:
+            for order in self._waiting[:armed]:
+                insort(self._buys, order)
+            del self._waiting[:armed]
+
+        # Buys at or above the price fill at their limit.
+        first = bisect_left(self._buys, (price, -1))
+        if first < len(self._buys):
+            for buy_price, level in self._buys[first:]:
+                quantity = self.quote / buy_price
+                trade_id = str(uuid4())
+                target = buy_price * (1.0 + self.spacing)
+                self._held[level] = _Position(buy_price, quantity, trade_id, target)
+                fills.append(Fill(self.grid_id, self.symbol, "buy", buy_price, quantity, trade_id))
+                insort(self._sells, (target, level))
+            del self._buys[first:]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "grid_id": self.grid_id,
+            "symbol": self.symbol,
+            "levels": self.levels,
+            "spacing": self.spacing * 100,
+            "last_price": self.last_price,
+            "buys": [price for price, _ in self._buys],
+            "sells": [price for price, _ in self._sells],
+            "idle": [price for price, _ in self._waiting],
+        }
+
+    def _new_level(self) -> int:
+        self._next_level += 1
+        return self._next_level
+
+
+class _Book:
+    """Grids on one symbol and heaps of their next trigger prices."""
+
+    __slots__ = ("grids", "up", "down", "unplaced")
+
+    def __init__(self) -> None:
+        self.grids: Dict[str, Grid] = {}
+        self.up: List[Tuple[float, int, str]] = []
+        self.down: List[Tuple[float, int, str]] = []  # negated prices, highest first
+        self.unplaced: Set[str] = set()
+
+
+class GridEngine:
+    """Runs Smart Grid strategies on price ticks.
+
+    Every grid's next trigger prices are kept in two heaps per symbol, so a
+    tick pops only the grids whose triggers it crossed; grids the price
+    moved inside of are not visited. Heap entries are invalidated lazily
+    with a per-grid generation number. Per-tick work is
+    O(touched grids * log grids + fills), independent of the total number
+    of levels.
+    """
+
+    def __init__(self) -> None:
+        self._books: Dict[str, _Book] = {}
+        self._grids: Dict[str, Tuple[str, Grid]] = {}
+        self._generation: Dict[str, int] = {}
+        self._sequence = 0
+        self.ticks = 0
+        self.touched = 0
+        self.fills = 0
+        self.latency = LatencyHistogram()
+
+    def __len__(self) -> int:
+        return len(self._grids)
+
+    def __contains__(self, grid_id: Any) -> bool:
+        return str(grid_id) in self._grids
+
+    def symbols(self) -> List[str]:
+        """Exchange symbols that have running grids."""
+        return list(self._books)
+
+    def get(self, grid_id: Any) -> Optional[Grid]:
+        entry = self._grids.get(str(grid_id))
+        return entry[1] if entry else None
+
+    def add(
+        self,
+        grid_id: Any,
+        symbol: str,
+        config: Dict[str, Any],
+        open_trades: Iterable[Dict[str, Any]] = (),
+    ) -> Grid:
+        """Start a grid from a Smart Grid config, or apply a changed config to a running one.
+
+        ``open_trades`` are adopted as held levels, e.g. after a restart.
+        """
+        grid_id = str(grid_id)
+        levels = int(config.get("grid_levels", 10))
+        spacing = float(config.get("grid_spacing", 1.0)) / 100
+        if levels < 1 or spacing <= 0:
+            raise ValueError("Smart Grid needs grid_levels >= 1 and grid_spacing > 0")
+        quote = float(config.get("capital", 1000.0)) / levels
+
+        key = exchange_symbol(symbol)
+        grid = self.get(grid_id)
+        if grid is not None and exchange_symbol(grid.symbol) == key:
+            grid.reconfigure(levels, spacing, quote)
+        else:
+            self.remove(grid_id)
+            grid = Grid(grid_id, symbol, levels, spacing, quote, float(config.get("fee_rate", 0.0)), open_trades)
+            book = self._books.setdefault(key, _Book())
+            book.grids[grid_id] = grid
+            self._grids[grid_id] = (key, grid)
+        self._push(self._books[key], grid)
+        return grid
+
+    def set_spacing(self, grid_id: Any, spacing: float) -> None:
+        """Change a running grid's spacing (in percent) and re-place its idle levels."""
+        entry = self._grids.get(str(grid_id))
+        if entry is None:
+            raise KeyError(grid_id)
+        key, grid = entry
+        grid.reconfigure(grid.levels, spacing / 100, grid.quote)
+        self._push(self._books[key], grid)
+
+    def remove(self, grid_id: Any) -> None:
+        grid_id = str(grid_id)
+        entry = self._grids.pop(grid_id, None)
+        if entry is None:
+            return
+        book = self._books[entry[0]]
+        del book.grids[grid_id]
+        book.unplaced.discard(grid_id)
+        self._generation.pop(grid_id, None)
+        if not book.grids:
+            del self._books[entry[0]]
+
+    def on_price(self, symbol: str, price: float) -> List[Fill]:
+        """Apply a price tick to the grids on ``symbol`` and return the fills."""
+        book = self._books.get(exchange_symbol(symbol))
+        if book is None:
+            return []
+        started = perf_counter()
+        touched = set(book.unplaced)
+        book.unplaced.clear()
+        generation = self._generation
+        while book.up and book.up[0][0] <= price:
+            _, gen, grid_id = heapq.heappop(book.up)
+            if generation.get(grid_id) == gen:
+                touched.add(grid_id)
+        while book.down and -book.down[0][0] >= price:
+            _, gen, grid_id = heapq.heappop(book.down)
+            if generation.get(grid_id) == gen:
+                touched.add(grid_id)
+
+        fills: List[Fill] = []
+        for grid_id in touched:
+            grid = book.grids[grid_id]
+            grid.on_price(price, fills)
+            self._push(book, grid)
+
+        self.ticks += 1
+        self.touched += len(touched)
+        self.fills += len(fills)
+        self.latency.record(perf_counter() - started)
+        return fills
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "grids": len(self._grids),
+            "symbols": len(self._books),
+            "levels": sum(grid.levels for _, grid in self._grids.values()),
+            "ticks": self.ticks,
+            "grids_touched_per_tick": self.touched / self.ticks if self.ticks else 0.0,
+            "fills": self.fills,
+            "tick_latency": self.latency.snapshot(),
+        }
+
+    def _push(self, book: _Book, grid: Grid) -> None:
+        self._sequence += 1
+        gen = self._generation[grid.grid_id] = self._sequence
+        if grid.placed:
+            if grid.up_trigger is not None:
+                heapq.heappush(book.up, (grid.up_trigger, gen, grid.grid_id))
+            if grid.down_trigger is not None:
+                heapq.heappush(book.down, (-grid.down_trigger, gen, grid.grid_id))
+        else:
+            book.unplaced.add(grid.grid_id)
+        # Drop invalidated entries once they outnumber the live ones.
+        for name in ("up", "down"):
+            heap = getattr(book, name)
+            if len(heap) > 4 * len(book.grids) + 64:
+                heap[:] = [entry for entry in heap if self._generation.get(entry[2]) == entry[1]]
+                heapq.heapify(heap)
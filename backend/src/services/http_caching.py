@@ -0,0 +1,12 @@
+from typing import Optional
+
+
+def not_modified(etag: str, if_none_match: Optional[str]) -> bool:
+    """Whether an ``If-None-Match`` header value matches ``etag``, compared weakly as HTTP requires."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
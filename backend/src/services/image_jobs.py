@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+JOB_STATUSES = ("queued", "running", "done", "error")
+
+
+def prompt_key(prompt: str, upscale: bool = False) -> str:
+    """Content address of an image request: SHA-256 of the normalized prompt and the upscale flag."""
+    normalized = " ".join(prompt.lower().split())
+    return hashlib.sha256(f"{normalized}\0{int(upscale)}".encode()).hexdigest()
+
+
+class ImageJob:
+    """One image generation request, shared by every client that asked for the same image."""
+
+    __slots__ = ("id", "key", "prompt", "upscale", "status", "image_url", "upscaled_image_url", "error",
+                 "cached", "created_at", "finished_at", "_done")
+
+    def __init__(self, key: str, prompt: str, upscale: bool):
+        self.id = str(uuid4())
+        self.key = key
+        self.prompt = prompt
+        self.upscale = upscale
+        self.status = "queued"
+        self.image_url: Optional[str] = None
+        self.upscaled_image_url: Optional[str] = None
+        self.error: Optional[str] = None
+        self.cached = False
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "error")
+
+    def finish(self, result: Optional[Dict[str, Optional[str]]] = None, error: Optional[str] = None) -> None:
+        if result is not None:
+            self.image_url = result["image_url"]
+            self.upscaled_image_url = result.get("upscaled_image_url")
+        self.status = "error" if error is not None else "done"
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        self._done.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "image_url": self.image_url,
+            "upscaled_image_url": self.upscaled_image_url,
+            "error": self.error,
+            "cached": self.cached,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ImageJobQueue:
+    """Runs image generation and upscaling as background jobs.
+
+    ``submit`` returns at once with a job that clients poll, or ``wait``
+    on, by id. Requests are content-addressed by ``prompt_key``:
+
+    - a finished image is answered from an LRU cache of ``cache_size``
+      results, as an already finished job;
+    - a request matching a queued or running job gets that job
+      (single-flight), so identical prompts are generated once;
+    - an upscaled request shares the base image generation of the same
+      prompt, whichever request started it.
+
+    ``workers`` jobs run at once; the rest wait in a FIFO queue. Workers
+    start with the first submitted job. The ``max_jobs`` most recent jobs
+    stay available for polling.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str], Awaitable[str]],
+        upscale: Callable[[str], Awaitable[str]],
+        workers: int = 4,
+        cache_size: int = 1000,
+        max_jobs: int = 10_000,
+    ):
+        self._generate = generate
+        self._upscale = upscale
+        self._workers = workers
+        self._cache_size = cache_size
+        self._max_jobs = max_jobs
+        self._cache: "OrderedDict[str, Dict[str, Optional[str]]]" = OrderedDict()
+        self._jobs: "OrderedDict[str, ImageJob]" = OrderedDict()
+        self._pending: Dict[str, ImageJob] = {}
+        self._generating: Dict[str, "asyncio.Future[str]"] = {}
+        self._queue: Optional["asyncio.Queue[ImageJob]"] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+        self.counts = {"submitted": 0, "cache_hits": 0, "deduplicated": 0, "generated": 0, "upscaled": 0, "failed": 0}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, job_id: str) -> Optional[ImageJob]:
+        return self._jobs.get(job_id)
+
+    def submit(self, prompt: str, upscale: bool = False) -> ImageJob:
+        """Return the job producing this image, starting one only if nothing cached or in flight matches."""
+        self.counts["submitted"] += 1
+        key = prompt_key(prompt, upscale)
+        job = self._pending.get(key)
+        if job is not None:
+            self.counts["deduplicated"] += 1
+            return job
+        job = ImageJob(key, prompt, upscale)
+        self._remember(job)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.counts["cache_hits"] += 1
+            job.cached = True
+            job.finish(cached)
+            return job
+        self._pending[key] = job
+        self.start()
+        assert self._queue is not None
+        self._queue.put_nowait(job)
+        return job
+
+    async def wait(self, job: ImageJob, timeout: Optional[float] = None) -> bool:
+        """Wait up to ``timeout`` seconds for ``job`` to finish; returns whether it has."""
+        if not job.finished:
+            try:
+                await asyncio.wait_for(asyncio.shield(job._done.wait()), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job.finished
+
+    def start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self._workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        for job in self._pending.values():
+            job.finish(error="Image generation stopped")
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": len(self._pending),
+            "cached": len(self._cache),
+            "jobs": len(self._jobs),
+        }
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Optional[str]]]:
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+        return result
+
+    def _cache_put(self, key: str, result: Dict[str, Optional[str]]) -> None:
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _remember(self, job: ImageJob) -> None:
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._max_jobs:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.finished:
+                break
+            self._jobs.popitem(last=False)
+
+    async def _work(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            job.status = "running"
+            try:
+                image_url = await self._base_image(job.prompt)
+                result: Dict[str, Optional[str]] = {"image_url": image_url}
+                if job.upscale:
+                    result["upscaled_image_url"] = await self._upscale(image_url)
+                    self.counts["upscaled"] += 1
+            except Exception as e:
+                self.counts["failed"] += 1
+                job.finish(error=f"{type(e).__name__}: {e}" if str(e) else type(e).__name__)
+            else:
+                self._cache_put(job.key, result)
+                job.finish(result)
+            finally:
+                self._pending.pop(job.key, None)
+
+    async def _base_image(self, prompt: str) -> str:
+        """The generated image of ``prompt``, from the cache, an in-flight generation or a new one."""
+        key = prompt_key(prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached["image_url"]  # type: ignore[return-value]
+        future = self._generating.get(key)
+        if future is None:
+            future = self._generating[key] = asyncio.ensure_future(self._generate(prompt))
+            self.counts["generated"] += 1
+
+            def done(future: "asyncio.Future[str]", key: str = key) -> None:
+                self._generating.pop(key, None)
+                if not future.cancelled() and future.exception() is None:
+                    self._cache_put(key, {"image_url": future.result()})
+
+            future.add_done_callback(done)
+        return await asyncio.shield(future)
@@ -0,0 +1,240 @@
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+from itertools import chain
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, MutableMapping, Optional, Sequence, Tuple
+
+from cryptography.fernet import Fernet, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from config.settings import settings
+from services.metrics import LatencyHistogram
+
+API_KEY_FIELDS = ("encrypted_key", "encrypted_secret")
+
+
+def derive_key(password: bytes, salt: bytes, iterations: int = 100000) -> bytes:
+    """Derive a urlsafe base64 Fernet key from a password with PBKDF2-SHA256."""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(password))
+
+
+def key_fingerprint(key: bytes) -> str:
+    """Short, non-reversible identifier for a key, safe to return from the API."""
+    return hashlib.sha256(key).hexdigest()[:12]
+
+
+class KeyManager:
+    """Process-wide cipher for exchange API credentials.
+
+    The PBKDF2 derivation runs once, on first use, and the resulting
+    ``MultiFernet`` is reused for every encrypt/decrypt afterwards. The first
+    key encrypts; every key decrypts, which is what makes rotation possible.
+
+    Rotated keys only live in the process unless ``keyring_path`` is set:
+    the keyring file then holds the active keys, primary first, and takes
+    the place of the derived and previous keys on the next start. Without
+    it, an operator has to add a rotated key to ``API_KEY_PREVIOUS_KEYS``
+    before restarting, or the records encrypted under it cannot be read.
+    """
+
+    def __init__(
+        self,
+        password: bytes,
+        salt: bytes,
+        iterations: int = 100000,
+        previous_keys: Sequence[bytes] = (),
+        keyring_path: Optional[str] = None,
+    ):
+        self._password = password
+        self._salt = salt
+        self._iterations = iterations
+        self._previous_keys = list(previous_keys)
+        self._keyring = Path(keyring_path) if keyring_path else None
+        self._keys: List[bytes] = []
+        self._cipher: Optional[MultiFernet] = None
+        self._lock = threading.Lock()
+        self._tracked: List[Iterable[MutableMapping[str, Any]]] = []
+        self.latency = {
+            "derive": LatencyHistogram(),
+            "encrypt": LatencyHistogram(),
+            "decrypt": LatencyHistogram(),
+            "reencrypt": LatencyHistogram(),
+        }
+
+    def _get_cipher(self) -> MultiFernet:
+        cipher = self._cipher
+        if cipher is None:
+            with self._lock:
+                if self._cipher is None:
+                    if self._keyring is not None and self._keyring.exists():
+                        self._install(self._keyring.read_bytes().split())
+                    else:
+                        start = perf_counter()
+                        primary = derive_key(self._password, self._salt, self._iterations)
+                        self.latency["derive"].record(perf_counter() - start)
+                        self._install([primary, *self._previous_keys])
+                cipher = self._cipher
+        return cipher
+
+    @property
+    def persistent(self) -> bool:
+        """Whether rotated keys are written to a keyring file and survive a restart."""
+        return self._keyring is not None
+
+    def _save(self, keys: List[bytes]) -> None:
+        """Write ``keys`` to the keyring file, owner-readable only, replacing it in one step."""
+        if self._keyring is None:
+            return
+        self._keyring.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._keyring.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"\n".join(keys) + b"\n")
+            os.replace(tmp, self._keyring)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _install(self, keys: List[bytes]) -> None:
+        self._keys = keys
+        self._cipher = MultiFernet([Fernet(key) for key in keys])
+
+    def track(self, records: Iterable[MutableMapping[str, Any]]) -> None:
+        """Re-encrypt ``records`` on every rotation, along with the ones passed to ``rotate``."""
+        self._tracked.append(records)
+
+    def encrypt(self, plaintext: str) -> str:
+        cipher = self._get_cipher()
+        start = perf_counter()
+        token = cipher.encrypt(plaintext.encode()).decode()
+        self.latency["encrypt"].record(perf_counter() - start)
+        return token
+
+    def decrypt(self, token: str) -> str:
+        cipher = self._get_cipher()
+        start = perf_counter()
+        plaintext = cipher.decrypt(token.encode()).decode()
+        self.latency["decrypt"].record(perf_counter() - start)
+        return plaintext
+
+    def rotate(
+        self,
+        new_key: Optional[bytes] = None,
+        records: Iterable[MutableMapping[str, Any]] = (),
+        fields: Sequence[str] = API_KEY_FIELDS,
+        batch_size: int = 500,
+        retire_old_keys: bool = False,
+    ) -> Tuple[bytes, int, int]:
+        """Make ``new_key`` (or a freshly generated key) the primary key and re-encrypt ``records`` under it.
+
+        Records registered with ``track`` are re-encrypted too.
+
+        All or nothing: every token is re-encrypted first, without touching
+        the records or the active keys. Only once all of them succeeded are
+        the new keys saved to the keyring, installed and the records
+        updated, so a bad token (``InvalidToken``) or a failed keyring write
+        leaves the old keys and records in place. Old keys are kept for
+        decryption unless ``retire_old_keys``. Returns the key, the number
+        of records re-encrypted and the number of keys retired.
+        """
+        self._get_cipher()
+        key = new_key or Fernet.generate_key()
+        Fernet(key)  # Validates the key format before anything is re-encrypted.
+        keys = [key, *[k for k in self._keys if k != key]]
+        updates = self._reencrypt(
+            MultiFernet([Fernet(k) for k in keys]), chain(records, *self._tracked), fields, batch_size
+        )
+        retired = len(keys) - 1 if retire_old_keys else 0
+        if retire_old_keys:
+            keys = keys[:1]
+        with self._lock:
+            self._save(keys)
+            self._install(keys)
+        for record, values in updates:
+            record.update(values)
+        return key, len(updates), retired
+
+    def retire_old_keys(self) -> int:
+        """Drop every key except the primary one and return how many were dropped."""
+        self._get_cipher()
+        with self._lock:
+            retired = len(self._keys) - 1
+            self._save(self._keys[:1])
+            self._install(self._keys[:1])
+        return retired
+
+    def reencrypt_records(
+        self,
+        records: Iterable[MutableMapping[str, Any]],
+        fields: Sequence[str] = API_KEY_FIELDS,
+        batch_size: int = 500,
+    ) -> int:
+        """Re-encrypt ``fields`` of every record under the current primary key.
+
+        Nothing is written back unless every token re-encrypts, so a bad
+        token leaves all records untouched. Returns the number of records
+        updated.
+        """
+        updates = self._reencrypt(self._get_cipher(), records, fields, batch_size)
+        for record, values in updates:
+            record.update(values)
+        return len(updates)
+
+    def _reencrypt(
+        self,
+        cipher: MultiFernet,
+        records: Iterable[MutableMapping[str, Any]],
+        fields: Sequence[str],
+        batch_size: int,
+    ) -> List[Tuple[MutableMapping[str, Any], Dict[str, str]]]:
+        """Re-encrypted field values of every record, computed in batches without writing them back."""
+        updates: List[Tuple[MutableMapping[str, Any], Dict[str, str]]] = []
+        batch: List[MutableMapping[str, Any]] = []
+
+        def flush() -> None:
+            start = perf_counter()
+            for record in batch:
+                updates.append((
+                    record,
+                    {field: cipher.rotate(record[field].encode()).decode() for field in fields if record.get(field)},
+                ))
+            self.latency["reencrypt"].record(perf_counter() - start)
+            batch.clear()
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return updates
+
+    def stats(self) -> Dict[str, Any]:
+        """Key fingerprints and per-operation latency for monitoring."""
+        self._get_cipher()
+        return {
+            "primary_key": key_fingerprint(self._keys[0]),
+            "active_keys": len(self._keys),
+            "persistent": self.persistent,
+            "latency": {name: hist.snapshot() for name, hist in self.latency.items()},
+        }
+
+
+key_manager = KeyManager(
+    password=settings.API_KEY_ENCRYPTION_PASSWORD.encode(),
+    salt=settings.API_KEY_ENCRYPTION_SALT.encode(),
+    iterations=settings.API_KEY_KDF_ITERATIONS,
+    previous_keys=[k.strip().encode() for k in settings.API_KEY_PREVIOUS_KEYS.split(",") if k.strip()],
+    keyring_path=settings.API_KEY_KEYRING_FILE or None,
+)
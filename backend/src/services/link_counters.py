@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from services.metrics import LatencyHistogram
+
+COUNTER_FIELDS = ("clicks", "conversions", "revenue")
+
+
+class LinkCounters:
+    """Click, conversion and revenue counters of affiliate links, merged in batches.
+
+    ``add`` only accumulates a per-link delta in memory; ``merge`` (run every
+    ``interval`` seconds once started) swaps the pending deltas out and hands
+    each link's delta to ``apply``, which writes it to storage and returns
+    False for links that no longer exist. The pending deltas sit behind one
+    lock, so increments made from threadpool handlers are not lost either.
+
+    Totals over all links are kept pre-aggregated. Reads are approximate
+    by default, i.e. as of the last merge; ``exact`` reads add the deltas
+    still pending.
+    """
+
+    def __init__(self, apply: Callable[[str, List[float]], bool], interval: float = 1.0):
+        self._apply = apply
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._deltas: Dict[str, List[float]] = {}
+        self._totals: List[float] = [0, 0, 0.0]
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.merges = 0
+        self.merged_links = 0
+        self.latency = LatencyHistogram()
+
+    def seed(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Count the stored values of existing links into the totals."""
+        for record in records:
+            for i, field in enumerate(COUNTER_FIELDS):
+                self._totals[i] += record.get(field) or 0
+
+    def forget(self, record: Dict[str, Any]) -> None:
+        """Take a deleted link's stored values out of the totals."""
+        for i, field in enumerate(COUNTER_FIELDS):
+            self._totals[i] -= record.get(field) or 0
+
+    def add(self, link_id: str, clicks: int = 0, conversions: int = 0, revenue: float = 0.0) -> None:
+        with self._lock:
+            delta = self._deltas.get(link_id)
+            if delta is None:
+                self._deltas[link_id] = [clicks, conversions, revenue]
+            else:
+                delta[0] += clicks
+                delta[1] += conversions
+                delta[2] += revenue
+
+    def value(self, record: Dict[str, Any], exact: bool = False) -> Dict[str, float]:
+        """Counters of the stored link ``record``, plus its unmerged delta if ``exact``."""
+        values = [record.get(field) or 0 for field in COUNTER_FIELDS]
+        if exact:
+            with self._lock:
+                delta = self._deltas.get(str(record["id"]))
+                if delta is not None:
+                    values = [v + d for v, d in zip(values, delta)]
+        return dict(zip(COUNTER_FIELDS, values))
+
+    def totals(self, exact: bool = False) -> Dict[str, float]:
+        """Counters summed over all links in O(1), or O(unmerged links) if ``exact``."""
+        values = list(self._totals)
+        if exact:
+            with self._lock:
+                for delta in self._deltas.values():
+                    values = [v + d for v, d in zip(values, delta)]
+        return dict(zip(COUNTER_FIELDS, values))
+
+    def merge(self) -> int:
+        """Write the pending deltas to storage and return how many links changed."""
+        started = perf_counter()
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        for link_id, delta in deltas.items():
+            if self._apply(link_id, delta):
+                self._totals = [t + d for t, d in zip(self._totals, delta)]
+        if deltas:
+            self.merges += 1
+            self.merged_links += len(deltas)
+            self.latency.record(perf_counter() - started)
+        return len(deltas)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.merge()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "pending_links": len(self._deltas),
+            "merges": self.merges,
+            "merged_links": self.merged_links,
+            "merge_latency": self.latency.snapshot(),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            self.merge()
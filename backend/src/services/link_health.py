@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import random
+from collections import deque
+from datetime import datetime
+from time import perf_counter, time
+from typing import Any, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from services.rate_limit import TokenBucket
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+GET_FALLBACK_STATUSES = {403, 405, 501}  # servers that refuse HEAD but may serve GET
+
+logger = logging.getLogger(__name__)
+
+
+class Health(NamedTuple):
+    """Last probe result of a URL; ``failures`` counts consecutive failed checks."""
+
+    ok: bool
+    status: Optional[int]
+    error: Optional[str]
+    checked_at: float
+    failures: int
+    seconds: float
+
+
+class _Host:
+    __slots__ = ("urls", "bucket", "client", "lanes")
+
+    def __init__(self, rate: float, burst: int):
+        self.urls: Deque[str] = deque()
+        self.bucket = TokenBucket(rate, burst)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.lanes = 0
+
+
+class LinkHealthChecker:
+    """Probes URLs with HEAD, falling back to GET, and tracks which ones are dead.
+
+    A check groups its URLs by host and runs ``concurrency`` workers over
+    per-host lanes: each host gets up to ``host_concurrency`` lanes and
+    a token bucket of ``host_rate`` requests per second, so no host sees
+    more than that however many of its URLs are queued, while other hosts
+    keep the workers busy. Each host being checked has its own small
+    connection pool, as httpx's pool does work per pooled connection on
+    every request. Timeouts, connection errors, 429 and 5xx are
+    retried up to ``retries`` times after ``retry_delay`` seconds, doubled
+    for every retry and jittered.
+
+    Results are cached: a healthy URL is not probed again for ``ttl``
+    seconds, and a failing one after ``backoff`` seconds doubled for every
+    consecutive failed check, up to ``ttl``. When a URL fails
+    ``failure_threshold`` checks in a row it is passed to ``on_dead``, and
+    to ``on_recover`` once it answers again. A URL that cannot be parsed
+    fails its check without being requested.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 200,
+        host_rate: float = 5.0,
+        host_concurrency: int = 4,
+        timeout: float = 10.0,
+        retries: int = 2,
+        retry_delay: float = 0.5,
+        backoff: float = 60.0,
+        ttl: float = 3_600.0,
+        failure_threshold: int = 3,
+        on_dead: Optional[Callable[[str], None]] = None,
+        on_recover: Optional[Callable[[str], None]] = None,
+    ):
+        self._concurrency = concurrency
+        self._host_rate = host_rate
+        self._host_concurrency = host_concurrency
+        self._timeout = timeout
+        self._retries = retries
+        self._retry_delay = retry_delay
+        self._backoff = backoff
+        self._ttl = ttl
+        self._failure_threshold = failure_threshold
+        self._on_dead = on_dead
+        self._on_recover = on_recover
+        self._ssl = httpx.create_ssl_context()
+        self._results: Dict[str, Health] = {}
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.runs = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def health(self, url: str) -> Optional[Health]:
+        return self._results.get(url)
+
+    def is_dead(self, url: str) -> bool:
+        result = self._results.get(url)
+        return result is not None and result.failures >= self._failure_threshold
+
+    def failing(self, limit: int = 100) -> List[Tuple[str, Health]]:
+        """Up to ``limit`` URLs whose last check failed, most consecutive failures first."""
+        failing = [(url, result) for url, result in self._results.items() if not result.ok]
+        failing.sort(key=lambda item: -item[1].failures)
+        return failing[:limit]
+
+    def due(self, url: str, now: Optional[float] = None) -> bool:
+        """Whether ``url``'s cached result has expired."""
+        result = self._results.get(url)
+        if result is None:
+            return True
+        wait = self._ttl if result.ok else min(self._ttl, self._backoff * 2 ** (result.failures - 1))
+        return (time() if now is None else now) >= result.checked_at + wait
+
+    def forget(self, url: str) -> None:
+        self._results.pop(url, None)
+
+    async def check(self, urls: Iterable[str], force: bool = False) -> Dict[str, Any]:
+        """Probe every URL in ``urls`` whose cached result expired, or all of them with ``force``."""
+        started = perf_counter()
+        now = time()
+        hosts: Dict[str, _Host] = {}
+        summary = {
+            "urls": 0, "cached": 0, "probed": 0, "healthy": 0, "failed": 0,
+            "dead": 0, "recovered": 0, "requests": 0, "retries": 0,
+        }
+        for url in dict.fromkeys(urls):
+            summary["urls"] += 1
+            if not force and not self.due(url, now):
+                summary["cached"] += 1
+                continue
+            try:
+                host = urlsplit(url).netloc.lower()
+            except ValueError as e:
+                self._record(url, (None, f"ValueError: {e}", 0.0), summary)
+                continue
+            lane = hosts.get(host)
+            if lane is None:
+                lane = hosts[host] = _Host(self._host_rate, self._host_concurrency)
+            lane.urls.append(url)
+
+        # Round-robin over hosts, so the workers spread over as many hosts as they can.
+        lanes: Deque[_Host] = deque()
+        for round_ in range(self._host_concurrency):
+            lanes.extend(host for host in hosts.values() if len(host.urls) > round_)
+
+        async def worker() -> None:
+            while lanes:
+                host = lanes.popleft()
+                if not host.urls:
+                    continue
+                if host.client is None:
+                    host.client = httpx.AsyncClient(
+                        verify=self._ssl,
+                        timeout=self._timeout,
+                        follow_redirects=True,
+                        limits=httpx.Limits(max_connections=self._host_concurrency),
+                    )
+                host.lanes += 1
+                try:
+                    while host.urls:
+                        url = host.urls.popleft()
+                        self._record(url, await self._probe(url, host, summary), summary)
+                finally:
+                    host.lanes -= 1
+                    if not host.lanes:
+                        client, host.client = host.client, None
+                        await client.aclose()
+
+        await asyncio.gather(*(worker() for _ in range(min(self._concurrency, len(lanes)))))
+        elapsed = perf_counter() - started
+        self.runs += 1
+        self.last_run = {
+            "finished_at": datetime.utcnow(),
+            "seconds": elapsed,
+            "urls_per_second": summary["probed"] / elapsed if elapsed else 0.0,
+            "hosts": len(hosts),
+            **summary,
+        }
+        return self.last_run
+
+    def start(self, urls: Callable[[], Iterable[str]], interval: float) -> None:
+        """Check the URLs returned by ``urls`` every ``interval`` seconds."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(urls, interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, urls: Callable[[], Iterable[str]], interval: float) -> None:
+        while True:
+            try:
+                await self.check(urls())
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Link health check run failed")
+            await asyncio.sleep(interval)
+
+    async def _probe(self, url: str, host: _Host, summary: Dict[str, Any]) -> Tuple[Optional[int], Optional[str], float]:
+        """Return ``(status, error, seconds)`` of the last attempt."""
+        assert host.client is not None
+        status: Optional[int] = None
+        error: Optional[str] = None
+        for attempt in range(self._retries + 1):
+            if attempt:
+                summary["retries"] += 1
+                await asyncio.sleep(random.uniform(0.5, 1.0) * self._retry_delay * 2 ** (attempt - 1))
+            started = perf_counter()
+            try:
+                await host.bucket.acquire()
+                summary["requests"] += 1
+                response = await host.client.head(url)
+                if response.status_code in GET_FALLBACK_STATUSES:
+                    await host.bucket.acquire()
+                    summary["requests"] += 1
+                    async with host.client.stream("GET", url) as response:
+                        pass
+                status, error = response.status_code, None
+            except httpx.InvalidURL as e:
+                status, error = None, f"InvalidURL: {e}"
+                break
+            except httpx.HTTPError as e:
+                status, error = None, f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                continue
+            if status not in RETRY_STATUSES:
+                break
+        return status, error, perf_counter() - started
+
+    def _record(self, url: str, outcome: Tuple[Optional[int], Optional[str], float], summary: Dict[str, Any]) -> None:
+        status, error, seconds = outcome
+        previous = self._results.get(url)
+        was_dead = previous is not None and previous.failures >= self._failure_threshold
+        ok = status is not None and status < 400
+        failures = 0 if ok else (previous.failures if previous is not None else 0) + 1
+        self._results[url] = Health(ok, status, error, time(), failures, seconds)
+        summary["probed"] += 1
+        summary["healthy" if ok else "failed"] += 1
+        if ok and was_dead:
+            summary["recovered"] += 1
+            if self._on_recover is not None:
+                self._on_recover(url)
+        elif failures == self._failure_threshold:
+            summary["dead"] += 1
+            if self._on_dead is not None:
+                self._on_dead(url)
+
@@ -0,0 +1,309 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from time import perf_counter
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.backtesting import CANDLE_COLUMNS, Candles
+from services.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+TICKER = "ticker"
+
+Connector = Callable[[Sequence[str]], AsyncIterator[bytes]]
+CandleListener = Callable[[str, str, float], None]
+PriceListener = Callable[[str, float, float], None]
+
+
+class MarketDataError(RuntimeError):
+    """Raised when the market-data feed cannot be set up."""
+
+
+def exchange_symbol(symbol: str) -> str:
+    """``BTC/USDT`` -> ``BTCUSDT``, the form the exchange streams use."""
+    return symbol.replace("/", "").upper()
+
+
+def stream_names(symbols: Iterable[str], intervals: Iterable[str], tickers: bool = True) -> List[str]:
+    """Combined-stream names for kline (and mini ticker) updates of ``symbols``."""
+    names = []
+    for symbol in symbols:
+        lower = exchange_symbol(symbol).lower()
+        names.extend(f"{lower}@kline_{interval}" for interval in intervals)
+        if tickers:
+            names.append(f"{lower}@miniTicker")
+    return names
+
+
+class RingBuffer:
+    """Fixed-capacity OHLCV history for one symbol and interval.
+
+    Every row is written twice, at ``slot`` and ``slot + capacity``, so the
+    most recent rows are always contiguous and ``candles`` can return NumPy
+    views instead of copies. Views are overwritten as new rows arrive;
+    readers that keep them across an ``await`` should copy them first.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._timestamp = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((len(CANDLE_COLUMNS) - 1, 2 * capacity), dtype=np.float64)
+        self._next = 0
+        self._count = 0
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self._timestamp[self._next - 1 + self.capacity]) if self._count else None
+
+    def push(self, timestamp: int, values: Tuple[float, float, float, float, float]) -> bool:
+        """Append a row, or overwrite the newest one if ``timestamp`` matches it.
+
+        Rows older than the newest one are dropped and False is returned.
+        """
+        last = self.last_timestamp
+        if last is not None and timestamp < last:
+            return False
+        if last is not None and timestamp == last:
+            slot = (self._next - 1) % self.capacity
+        else:
+            slot = self._next
+            self._next = (slot + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+        for position in (slot, slot + self.capacity):
+            self._timestamp[position] = timestamp
+            self._values[:, position] = values
+        self.version += 1
+        return True
+
+    def candles(self, limit: Optional[int] = None) -> Candles:
+        """The newest ``limit`` rows (all by default), oldest first, without copying."""
+        count = self._count if limit is None else max(0, min(limit, self._count))
+        end = self._next + self.capacity
+        start = end - count
+        return Candles(self._timestamp[start:end], *self._values[:, start:end])
+
+
+class MarketDataFeed:
+    """Ingest kline and mini ticker streams into per-symbol ring buffers.
+
+    A reader task pulls raw messages from ``connect`` into a bounded queue;
+    when the queue is full the reader stops reading, so backpressure reaches
+    the socket instead of growing memory. A consumer task drains the queue
+    in batches of up to ``batch_size`` and applies them to the buffers.
+    Dropped connections are retried with jittered exponential backoff.
+
+    ``pipeline`` latency runs from reading a message to applying it;
+    ``exchange`` latency runs from the event time stamped by the exchange
+    and so includes the network and clock skew.
+    """
+
+    def __init__(
+        self,
+        connect: Connector,
+        streams: Sequence[str],
+        capacity: int = 1000,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        max_backoff: float = 30.0,
+    ):
+        self._connect = connect
+        self._streams = list(streams)
+        self._capacity = capacity
+        self._batch_size = batch_size
+        self._max_backoff = max_backoff
+        self._queue: "asyncio.Queue[Tuple[float, bytes]]" = asyncio.Queue(maxsize=queue_size)
+        self._buffers: Dict[Tuple[str, str], RingBuffer] = {}
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._listeners: List[CandleListener] = []
+        self._price_listeners: List[PriceListener] = []
+        self._started_at: Optional[float] = None
+        self.connected = False
+        self.messages = 0
+        self.batches = 0
+        self.errors = 0
+        self.listener_errors = 0
+        self.stale = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+        self.latency = {"pipeline": LatencyHistogram(), "exchange": LatencyHistogram()}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._started_at = perf_counter()
+        self._tasks = [asyncio.create_task(self._read()), asyncio.create_task(self._consume())]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.connected = False
+
+    def add_listener(self, listener: CandleListener) -> None:
+        """Call ``listener(symbol, interval, received_at)`` whenever a kline closes.
+
+        ``received_at`` is the ``perf_counter`` time the message was read.
+        Listeners run inside the consumer task and must not block; one that
+        raises is counted in ``listener_errors`` and logged, and the batch
+        carries on.
+        """
+        self._listeners.append(listener)
+
+    def add_price_listener(self, listener: PriceListener) -> None:
+        """Call ``listener(symbol, price, received_at)`` with the close of every kline and ticker update."""
+        self._price_listeners.append(listener)
+
+    def buffer(self, symbol: str, interval: str) -> Optional[RingBuffer]:
+        """Ring buffer for ``symbol`` (``BTC/USDT`` or ``BTCUSDT``) and ``interval`` or ``TICKER``."""
+        return self._buffers.get((exchange_symbol(symbol), interval))
+
+    def candles(self, symbol: str, interval: str, limit: Optional[int] = None) -> Optional[Candles]:
+        buffer = self.buffer(symbol, interval)
+        return None if buffer is None else buffer.candles(limit)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "running": self.running,
+            "connected": self.connected,
+            "streams": len(self._streams),
+            "buffers": len(self._buffers),
+            "messages": self.messages,
+            "messages_per_second": self.messages / elapsed if elapsed else 0.0,
+            "batches": self.batches,
+            "queue_depth": self._queue.qsize(),
+            "errors": self.errors,
+            "listener_errors": self.listener_errors,
+            "stale": self.stale,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+            "latency": {name: histogram.snapshot() for name, histogram in self.latency.items()},
+        }
+
+    async def _read(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                async for raw in self._connect(self._streams):
+                    self.connected = True
+                    attempt = 0
+                    await self._queue.put((perf_counter(), raw))
+                self.last_error = "Connection closed"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            self.connected = False
+            self.reconnects += 1
+            delay = min(self._max_backoff, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _consume(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self._batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            self._apply(batch)
+            self.batches += 1
+
+    def _apply(self, batch: List[Tuple[float, bytes]]) -> None:
+        pipeline = self.latency["pipeline"]
+        exchange = self.latency["exchange"]
+        for received_at, raw in batch:
+            try:
+                message = json.loads(raw)
+                data = message.get("data", message)
+                event = data["e"]
+                closed = False
+                if event == "kline":
+                    k = data["k"]
+                    key = (data["s"], k["i"])
+                    timestamp = int(k["t"])
+                    values = (float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]))
+                    closed = bool(k.get("x"))
+                elif event == "24hrMiniTicker":
+                    key = (data["s"], TICKER)
+                    timestamp = int(data["E"])
+                    values = (float(data["o"]), float(data["h"]), float(data["l"]), float(data["c"]), float(data["v"]))
+                else:
+                    continue
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.errors += 1
+                continue
+
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = RingBuffer(self._capacity)
+            if not buffer.push(timestamp, values):
+                self.stale += 1
+            else:
+                for price_listener in self._price_listeners:
+                    try:
+                        price_listener(key[0], values[3], received_at)
+                    except Exception:
+                        self._listener_failed(price_listener, key)
+                if closed:
+                    for listener in self._listeners:
+                        try:
+                            listener(key[0], key[1], received_at)
+                        except Exception:
+                            self._listener_failed(listener, key)
+            self.messages += 1
+            pipeline.record(perf_counter() - received_at)
+            if "E" in data:
+                exchange.record(max(0.0, time.time() - data["E"] / 1000))
+
+
+    def _listener_failed(self, listener: Callable[..., None], key: Tuple[str, str]) -> None:
+        self.listener_errors += 1
+        logger.exception("Market data listener %r failed on %s %s", listener, *key)
+
+
+def tcp_connector(host: str, port: int) -> Connector:
+    """Connect to a line-delimited feed over TCP, such as the benchmarks' ``ReplayServer``."""
+
+    async def connect(streams: Sequence[str]) -> AsyncIterator[bytes]:
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        try:
+            writer.write(json.dumps({"method": "SUBSCRIBE", "params": list(streams), "id": 1}).encode() + b"\n")
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                yield line
+        finally:
+            writer.close()
+
+    return connect
+
+
+def websocket_connector(url: str) -> Connector:
+    """Connect to the exchange's combined-stream websocket endpoint."""
+
+    async def connect(streams: Sequence[str]) -> AsyncIterator[bytes]:
+        try:
+            import websockets
+        except ImportError:
+            raise MarketDataError("Streaming from the exchange requires the websockets package")
+        async with websockets.connect(f"{url.rstrip('/')}/stream?streams={'/'.join(streams)}") as socket:
+            async for message in socket:
+                yield message
+
+    return connect
@@ -0,0 +1,377 @@
+import asyncio
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import httpx
+
+CONTENT_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".gif": "image/gif", ".webp": "image/webp"}
+MAX_DIMENSION = 8192
+
+# Sizes each platform shows a post's image at, cropped to fill.
+PLATFORM_RENDITIONS: Dict[str, str] = {
+    "instagram": "1080x1350",
+    "facebook": "1200x630",
+    "twitter": "1600x900",
+    "linkedin": "1200x627",
+    "pinterest": "1000x1500",
+    "tiktok": "1080x1920",
+    "youtube": "1280x720",
+}
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+_SPEC = re.compile(r"^(\d+)x(\d+)$")
+
+logger = logging.getLogger(__name__)
+
+
+class MediaError(Exception):
+    pass
+
+
+def sniff_extension(data: bytes) -> Optional[str]:
+    """File extension of an image from its leading bytes, None if it is not a supported image."""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return ".gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def parse_spec(spec: str) -> Tuple[int, int]:
+    """Width and height of a ``<width>x<height>`` rendition spec."""
+    match = _SPEC.match(spec)
+    if match is None:
+        raise MediaError(f"Invalid rendition spec: {spec!r}")
+    width, height = int(match.group(1)), int(match.group(2))
+    if not (0 < width <= MAX_DIMENSION and 0 < height <= MAX_DIMENSION):
+        raise MediaError(f"Rendition size out of range: {spec}")
+    return width, height
+
+
+def _write_atomic(path: Path, write: Callable[[str], None]) -> None:
+    """Write ``path`` through a temporary file in the same directory, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def render(source: str, target: str, width: int, height: int, quality: int = 85) -> None:
+    """Write ``source`` cropped to fill ``width`` x ``height`` as a JPEG at ``target``."""
+    render_batch(source, [(target, width, height)], quality)
+
+
+def render_batch(source: str, targets: Sequence[Tuple[str, int, int]], quality: int = 85) -> None:
+    """Write ``source`` cropped to fill each ``(target, width, height)`` as a JPEG.
+
+    The source is decoded once for all targets, JPEGs at the smallest DCT
+    scale that still covers the largest target. Each target is resized
+    straight from its centered crop, reducing by whole factors before the
+    Lanczos pass.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise MediaError("Rendering image sizes requires Pillow")
+    with Image.open(source) as original:
+        source_width, source_height = original.size
+        if original.getexif().get(0x0112) in (5, 6, 7, 8):  # rotated a quarter turn by exif_transpose
+            source_width, source_height = source_height, source_width
+        scale = max(max(width / source_width, height / source_height) for _, width, height in targets)
+        if scale < 1:
+            size = (math.ceil(original.size[0] * scale), math.ceil(original.size[1] * scale))
+            original.draft("RGB", size)
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        for target, width, height in targets:
+            resized = image.resize((width, height), Image.LANCZOS, box=_crop_box(image.size, width, height), reducing_gap=2.0)
+            _write_atomic(Path(target), lambda tmp: resized.save(tmp, "JPEG", quality=quality, optimize=True))
+
+
+def _crop_box(size: Tuple[int, int], width: int, height: int) -> Tuple[float, float, float, float]:
+    """The centered box of ``size`` with the aspect ratio of ``width`` x ``height``."""
+    source_width, source_height = size
+    if source_width * height > source_height * width:
+        crop_width = source_height * width / height
+        left = (source_width - crop_width) / 2
+        return left, 0, left + crop_width, source_height
+    crop_height = source_width * height / width
+    top = (source_height - crop_height) / 2
+    return 0, top, source_width, top + crop_height
+
+
+class MediaStore:
+    """Content-addressed store of generated and upscaled images.
+
+    Images are saved once under the SHA-256 of their bytes, at
+    ``root/objects/<2 hex>/<digest><ext>``, and served from disk; saving
+    the same bytes again is free. ``fetch`` downloads a remote image once:
+    concurrent fetches of a URL share one download, and the URL's digest
+    is appended to ``root/urls.tsv`` so it is not downloaded again after a
+    restart either.
+
+    Renditions, the image cropped to a ``<width>x<height>`` spec, are
+    rendered once into ``root/renditions/`` and reused for every platform
+    asking for that size and every publishing retry. They are rendered in a
+    pool of ``workers`` processes (one per CPU by default), every size an
+    image still needs in one task, and need Pillow.
+
+    Media is addressed at ``base_url/<digest><ext>`` and
+    ``base_url/<digest>/<spec>.jpg``; both never change, so they are served
+    with the digest as ETag and cached forever.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        base_url: str = "/media",
+        timeout: float = 30.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        workers: Optional[int] = None,
+    ):
+        self._root = Path(root)
+        self._base_url = base_url.rstrip("/")
+        self._timeout = timeout
+        self._max_bytes = max_bytes
+        self._workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._objects: Dict[str, Path] = {}
+        self._urls: Dict[str, str] = {}
+        self._origins: Dict[str, str] = {}
+        self._loaded = False
+        self._client: Optional[httpx.AsyncClient] = None
+        self._fetching: Dict[str, "asyncio.Future[str]"] = {}
+        self._rendering: Dict[Tuple[str, str], "asyncio.Future[None]"] = {}
+        self.counts = {
+            "stored": 0, "deduplicated": 0, "downloaded": 0, "download_hits": 0,
+            "rendered": 0, "batches": 0, "rendition_hits": 0,
+        }
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._objects)
+
+    def __contains__(self, digest: str) -> bool:
+        self._load()
+        return digest in self._objects
+
+    def path(self, digest: str) -> Optional[Path]:
+        self._load()
+        return self._objects.get(digest)
+
+    def content_type(self, digest: str) -> str:
+        path = self.path(digest)
+        return CONTENT_TYPES.get(path.suffix, "application/octet-stream") if path else "application/octet-stream"
+
+    def url(self, digest: str, spec: Optional[str] = None) -> str:
+        if spec is not None:
+            return f"{self._base_url}/{digest}/{spec}.jpg"
+        path = self.path(digest)
+        return f"{self._base_url}/{digest}{path.suffix if path else ''}"
+
+    @staticmethod
+    def etag(digest: str, spec: Optional[str] = None) -> str:
+        return f'"{digest}-{spec}"' if spec else f'"{digest}"'
+
+    def digest_of(self, url: Optional[str]) -> Optional[str]:
+        """Digest of the image at ``url``, a media URL of this store or a remote URL already fetched."""
+        if not url:
+            return None
+        self._load()
+        if url.startswith(self._base_url + "/"):
+            name = url[len(self._base_url) + 1:].split("/")[0].split(".")[0]
+            return name if name in self._objects else None
+        return self._urls.get(url)
+
+    def origin(self, url: str) -> str:
+        """The remote URL a media URL of this store was fetched from, or ``url`` itself."""
+        digest = self.digest_of(url)
+        return self._origins.get(digest, url) if digest else url
+
+    def put(self, data: bytes) -> str:
+        """Save image bytes and return their digest; bytes already stored are not written again."""
+        extension = sniff_extension(data)
+        if extension is None:
+            raise MediaError("Not a PNG, JPEG, GIF or WebP image")
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self:
+            self.counts["deduplicated"] += 1
+            return digest
+        path = self._root / "objects" / digest[:2] / f"{digest}{extension}"
+
+        def write(tmp: str) -> None:
+            with open(tmp, "wb") as f:
+                f.write(data)
+
+        _write_atomic(path, write)
+        self._objects[digest] = path
+        self.counts["stored"] += 1
+        return digest
+
+    async def fetch(self, url: str) -> str:
+        """Digest of the image at ``url``, downloading it only the first time."""
+        digest = self.digest_of(url)
+        if digest is not None:
+            self.counts["download_hits"] += 1
+            return digest
+        future = self._fetching.get(url)
+        if future is None:
+            future = self._fetching[url] = asyncio.ensure_future(self._download(url))
+            future.add_done_callback(lambda _, url=url: self._fetching.pop(url, None))
+        else:
+            self.counts["download_hits"] += 1
+        return await asyncio.shield(future)
+
+    async def localize(self, url: Optional[str]) -> Optional[str]:
+        """This store's URL for the image at remote ``url``; ``url`` unchanged if it cannot be fetched."""
+        if not url or not url.startswith(("http://", "https://")):
+            return url
+        try:
+            return self.url(await self.fetch(url))
+        except MediaError as e:
+            logger.warning("Keeping remote image %s: %s", url, e)
+            return url
+
+    def rendition_path(self, digest: str, spec: str) -> Path:
+        return self._root / "renditions" / digest[:2] / digest / f"{spec}.jpg"
+
+    async def rendition(self, digest: str, spec: str) -> Path:
+        """Path of ``digest`` rendered at ``spec``, rendering it only the first time."""
+        return (await self.renditions(digest, [spec]))[spec]
+
+    async def renditions(self, digest: str, specs: Iterable[str]) -> Dict[str, Path]:
+        """Paths of ``digest`` rendered at each of ``specs``, rendering only the ones not rendered yet.
+
+        The missing specs are rendered together in one worker process task,
+        decoding the image once. Specs already being rendered for another
+        caller are waited for instead of rendered again.
+        """
+        source = self.path(digest)
+        if source is None:
+            raise MediaError(f"Unknown media {digest}")
+        paths: Dict[str, Path] = {}
+        waiting = []
+        missing = []
+        for spec in dict.fromkeys(specs):
+            width, height = parse_spec(spec)
+            paths[spec] = target = self.rendition_path(digest, spec)
+            future = self._rendering.get((digest, spec))
+            if future is not None:
+                waiting.append(future)
+            elif not target.exists():
+                missing.append((spec, str(target), width, height))
+                continue
+            self.counts["rendition_hits"] += 1
+        if missing:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._get_pool(), render_batch, str(source), [(target, width, height) for _, target, width, height in missing]
+            )
+            for spec, _, _, _ in missing:
+                key = (digest, spec)
+                self._rendering[key] = future
+                future.add_done_callback(lambda _, key=key: self._rendering.pop(key, None))
+            self.counts["rendered"] += len(missing)
+            self.counts["batches"] += 1
+            waiting.append(future)
+        try:
+            for future in dict.fromkeys(waiting):
+                await asyncio.shield(future)
+        except BrokenProcessPool:
+            self._pool = None  # a worker died; start a new pool for the next renders
+            raise
+        return paths
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "objects": len(self),
+            "urls": len(self._urls),
+            "fetching": len(self._fetching),
+            "rendering": len(self._rendering),
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Rendering worker pool, started on first use.
+
+        Workers are spawned rather than forked so they never inherit the
+        event loop or its threads.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _load(self) -> None:
+        """Index the objects and fetched URLs already on disk, once."""
+        if self._loaded:
+            return
+        self._loaded = True
+        for path in (self._root / "objects").glob("*/*"):
+            if _DIGEST.match(path.stem) and path.suffix in CONTENT_TYPES:
+                self._objects[path.stem] = path
+        urls = self._root / "urls.tsv"
+        if urls.exists():
+            for line in urls.read_text().splitlines():
+                url, _, digest = line.rpartition("\t")
+                if digest in self._objects:
+                    self._urls[url] = digest
+                    self._origins.setdefault(digest, url)
+
+    async def _download(self, url: str) -> str:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self._timeout, follow_redirects=True)
+        try:
+            async with self._client.stream("GET", url) as response:
+                response.raise_for_status()
+                chunks, size = [], 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > self._max_bytes:
+                        raise MediaError(f"Image larger than {self._max_bytes} bytes")
+                    chunks.append(chunk)
+        except httpx.HTTPError as e:
+            raise MediaError(f"Downloading {url} failed: {type(e).__name__}: {e}")
+        digest = await asyncio.to_thread(self.put, b"".join(chunks))
+        self.counts["downloaded"] += 1
+        self._urls[url] = digest
+        self._origins.setdefault(digest, url)
+        if "\t" not in url and "\n" not in url:
+            self._root.mkdir(parents=True, exist_ok=True)
+            with open(self._root / "urls.tsv", "a") as f:
+                f.write(f"{url}\t{digest}\n")
+        return digest
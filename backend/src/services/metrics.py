@@ -0,0 +1,65 @@
+import math
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+
+class LatencyHistogram:
+    """Fixed-memory latency histogram with log-spaced buckets.
+
+    Samples are recorded in seconds and reported in microseconds. Bucket
+    bounds grow by ``growth`` per step, so percentiles are accurate to within
+    that relative error regardless of how many samples have been recorded.
+    """
+
+    def __init__(self, min_us: float = 0.1, max_us: float = 60_000_000.0, growth: float = 1.05):
+        steps = int(math.ceil(math.log(max_us / min_us) / math.log(growth))) + 1
+        self._bounds: List[float] = [min_us * growth ** i for i in range(steps)]
+        self._counts: List[int] = [0] * (steps + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Record a single sample measured in seconds."""
+        us = seconds * 1_000_000
+        index = bisect_left(self._bounds, us)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_us += us
+            if us > self.max_us:
+                self.max_us = us
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the upper bucket bound for the ``q``-th percentile in microseconds."""
+        if self.count == 0:
+            return None
+        rank = max(1, int(math.ceil(self.count * q / 100)))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                if index >= len(self._bounds):
+                    return self.max_us
+                return min(self._bounds[index], self.max_us)
+        return self.max_us
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self.count = 0
+            self.total_us = 0.0
+            self.max_us = 0.0
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """Summarize the histogram for API responses."""
+        return {
+            "count": self.count,
+            "mean_us": self.total_us / self.count if self.count else None,
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            "max_us": self.max_us if self.count else None,
+        }
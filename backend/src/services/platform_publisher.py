@@ -0,0 +1,175 @@
+import asyncio
+import json
+import random
+from time import perf_counter
+from typing import Any, Dict, Mapping, Optional
+
+import httpx
+
+from services.metrics import LatencyHistogram
+from services.rate_limit import TokenBucket
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 60.0  # seconds; longer Retry-After values fail the attempt instead
+
+
+class _Platform:
+    __slots__ = ("bucket", "limit", "client", "stats", "latency")
+
+    def __init__(self, rate: float, burst: int, concurrency: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = asyncio.Semaphore(concurrency)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.stats = {"requests": 0, "posted": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+        self.latency = LatencyHistogram()
+
+
+class PlatformPublisher:
+    """Publishes a post to several social platforms at once.
+
+    Every platform has its own token bucket of ``rate`` requests per second
+    (``rates`` overrides it per platform), at most ``concurrency`` requests
+    in flight and its own connection pool, so a slow or throttled platform
+    only queues its own requests. ``publish`` returns one result per
+    platform; a post that fails on one platform still goes out on the rest.
+
+    Each platform is called with ``POST`` on ``url`` formatted with
+    ``platform``, a JSON body of the post's text and image, the
+    connection's bearer token and an ``Idempotency-Key`` of post and
+    platform, so a retry after a lost response does not post twice. 429,
+    5xx, timeouts and connection errors are retried up to ``retries``
+    times after ``retry_delay`` seconds, doubled for every retry and
+    jittered, or after the ``Retry-After`` the platform asked for.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        rate: float = 5.0,
+        rates: Optional[Mapping[str, float]] = None,
+        concurrency: int = 4,
+        timeout: float = 10.0,
+        retries: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        self._url = url
+        self._rate = rate
+        self._rates = dict(rates or {})
+        self._concurrency = concurrency
+        self._timeout = timeout
+        self._retries = retries
+        self._retry_delay = retry_delay
+        self._platforms: Dict[str, _Platform] = {}
+
+    async def publish(
+        self,
+        post: Dict[str, Any],
+        tokens: Mapping[str, Optional[str]],
+        images: Optional[Mapping[str, str]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Send ``post`` to every platform in ``tokens`` (platform to token) and return each one's result.
+
+        ``images`` replaces the post's image URL per platform, with a
+        rendition sized for it. A result has ``status`` (posted or error), ``attempts``,
+        ``http_status``, the platform's ``external_id``, ``error`` and
+        ``seconds``.
+        """
+        platforms = list(tokens)
+        images = images or {}
+        results = await asyncio.gather(*(
+            self._publish_to(platform, post, tokens[platform], images.get(platform)) for platform in platforms
+        ))
+        return dict(zip(platforms, results))
+
+    async def close(self) -> None:
+        for platform in self._platforms.values():
+            if platform.client is not None:
+                await platform.client.aclose()
+                platform.client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {**platform.stats, "latency": platform.latency.snapshot()}
+            for name, platform in self._platforms.items()
+        }
+
+    def _platform(self, name: str) -> _Platform:
+        platform = self._platforms.get(name)
+        if platform is None:
+            rate = self._rates.get(name, self._rate)
+            platform = self._platforms[name] = _Platform(rate, self._concurrency, self._concurrency)
+        if platform.client is None:
+            platform.client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=httpx.Limits(max_connections=self._concurrency),
+            )
+        return platform
+
+    async def _publish_to(
+        self, name: str, post: Dict[str, Any], token: Optional[str], image_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        platform = self._platform(name)
+        started = perf_counter()
+        body = json.dumps({
+            "text": post.get("content_text") or "",
+            "image_url": image_url or post.get("upscaled_image_url") or post.get("image_url"),
+        })
+        headers = {"Content-Type": "application/json", "Idempotency-Key": f"{post['id']}:{name}"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        status: Optional[int] = None
+        error: Optional[str] = None
+        external_id: Optional[str] = None
+        attempt = 0
+        while True:
+            attempt += 1
+            wait: Optional[float] = None
+            async with platform.limit:
+                await platform.bucket.acquire()
+                platform.stats["requests"] += 1
+                try:
+                    response = await platform.client.post(self._url.format(platform=name), content=body, headers=headers)
+                except httpx.HTTPError as e:
+                    status, error = None, f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                else:
+                    status = response.status_code
+                    if status < 300:
+                        error = None
+                        try:
+                            external_id = str(response.json().get("id"))
+                        except (ValueError, AttributeError):
+                            pass
+                        break
+                    error = f"HTTP {status}: {response.text[:200]}"
+                    if status == 429:
+                        platform.stats["rate_limited"] += 1
+                        wait = _retry_after(response.headers.get("retry-after"))
+            if attempt > self._retries or (status is not None and status not in RETRY_STATUSES):
+                break
+            if wait is None:
+                wait = random.uniform(0.5, 1.0) * self._retry_delay * 2 ** (attempt - 1)
+            elif wait > MAX_RETRY_AFTER:
+                break
+            platform.stats["retries"] += 1
+            await asyncio.sleep(wait)
+
+        seconds = perf_counter() - started
+        platform.latency.record(seconds)
+        platform.stats["posted" if error is None else "failed"] += 1
+        return {
+            "status": "posted" if error is None else "error",
+            "attempts": attempt,
+            "http_status": status,
+            "external_id": external_id,
+            "error": error,
+            "seconds": seconds,
+        }
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header given in seconds; HTTP dates are ignored."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
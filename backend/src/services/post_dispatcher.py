@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+from datetime import datetime
+from itertools import count
+from time import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.metrics import LatencyHistogram
+from services.timestamps import epoch_seconds
+
+POST_STATUSES = ("planned", "ready", "posted", "error")
+
+
+class PostDispatcher:
+    """Publishes scheduled posts when their ``scheduled_time`` comes.
+
+    Planned posts sit in a min-heap keyed by due time. The dispatcher
+    sleeps on a timer set for the earliest one, and ``schedule`` wakes it
+    when a post goes ahead of that, so a post is picked up as soon as it is
+    due without scanning the others. Rescheduling or cancelling leaves the
+    old heap entry in place; it is skipped when it surfaces.
+
+    A due post moves to ``ready`` and is handed to ``publish``, with at
+    most ``concurrency`` publishes in flight; due posts beyond that wait in
+    the heap, earliest first. It ends ``posted``, or ``error`` with the
+    exception as ``error_message``. Every transition updates the post dict
+    in place and is passed to ``on_status(post, old, new)``.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[Dict[str, Any]], Awaitable[Any]],
+        on_status: Optional[Callable[[Dict[str, Any], str, str], None]] = None,
+        concurrency: int = 50,
+    ):
+        self._publish = publish
+        self._on_status = on_status
+        self._concurrency = concurrency
+        self._heap: List[Tuple[float, int, str]] = []
+        self._planned: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._sequence = count()
+        self._publishing: Dict[str, "asyncio.Task[None]"] = {}
+        self._waiters: Dict[str, asyncio.Event] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.transitions = {status: 0 for status in POST_STATUSES}
+        self.last_error: Optional[str] = None
+        self.lag = LatencyHistogram()
+
+    def __len__(self) -> int:
+        return len(self._planned)
+
+    def schedule(self, post: Dict[str, Any]) -> bool:
+        """Plan ``post`` for its ``scheduled_time``, replacing an earlier plan; False unless it is ``planned``."""
+        post_id = str(post["id"])
+        if post.get("post_status", "planned") != "planned" or post_id in self._publishing:
+            return False
+        due = epoch_seconds(post["scheduled_time"])
+        self._planned[post_id] = (due, post)
+        heapq.heappush(self._heap, (due, next(self._sequence), post_id))
+        if self._heap[0][2] == post_id:
+            self._wakeup.set()
+        return True
+
+    def cancel(self, post_id: Any) -> bool:
+        """Stop a planned post from being published; False if it is not planned."""
+        return self._planned.pop(str(post_id), None) is not None
+
+    def next_due(self) -> Optional[float]:
+        """Epoch seconds of the earliest planned post."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    async def wait(self, post_id: Any, timeout: Optional[float] = None) -> bool:
+        """Wait until ``post_id`` is published or failed; False on timeout or if it is not scheduled."""
+        post_id = str(post_id)
+        if post_id not in self._planned and post_id not in self._publishing:
+            return False
+        event = self._waiters.setdefault(post_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = list(self._publishing.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        due = self.next_due()
+        return {
+            "running": self.running,
+            "planned": len(self._planned),
+            "publishing": len(self._publishing),
+            "next_due": datetime.utcfromtimestamp(due) if due is not None else None,
+            "transitions": dict(self.transitions),
+            "last_error": self.last_error,
+            "lag": self.lag.snapshot(),
+        }
+
+    def _drop_stale(self) -> None:
+        heap = self._heap
+        while heap:
+            due, _, post_id = heap[0]
+            planned = self._planned.get(post_id)
+            if planned is not None and planned[0] == due:
+                return
+            heapq.heappop(heap)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            self._drop_stale()
+            timer = None
+            if self._heap and len(self._publishing) < self._concurrency:
+                delay = self._heap[0][0] - time()
+                if delay <= 0:
+                    self._dispatch_due()
+                    continue
+                timer = loop.call_later(delay, self._wakeup.set)
+            await self._wakeup.wait()
+            if timer is not None:
+                timer.cancel()
+
+    def _dispatch_due(self) -> None:
+        now = time()
+        heap = self._heap
+        while heap and len(self._publishing) < self._concurrency:
+            due, _, post_id = heap[0]
+            if due > now:
+                return
+            heapq.heappop(heap)
+            planned = self._planned.get(post_id)
+            if planned is None or planned[0] != due:
+                continue
+            del self._planned[post_id]
+            self.lag.record(now - due)
+            task = asyncio.create_task(self._publish_post(planned[1]))
+            self._publishing[post_id] = task
+            task.add_done_callback(lambda _, post_id=post_id: self._finished(post_id))
+
+    def _finished(self, post_id: str) -> None:
+        self._publishing.pop(post_id, None)
+        event = self._waiters.pop(post_id, None)
+        if event is not None:
+            event.set()
+        self._wakeup.set()
+
+    async def _publish_post(self, post: Dict[str, Any]) -> None:
+        self._transition(post, "ready")
+        try:
+            await self._publish(post)
+        except Exception as e:
+            self.last_error = f"{post['id']}: {type(e).__name__}: {e}"
+            self._transition(post, "error", str(e) or type(e).__name__)
+            return
+        self._transition(post, "posted")
+
+    def _transition(self, post: Dict[str, Any], status: str, error: Optional[str] = None) -> None:
+        old = post.get("post_status", "planned")
+        post["post_status"] = status
+        post["error_message"] = error
+        post["updated_at"] = datetime.utcnow()
+        self.transitions[status] += 1
+        if self._on_status is not None:
+            self._on_status(post, old, status)
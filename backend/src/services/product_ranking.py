@@ -0,0 +1,119 @@
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _Entry:
+    __slots__ = ("category", "value", "clicks", "conversions", "score")
+
+    def __init__(self, category: Optional[str], value: float):
+        self.category = category
+        self.value = value
+        self.clicks = 0
+        self.conversions = 0
+        self.score = 0.0
+
+
+class ProductRanking:
+    """Ranks affiliate products by expected earnings per click (EPC).
+
+    EPC is ``price * commission_rate`` times the product's conversion rate
+    over all its links, smoothed toward ``prior_rate`` with
+    ``prior_weight`` pseudo-clicks: ``(conversions + w * p) / (clicks + w)``.
+    A product with little traffic ranks near the prior instead of at 0 %
+    or 100 %, and its own rate takes over as clicks accumulate.
+
+    Every category, and the catalog as a whole, keeps its products in a
+    list sorted by EPC that is updated by bisection whenever a product's
+    price, commission or traffic changes, so the top K is a slice whose
+    cost does not depend on the catalog size. ``version`` goes up with
+    every change, so readers can tell whether a top K they hold is stale.
+    """
+
+    def __init__(self, prior_rate: float = 0.02, prior_weight: float = 50.0):
+        self.prior_rate = prior_rate
+        self.prior_weight = prior_weight
+        self._entries: Dict[str, _Entry] = {}
+        self._ranked: Dict[Optional[str], List[Tuple[float, str]]] = {None: []}
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def categories(self) -> List[str]:
+        return [category for category in self._ranked if category is not None]
+
+    def put(self, product: Dict[str, Any]) -> None:
+        """Add ``product`` or apply its changed price, commission rate or category."""
+        product_id = str(product["id"])
+        value = float(product.get("price") or 0.0) * float(product.get("commission_rate") or 0.0)
+        entry = self._entries.get(product_id)
+        if entry is None:
+            entry = self._entries[product_id] = _Entry(product.get("category"), value)
+        else:
+            self._unrank(product_id, entry)
+            entry.category = product.get("category")
+            entry.value = value
+        self._rank(product_id, entry)
+
+    def remove(self, product_id: Any) -> None:
+        product_id = str(product_id)
+        entry = self._entries.pop(product_id, None)
+        if entry is not None:
+            self._unrank(product_id, entry)
+            self.version += 1
+
+    def record(self, product_id: Any, clicks: int = 0, conversions: int = 0) -> None:
+        """Count traffic of one of the product's links."""
+        entry = self._entries.get(str(product_id))
+        if entry is None:
+            return
+        self._unrank(str(product_id), entry)
+        entry.clicks += clicks
+        entry.conversions += conversions
+        self._rank(str(product_id), entry)
+
+    def set_prior(self, prior_rate: float) -> None:
+        """Rescore every product against a new prior conversion rate."""
+        self.prior_rate = prior_rate
+        self._ranked = {None: []}
+        for product_id, entry in self._entries.items():
+            self._rank(product_id, entry, sort=False)
+        for ranked in self._ranked.values():
+            ranked.sort()
+
+    def top(self, category: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """The ``limit`` products with the highest EPC, overall or in ``category``."""
+        ranked = self._ranked.get(category, [])
+        return [self.explain(product_id) for _, product_id in ranked[:limit]]
+
+    def explain(self, product_id: Any) -> Dict[str, Any]:
+        entry = self._entries[str(product_id)]
+        return {
+            "product_id": str(product_id),
+            "expected_epc": entry.score,
+            "clicks": entry.clicks,
+            "conversions": entry.conversions,
+            "conversion_rate": self._rate(entry),
+        }
+
+    def _rate(self, entry: _Entry) -> float:
+        return (entry.conversions + self.prior_weight * self.prior_rate) / (entry.clicks + self.prior_weight)
+
+    def _rank(self, product_id: str, entry: _Entry, sort: bool = True) -> None:
+        self.version += 1
+        entry.score = entry.value * self._rate(entry)
+        key = (-entry.score, product_id)
+        for category in (None, entry.category) if entry.category is not None else (None,):
+            ranked = self._ranked.setdefault(category, [])
+            if sort:
+                insort(ranked, key)
+            else:
+                ranked.append(key)
+
+    def _unrank(self, product_id: str, entry: _Entry) -> None:
+        key = (-entry.score, product_id)
+        for category in (None, entry.category) if entry.category is not None else (None,):
+            ranked = self._ranked[category]
+            del ranked[bisect_left(ranked, key)]
+            if not ranked and category is not None:
+                del self._ranked[category]
@@ -0,0 +1,313 @@
+import math
+import re
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "category": 2.0, "description": 1.0}
+SORTS = ("relevance", "price_asc", "price_desc", "commission_desc")
+MAX_PREFIX_TERMS = 50
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class _Codes:
+    """Dictionary encoding of a facet's values."""
+
+    def __init__(self) -> None:
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: Optional[Any]) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _Postings:
+    """A term's postings: compiled arrays plus appends not yet compiled.
+
+    Entries are stamped with their product slot's version; entries whose
+    version is no longer current are stale and dropped on compilation.
+    """
+
+    __slots__ = ("slots", "weights", "versions", "new_slots", "new_weights", "new_versions", "live")
+
+    def __init__(self) -> None:
+        self.slots = np.empty(0, dtype=np.int64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.versions = np.empty(0, dtype=np.int64)
+        self.new_slots = array("q")
+        self.new_weights = array("d")
+        self.new_versions = array("q")
+        self.live = 0
+
+    def append(self, slot: int, weight: float, version: int) -> None:
+        self.new_slots.append(slot)
+        self.new_weights.append(weight)
+        self.new_versions.append(version)
+        self.live += 1
+
+    def compile(self, current_versions: np.ndarray) -> None:
+        """Merge the appends and drop stale entries."""
+        if self.new_slots:
+            self.slots = np.concatenate((self.slots, np.frombuffer(self.new_slots, dtype=np.int64)))
+            self.weights = np.concatenate((self.weights, np.frombuffer(self.new_weights, dtype=np.float64)))
+            self.versions = np.concatenate((self.versions, np.frombuffer(self.new_versions, dtype=np.int64)))
+            self.new_slots, self.new_weights, self.new_versions = array("q"), array("d"), array("q")
+        if len(self.slots) > self.live:
+            current = self.versions == current_versions[self.slots]
+            self.slots = self.slots[current]
+            self.weights = self.weights[current]
+            self.versions = self.versions[current]
+
+
+class ProductIndex:
+    """Inverted index over affiliate products with range filters and facet counts.
+
+    Terms from ``name``, ``tags``, ``category`` and ``description`` are
+    weighted per field and ranked by weight times inverse document
+    frequency; every query term must match, and the last one also matches
+    as a prefix unless the query ends in a space. Price, commission rate,
+    category and network live in NumPy columns indexed by a slot per
+    product, so filters and facet counts are vectorized over all products
+    and a term's postings are added to the scores in one step.
+
+    ``put`` and ``remove`` update the index incrementally: a product's
+    slot version is bumped, which makes its old postings stale, and its
+    new postings are appended. A term's appends are compiled and its
+    stale entries dropped, with array operations, the next time it is
+    queried.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._live = np.zeros(capacity, dtype=bool)
+        self._price = np.zeros(capacity, dtype=np.float64)
+        self._commission = np.zeros(capacity, dtype=np.float64)
+        self._category = np.full(capacity, -1, dtype=np.int32)
+        self._network = np.full(capacity, -1, dtype=np.int32)
+        self._version = np.zeros(capacity, dtype=np.int64)
+        self._categories = _Codes()
+        self._networks = _Codes()
+        self._postings: Dict[str, _Postings] = {}
+        self._terms: Dict[int, List[str]] = {}
+        self._vocabulary: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def put(self, product: Dict[str, Any]) -> None:
+        """Index ``product``, replacing what was indexed under its id."""
+        product_id = str(product["id"])
+        slot = self._slots.get(product_id)
+        if slot is None:
+            slot = self._allocate(product_id)
+        else:
+            self._unpost(slot)
+        self._version[slot] += 1
+        version = int(self._version[slot])
+
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            value = product.get(field)
+            text = " ".join(value) if isinstance(value, list) else value
+            for term in tokenize(text):
+                weights[term] += weight
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Postings()
+                insort(self._vocabulary, term)
+            postings.append(slot, weight, version)
+        self._terms[slot] = list(weights)
+
+        self._live[slot] = True
+        self._price[slot] = float(product.get("price") or 0.0)
+        self._commission[slot] = float(product.get("commission_rate") or 0.0)
+        self._category[slot] = self._categories.encode(product.get("category"))
+        self._network[slot] = self._networks.encode(product.get("network_id"))
+
+    def remove(self, product_id: Any) -> None:
+        slot = self._slots.pop(str(product_id), None)
+        if slot is None:
+            return
+        self._unpost(slot)
+        self._version[slot] += 1
+        self._live[slot] = False
+        self._ids[slot] = None
+        self._free.append(slot)
+
+    def search(
+        self,
+        query: str = "",
+        category: Optional[str] = None,
+        network_id: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_commission: Optional[float] = None,
+        max_commission: Optional[float] = None,
+        sort: str = "relevance",
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """Return ``{"total", "ids", "facets"}`` for one page of matching products.
+
+        Facets count the matches per category and network before the
+        category and network filters are applied, so every option shows
+        how many results choosing it would give.
+        """
+        n = len(self._ids)
+        matched = self._live[:n].copy()
+        for column, low, high in (
+            (self._price, min_price, max_price),
+            (self._commission, min_commission, max_commission),
+        ):
+            if low is not None:
+                matched &= column[:n] >= low
+            if high is not None:
+                matched &= column[:n] <= high
+
+        scores = np.zeros(n, dtype=np.float64)
+        groups = self._query_groups(query)
+        if len(groups) == 1:
+            # Every posting has a positive score, so a single group needs no hit counts.
+            for term in groups[0]:
+                self._score(term, scores)
+            matched &= scores > 0
+        elif groups:
+            hits = np.zeros(n, dtype=np.int32)
+            for terms in groups:
+                if len(terms) == 1:
+                    hits[self._score(terms[0], scores)] += 1
+                    continue
+                hit = np.zeros(n, dtype=bool)
+                for term in terms:
+                    hit[self._score(term, scores)] = True
+                hits += hit
+            matched &= hits == len(groups)
+
+        category_code = self._code(self._categories, category)
+        network_code = self._code(self._networks, network_id)
+        facets = self._facets(matched, category_code, network_code)
+        if category_code is not None:
+            matched &= self._category[:n] == category_code
+        if network_code is not None:
+            matched &= self._network[:n] == network_code
+
+        found = np.flatnonzero(matched)
+        if sort == "price_asc":
+            keys = self._price[found]
+        elif sort == "price_desc":
+            keys = -self._price[found]
+        elif sort == "commission_desc":
+            keys = -(self._price[found] * self._commission[found])
+        else:
+            keys = -scores[found]
+        end = min(len(found), offset + limit)
+        if offset >= end:
+            page = found[:0]
+        else:
+            if end < len(found):
+                top = np.argpartition(keys, end - 1)[:end]
+            else:
+                top = np.arange(len(found))
+            page = found[top[np.lexsort((found[top], keys[top]))][offset:end]]
+        return {
+            "total": int(len(found)),
+            "ids": [self._ids[slot] for slot in page.tolist()],
+            "facets": facets,
+        }
+
+    def _query_groups(self, query: str) -> List[List[str]]:
+        terms = tokenize(query)
+        groups = [[term] if term in self._postings else [] for term in terms]
+        if terms and not query[-1:].isspace():
+            prefix = terms[-1]
+            start = bisect_left(self._vocabulary, prefix)
+            expanded = []
+            for term in self._vocabulary[start:start + MAX_PREFIX_TERMS]:
+                if not term.startswith(prefix):
+                    break
+                expanded.append(term)
+            groups[-1] = expanded
+        return groups
+
+    def _score(self, term: str, scores: np.ndarray) -> np.ndarray:
+        """Add ``term``'s weight times its inverse document frequency to ``scores``; returns its slots."""
+        postings = self._postings[term]
+        postings.compile(self._version)
+        idf = math.log(1.0 + max(1, len(self._slots)) / max(1, len(postings.slots)))
+        scores[postings.slots] += postings.weights * idf
+        return postings.slots
+
+    def _facets(self, matched: np.ndarray, category_code: Optional[int], network_code: Optional[int]) -> Dict[str, Dict[str, int]]:
+        """Count matches per category and per network in one pass over a joint code."""
+        n = len(self._ids)
+        width = len(self._networks.values) + 1
+        joint = np.compress(matched, (self._category[:n] + 1) * width + (self._network[:n] + 1))
+        counts = np.bincount(joint, minlength=(len(self._categories.values) + 1) * width).reshape(-1, width)
+        by_category = counts[1:, 1:].sum(axis=1) + counts[1:, 0] if network_code is None else (
+            counts[1:, network_code + 1] if network_code >= 0 else np.zeros(len(self._categories.values), dtype=np.int64)
+        )
+        by_network = counts[1:, 1:].sum(axis=0) + counts[0, 1:] if category_code is None else (
+            counts[category_code + 1, 1:] if category_code >= 0 else np.zeros(len(self._networks.values), dtype=np.int64)
+        )
+        return {
+            "category": {value: int(count) for value, count in zip(self._categories.values, by_category.tolist()) if count},
+            "network_id": {value: int(count) for value, count in zip(self._networks.values, by_network.tolist()) if count},
+        }
+
+    @staticmethod
+    def _code(codes: _Codes, value: Optional[Any]) -> Optional[int]:
+        if value is None:
+            return None
+        return codes.codes.get(str(value), -2)
+
+    def _allocate(self, product_id: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = product_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(product_id)
+            if slot >= len(self._live):
+                self._grow(2 * len(self._live))
+        self._slots[product_id] = slot
+        return slot
+
+    def _grow(self, capacity: int) -> None:
+        for name, fill in (
+            ("_live", False),
+            ("_price", 0.0),
+            ("_commission", 0.0),
+            ("_category", -1),
+            ("_network", -1),
+            ("_version", 0),
+        ):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _unpost(self, slot: int) -> None:
+        for term in self._terms.pop(slot, ()):
+            postings = self._postings[term]
+            postings.live -= 1
+            if not postings.live:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
@@ -0,0 +1,38 @@
+import asyncio
+from time import monotonic
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second on average, in bursts of up to ``burst``.
+
+    A ``rate`` of 0 or less never waits.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = monotonic()
+        self.waited = 0.0
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now."""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        while not self.try_acquire():
+            delay = (1.0 - self._tokens) / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
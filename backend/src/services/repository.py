@@ -0,0 +1,244 @@
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+class InMemoryRepository:
+    """Dict-backed record store with a primary index on ``id`` and secondary indexes.
+
+    Records are plain dicts, as returned by the route handlers. Lookups by id
+    are O(1), and ``find`` on indexed fields only visits matching records,
+    so filtered lists cost O(k) instead of a scan over every row. Records
+    keep insertion order, both overall and inside each index bucket.
+
+    ``unique`` fields are indexed as a plain hash map from value to record
+    id, which is what a field like an external transaction id needs: one
+    dict entry per record instead of a bucket per value. None is not
+    indexed, and adding a second record with a taken value raises
+    ``ValueError``.
+
+    ``version`` goes up with every add, update and delete, and ``watch``
+    callbacks see each change as ``(old, new)``: a copy of the record
+    before the change, or None for an insert, and the record after it, or
+    None for a delete. Together they let derived views, such as running
+    totals, stay current without rescanning.
+
+    Indexed fields must only be changed through ``update`` so the indexes
+    stay in sync; other fields may be mutated in place, which neither
+    bumps the version nor notifies watchers.
+    """
+
+    def __init__(self, indexes: Sequence[str] = (), records: Iterable[Dict[str, Any]] = (), unique: Sequence[str] = ()):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Hashable, Dict[str, None]]] = {field: {} for field in indexes}
+        self._unique: Dict[str, Dict[Hashable, str]] = {field: {} for field in unique}
+        self._watchers: List[Callable[[Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]] = []
+        self.version = 0
+        self.add_many(records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._records.values()))
+
+    def __contains__(self, record_id: Any) -> bool:
+        return str(record_id) in self._records
+
+    @property
+    def indexed_fields(self) -> List[str]:
+        return list(self._indexes) + list(self._unique)
+
+    def get(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """Return the record with ``record_id`` or None."""
+        return self._records.get(str(record_id))
+
+    def add(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a record, replacing any existing record with the same id."""
+        key = str(record["id"])
+        self._check_unique(key, record)
+        old = self._records.get(key)
+        if old is not None:
+            self._unindex(key, old)
+        self._records[key] = record
+        self._index(key, record)
+        self.version += 1
+        for watcher in self._watchers:
+            watcher(old, record)
+        return record
+
+    def add_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for record in records:
+            self.add(record)
+            count += 1
+        return count
+
+    def update(self, record_id: Any, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply ``changes`` to a record in place, re-indexing changed fields."""
+        key = str(record_id)
+        record = self._records.get(key)
+        if record is None:
+            return None
+        self._check_unique(key, changes)
+        old = dict(record) if self._watchers else None
+        for field, buckets in self._indexes.items():
+            if field in changes and changes[field] != record.get(field):
+                self._discard(buckets, record.get(field), key)
+                buckets.setdefault(changes[field], {})[key] = None
+        for field, ids in self._unique.items():
+            if field in changes and changes[field] != record.get(field):
+                ids.pop(record.get(field), None)
+                if changes[field] is not None:
+                    ids[changes[field]] = key
+        record.update(changes)
+        self.version += 1
+        for watcher in self._watchers:
+            watcher(old, record)
+        return record
+
+    def update_many(self, changes: Iterable[Tuple[Any, Dict[str, Any]]]) -> int:
+        """Apply ``(record id, changes)`` pairs; returns how many records existed."""
+        count = 0
+        for record_id, record_changes in changes:
+            if self.update(record_id, record_changes) is not None:
+                count += 1
+        return count
+
+    def delete(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """Remove and return a record, or None if it does not exist."""
+        key = str(record_id)
+        record = self._records.pop(key, None)
+        if record is not None:
+            self._unindex(key, record)
+            self.version += 1
+            for watcher in self._watchers:
+                watcher(record, None)
+        return record
+
+    def delete_where(self, **filters: Any) -> int:
+        """Remove every record matching ``filters`` and return how many were removed."""
+        matches = self.find(**filters)
+        for record in matches:
+            self.delete(record["id"])
+        return len(matches)
+
+    def clear(self) -> None:
+        """Remove every record; watchers see each one deleted."""
+        if self._watchers:
+            for record in list(self._records.values()):
+                for watcher in self._watchers:
+                    watcher(record, None)
+        self.version += 1
+        self._records.clear()
+        for buckets in self._indexes.values():
+            buckets.clear()
+        for ids in self._unique.values():
+            ids.clear()
+
+    def watch(
+        self, callback: Callable[[Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None], replay: bool = True
+    ) -> None:
+        """Call ``callback(old, new)`` after every change.
+
+        With ``replay`` it is first called with an insert of each current
+        record; without it only later changes reach it.
+        """
+        self._watchers.append(callback)
+        if replay:
+            for record in self._records.values():
+                callback(None, record)
+
+    def latest(self, limit: int) -> List[Dict[str, Any]]:
+        """The ``limit`` most recently inserted records, newest first."""
+        return list(islice(reversed(self._records.values()), limit))
+
+    def counts(self, field: str) -> Dict[Hashable, int]:
+        """Number of records per value of the indexed ``field``, in O(distinct values)."""
+        return {value: len(bucket) for value, bucket in self._indexes[field].items()}
+
+    def find(self, **filters: Any) -> List[Dict[str, Any]]:
+        """Return records whose fields equal every non-None filter value.
+
+        The smallest matching index bucket drives the lookup; remaining
+        filters are checked against its records only. Without an indexed
+        filter this falls back to a scan.
+        """
+        filters = {field: value for field, value in filters.items() if value is not None}
+        if not filters:
+            return list(self._records.values())
+
+        candidates: Optional[Iterable[str]] = None
+        driver = None
+        for field, value in filters.items():
+            if field in self._unique:
+                key = self._unique[field].get(value)
+                if key is None:
+                    return []
+                candidates, driver = (key,), field
+                break
+            if field in self._indexes:
+                bucket = self._indexes[field].get(value)
+                if not bucket:
+                    return []
+                if candidates is None or len(bucket) < len(candidates):  # type: ignore[arg-type]
+                    candidates, driver = bucket, field
+
+        if candidates is None:
+            records: Iterable[Dict[str, Any]] = self._records.values()
+        else:
+            records = (self._records[key] for key in candidates)
+
+        rest = [(field, value) for field, value in filters.items() if field != driver]
+        return [r for r in records if all(r.get(field) == value for field, value in rest)]
+
+    def get_by(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Return the record whose unique ``field`` equals ``value``, or None."""
+        key = self._unique[field].get(value)
+        return None if key is None else self._records[key]
+
+    def find_one(self, **filters: Any) -> Optional[Dict[str, Any]]:
+        matches = self.find(**filters)
+        return matches[0] if matches else None
+
+    def count(self, **filters: Any) -> int:
+        """Count matching records; a single indexed filter is answered in O(1)."""
+        filters = {field: value for field, value in filters.items() if value is not None}
+        if not filters:
+            return len(self._records)
+        if len(filters) == 1:
+            field, value = next(iter(filters.items()))
+            if field in self._unique:
+                return int(value in self._unique[field])
+            if field in self._indexes:
+                return len(self._indexes[field].get(value, ()))
+        return len(self.find(**filters))
+
+    def _index(self, key: str, record: Dict[str, Any]) -> None:
+        for field, buckets in self._indexes.items():
+            buckets.setdefault(record.get(field), {})[key] = None
+        for field, ids in self._unique.items():
+            if record.get(field) is not None:
+                ids[record[field]] = key
+
+    def _unindex(self, key: str, record: Dict[str, Any]) -> None:
+        for field, buckets in self._indexes.items():
+            self._discard(buckets, record.get(field), key)
+        for field, ids in self._unique.items():
+            if ids.get(record.get(field)) == key:
+                del ids[record[field]]
+
+    def _check_unique(self, key: str, values: Dict[str, Any]) -> None:
+        for field, ids in self._unique.items():
+            if values.get(field) is None:
+                continue
+            owner = ids.get(values[field])
+            if owner is not None and owner != key:
+                raise ValueError(f"{field} {values[field]!r} is already taken")
+
+    @staticmethod
+    def _discard(buckets: Dict[Hashable, Dict[str, None]], value: Hashable, key: str) -> None:
+        bucket = buckets.get(value)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del buckets[value]
@@ -0,0 +1,264 @@
+import asyncio
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from services.backtesting import BacktestError, load_candles, run_backtest, to_epoch_ms
+
+OBJECTIVES = (
+    "profit_loss",
+    "win_rate",
+    "max_drawdown",
+    "winning_trades",
+    "total_trades",
+    "avg_trade_duration",
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Shared worker pool, started on first use.
+
+    Workers are spawned rather than forked so they never inherit the event
+    loop or its threads.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def grid_candidates(parameters: Dict[str, List[Any]]) -> Iterator[Dict[str, Any]]:
+    names = list(parameters)
+    for values in itertools.product(*(parameters[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def random_candidates(
+    parameters: Dict[str, Any], samples: int, seed: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """Sample ``samples`` configs; lists are sampled uniformly, ranges continuously."""
+    rng = random.Random(seed)
+    for _ in range(samples):
+        candidate = {}
+        for name, space in parameters.items():
+            if isinstance(space, list):
+                candidate[name] = rng.choice(space)
+            else:
+                value = rng.uniform(space["min"], space["max"])
+                if space.get("step"):
+                    value = space["min"] + round((value - space["min"]) / space["step"]) * space["step"]
+                candidate[name] = int(round(value)) if space.get("integer") else value
+        yield candidate
+
+
+def expand_range(space: Dict[str, Any]) -> List[Any]:
+    """Turn ``{"min", "max", "step"}`` into the list of grid values it covers."""
+    if not space.get("step"):
+        raise BacktestError("Grid search needs a step for every parameter range")
+    count = int(math.floor((space["max"] - space["min"]) / space["step"] + 1e-9)) + 1
+    values = [space["min"] + i * space["step"] for i in range(count)]
+    return [int(round(v)) for v in values] if space.get("integer") else values
+
+
+def count_grid(parameters: Dict[str, List[Any]]) -> int:
+    return math.prod(len(values) for values in parameters.values())
+
+
+def build_candidates(
+    parameters: Dict[str, Any],
+    search: str = "grid",
+    samples: int = 100,
+    seed: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> Tuple[Iterator[Dict[str, Any]], int]:
+    """Return the candidate configs for a sweep and how many there are."""
+    if not parameters:
+        raise BacktestError("At least one parameter is required")
+    if any(isinstance(space, list) and not space for space in parameters.values()):
+        raise BacktestError("Parameter space is empty")
+    if search == "grid":
+        values = {
+            name: space if isinstance(space, list) else expand_range(space)
+            for name, space in parameters.items()
+        }
+        candidates, total = grid_candidates(values), count_grid(values)
+    elif search == "random":
+        candidates, total = random_candidates(parameters, samples, seed), samples
+    else:
+        raise BacktestError(f"Unknown search: {search}")
+    if total == 0:
+        raise BacktestError("Parameter space is empty")
+    if limit is not None and total > limit:
+        raise BacktestError(f"Parameter space has {total} candidates, the limit is {limit}")
+    return candidates, total
+
+
+def share_candles(sources: Dict[str, Path], cache_dir: Path) -> Dict[str, str]:
+    """Return a ``.npy`` file per symbol that workers can memory-map.
+
+    ``.npy`` sources are used as they are; other formats are converted once
+    and cached by modification time, so every worker maps the same pages
+    instead of receiving a pickled copy of the candles.
+    """
+    shared = {}
+    for symbol, path in sources.items():
+        if path.suffix == ".npy":
+            shared[symbol] = str(path)
+            continue
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        target = cache_dir / f"{path.stem}-{path.stat().st_mtime_ns}.npy"
+        if not target.exists():
+            partial = target.with_suffix(".tmp.npy")
+            np.save(partial, np.column_stack(load_candles(path)))
+            os.replace(partial, target)
+        shared[symbol] = str(target)
+    return shared
+
+
+def evaluate_batch(
+    paths: Dict[str, str],
+    window: Tuple[Optional[int], Optional[int]],
+    strategy_type: str,
+    base_config: Dict[str, Any],
+    batch: List[Tuple[int, Dict[str, Any]]],
+    capital: float,
+    fee_rate: float,
+) -> List[Tuple[int, Dict[str, Any], Optional[Dict[str, Any]], Optional[str]]]:
+    """Worker entry point: backtest every candidate config in ``batch``.
+
+    Candles come from memory-mapped files and ``load_candles`` caches them
+    per worker, so only the parameters travel between processes.
+    """
+    candles = {symbol: load_candles(Path(path)).between(*window) for symbol, path in paths.items()}
+    results = []
+    for index, params in batch:
+        try:
+            stats = run_backtest(strategy_type, {**base_config, **params}, candles, capital, fee_rate)
+            results.append((index, params, stats, None))
+        except BacktestError as e:
+            results.append((index, params, None, str(e)))
+        except (ValueError, TypeError, KeyError, ArithmeticError) as e:
+            # A parameter value of the wrong type or range fails its own candidate, not the sweep.
+            results.append((index, params, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+class _Leaderboard:
+    def __init__(self, size: int, objective: str, maximize: bool):
+        self._size = size
+        self._objective = objective
+        self._sign = 1 if maximize else -1
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+
+    def offer(self, index: int, params: Dict[str, Any], stats: Dict[str, Any]) -> bool:
+        score = self._sign * float(stats[self._objective])
+        entry = (score, -index, {"params": params, "score": stats[self._objective], **stats})
+        if len(self._heap) < self._size:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def best(self) -> List[Dict[str, Any]]:
+        return [result for _, _, result in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+async def optimize(
+    paths: Dict[str, str],
+    strategy_type: str,
+    base_config: Dict[str, Any],
+    candidates: Iterable[Dict[str, Any]],
+    total: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    capital: float = 1000.0,
+    fee_rate: float = 0.001,
+    objective: str = "profit_loss",
+    maximize: bool = True,
+    top_n: int = 10,
+    workers: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Fan candidate configs out to the worker pool and yield progress.
+
+    ``paths`` maps symbols to ``.npy`` candle files (see ``share_candles``).
+    An update is yielded whenever a finished batch changes the best
+    ``top_n`` results, and a final update once every candidate is done.
+    A batch whose worker fails counts each of its candidates as failed.
+    ``workers`` (one per CPU by default) sizes the pool when it is first
+    started and the batches.
+    """
+    if objective not in OBJECTIVES:
+        raise BacktestError(f"Unknown objective: {objective}")
+    window = (to_epoch_ms(start) if start else None, to_epoch_ms(end) if end else None)
+
+    workers = workers or os.cpu_count() or 1
+    pool = get_pool(workers)
+    batch_size = max(1, min(64, math.ceil(total / (workers * 4))))
+    loop = asyncio.get_running_loop()
+    numbered = enumerate(candidates)
+    batches: Dict["asyncio.Future[Any]", List[Tuple[int, Dict[str, Any]]]] = {}
+    for batch in iter(lambda: list(itertools.islice(numbered, batch_size)), []):
+        future = loop.run_in_executor(
+            pool, evaluate_batch, paths, window, strategy_type, base_config, batch, capital, fee_rate
+        )
+        batches[future] = batch
+    pending = set(batches)
+
+    leaderboard = _Leaderboard(top_n, objective, maximize)
+    completed = failed = 0
+    errors: List[str] = []
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            improved = False
+            for future in done:
+                try:
+                    results = future.result()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    results = [(index, params, None, error) for index, params in batches[future]]
+                for index, params, stats, error in results:
+                    completed += 1
+                    if stats is None:
+                        failed += 1
+                        if len(errors) < 10:
+                            errors.append(f"{params}: {error}")
+                    elif leaderboard.offer(index, params, stats):
+                        improved = True
+            if improved and pending:
+                yield {"done": False, "completed": completed, "total": total, "best": leaderboard.best()}
+    finally:
+        for future in pending:
+            future.cancel()
+
+    yield {
+        "done": True,
+        "completed": completed,
+        "failed": failed,
+        "total": total,
+        "errors": errors,
+        "best": leaderboard.best(),
+    }
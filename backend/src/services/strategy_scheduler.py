@@ -0,0 +1,325 @@
+import asyncio
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from services.backtesting import Candles, ema, rsi, to_epoch_ms
+from services.market_data import exchange_symbol
+from services.metrics import LatencyHistogram
+
+PAPER_KEY = "paper"
+
+
+class Decision(NamedTuple):
+    """An order a strategy wants placed.
+
+    ``open`` buys ``quantity`` at ``price``; ``close`` sells the open trade
+    ``trade_id`` at ``price``.
+    """
+
+    action: str  # open, close
+    symbol: str
+    quantity: float
+    price: float
+    trade_id: Optional[str] = None
+    reason: str = ""
+
+
+def decide_trend(candles: Candles, config: Dict[str, Any], symbol: str, open_trades: List[Dict[str, Any]]) -> List[Decision]:
+    """Live counterpart of ``backtest_trend``: enter on an EMA cross up below
+    ``rsi_overbought``, exit on the cross down or at take-profit/stop-loss."""
+    close = candles.close
+    if len(close) < 2:
+        return []
+    fast = ema(close, span=float(config.get("ema_short", 9)))
+    slow = ema(close, span=float(config.get("ema_long", 21)))
+    price = float(close[-1])
+    crossed_up = fast[-1] > slow[-1] and fast[-2] <= slow[-2]
+    crossed_down = fast[-1] <= slow[-1] and fast[-2] > slow[-2]
+    if not open_trades:
+        strength = rsi(close, int(config.get("rsi_period", 14)))
+        if crossed_up and strength[-1] < float(config.get("rsi_overbought", 70)):
+            return [Decision("open", symbol, float(config.get("capital", 1000.0)) / price, price, reason="ema cross up")]
+        return []
+
+    take_profit = float(config.get("take_profit", 0) or 0) / 100
+    stop_loss = float(config.get("stop_loss", 0) or 0) / 100
+    decisions = []
+    for trade in open_trades:
+        move = price / trade["price"]
+        if crossed_down:
+            reason = "ema cross down"
+        elif take_profit and move >= 1.0 + take_profit:
+            reason = "take profit"
+        elif stop_loss and move <= 1.0 - stop_loss:
+            reason = "stop loss"
+        else:
+            continue
+        decisions.append(Decision("close", symbol, trade["quantity"], price, trade["id"], reason))
+    return decisions
+
+
+def decide_dca(candles: Candles, config: Dict[str, Any], symbol: str, open_trades: List[Dict[str, Any]]) -> List[Decision]:
+    """Live counterpart of ``backtest_dca``: buy every ``dca_interval`` hours
+    up to ``max_buys``, sell everything at ``take_profit`` over average cost."""
+    if len(candles) == 0:
+        return []
+    price = float(candles.close[-1])
+    if not open_trades:
+        initial = float(config.get("initial_buy", float(config.get("capital", 1000.0)) / 10))
+        return [Decision("open", symbol, initial / price, price, reason="initial buy")]
+
+    cost = sum(trade["quantity"] * trade["price"] for trade in open_trades)
+    quantity = sum(trade["quantity"] for trade in open_trades)
+    if quantity * price >= cost * (1.0 + float(config.get("take_profit", 10.0)) / 100):
+        return [Decision("close", symbol, trade["quantity"], price, trade["id"], "take profit") for trade in open_trades]
+
+    interval_ms = float(config.get("dca_interval", 24)) * 3_600_000
+    last_buy = max(trade["created_at"] for trade in open_trades)
+    candle_time = int(candles.timestamp[-1])
+    if len(open_trades) < int(config.get("max_buys", 10)) and candle_time - to_epoch_ms(last_buy) >= interval_ms:
+        amount = float(config.get("dca_amount", config.get("initial_buy", 100)))
+        return [Decision("open", symbol, amount / price, price, reason="dca buy")]
+    return []
+
+
+DECIDERS: Dict[str, Callable[[Candles, Dict[str, Any], str, List[Dict[str, Any]]], List[Decision]]] = {
+    "DCA": decide_dca,
+    "Trend": decide_trend,
+}
+
+
+class _Registration(NamedTuple):
+    strategy: Dict[str, Any]
+    symbols: List[str]
+    timeframes: List[str]
+
+
+class StrategyScheduler:
+    """Evaluates active strategies whenever a candle of one of their timeframes closes.
+
+    ``on_candle`` is wired to ``MarketDataFeed.add_listener``. Ticks are
+    coalesced per symbol and timeframe: however many strategies share the
+    pair, and however many ticks arrive while an evaluation is running,
+    the pair is evaluated once per round, each strategy against the
+    candles as they are when it gets its position's lock. Orders go through ``submit`` with at most
+    ``concurrency_per_key`` in flight per exchange API key
+    (``config["api_key_id"]``, paper trading when unset).
+
+    Open positions are tracked in memory, seeded by ``positions`` when a
+    strategy is registered, so evaluation never scans the trade history.
+    A strategy's decisions on a symbol are made and placed under that
+    position's lock, so its timeframes take turns rather than acting on the
+    same open trades at once (e.g. each opening a position).
+    """
+
+    def __init__(
+        self,
+        candles: Callable[[str, str, int], Optional[Candles]],
+        positions: Callable[[str, str], List[Dict[str, Any]]],
+        submit: Callable[[Dict[str, Any], Decision], Awaitable[Optional[Dict[str, Any]]]],
+        concurrency_per_key: int = 4,
+        window: int = 500,
+    ):
+        self._candles = candles
+        self._positions = positions
+        self._submit = submit
+        self._concurrency = concurrency_per_key
+        self._window = window
+        self._registrations: Dict[str, _Registration] = {}
+        self._groups: Dict[Tuple[str, str], Dict[str, None]] = {}
+        self._open: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[Tuple[str, str], float] = {}
+        self._evaluating: Dict[Tuple[str, str], "asyncio.Task[None]"] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.ticks = 0
+        self.coalesced = 0
+        self.evaluations = 0
+        self.decisions = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.latency = {
+            "tick_to_decision": LatencyHistogram(),
+            "tick_to_order": LatencyHistogram(),
+        }
+
+    def __len__(self) -> int:
+        return len(self._registrations)
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        """Exchange symbol and timeframe pairs that have registered strategies."""
+        return list(self._groups)
+
+    def register(self, strategy: Dict[str, Any]) -> bool:
+        """Start evaluating ``strategy``; returns False if its type is not candle-driven.
+
+        Smart Grid strategies run on every price tick in ``GridEngine`` instead.
+        """
+        strategy_id = str(strategy["id"])
+        self.unregister(strategy_id)
+        if strategy["strategy_type"] not in DECIDERS:
+            return False
+        config = strategy["config"]
+        registration = _Registration(
+            strategy,
+            list(config.get("symbols") or ["BTC/USDT"]),
+            list(config.get("timeframes") or ["1h"]),
+        )
+        self._registrations[strategy_id] = registration
+        for symbol in registration.symbols:
+            self._open[(strategy_id, symbol)] = list(self._positions(strategy_id, symbol))
+            self._locks.setdefault((strategy_id, symbol), asyncio.Lock())
+            for timeframe in registration.timeframes:
+                self._groups.setdefault((exchange_symbol(symbol), timeframe), {})[strategy_id] = None
+        return True
+
+    def unregister(self, strategy_id: Any) -> None:
+        strategy_id = str(strategy_id)
+        registration = self._registrations.pop(strategy_id, None)
+        if registration is None:
+            return
+        for symbol in registration.symbols:
+            self._open.pop((strategy_id, symbol), None)
+            # A lock held by a running evaluation is kept for a re-registration to reuse.
+            lock = self._locks.get((strategy_id, symbol))
+            if lock is not None and not lock.locked():
+                del self._locks[(strategy_id, symbol)]
+            for timeframe in registration.timeframes:
+                key = (exchange_symbol(symbol), timeframe)
+                group = self._groups.get(key)
+                if group is not None:
+                    group.pop(strategy_id, None)
+                    if not group:
+                        del self._groups[key]
+
+    def on_candle(self, symbol: str, interval: str, received_at: float) -> None:
+        """Queue an evaluation of the strategies on ``symbol``/``interval``.
+
+        ``received_at`` is the ``perf_counter`` time the closing candle was
+        read; a pair that is already queued keeps its earliest tick. A pair
+        that is being evaluated is queued again and runs once it finishes.
+        """
+        key = (exchange_symbol(symbol), interval)
+        if key not in self._groups:
+            return
+        self.ticks += 1
+        if key in self._pending:
+            self.coalesced += 1
+            return
+        self._pending[key] = received_at
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = list(self._evaluating.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._evaluating.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "strategies": len(self._registrations),
+            "pairs": len(self._groups),
+            "pending": len(self._pending),
+            "evaluating": len(self._evaluating),
+            "ticks": self.ticks,
+            "coalesced": self.coalesced,
+            "evaluations": self.evaluations,
+            "decisions": self.decisions,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "latency": {name: histogram.snapshot() for name, histogram in self.latency.items()},
+        }
+
+    async def _run(self) -> None:
+        # Pairs run independently, so a slow exchange only delays its own pairs.
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            for key in [key for key in self._pending if key not in self._evaluating]:
+                tick = self._pending.pop(key)
+                task = asyncio.create_task(self._evaluate(key, tick))
+                self._evaluating[key] = task
+                task.add_done_callback(lambda _, key=key: self._finished(key))
+
+    def _finished(self, key: Tuple[str, str]) -> None:
+        self._evaluating.pop(key, None)
+        if key in self._pending:
+            self._wakeup.set()
+
+    async def _evaluate(self, key: Tuple[str, str], tick: float) -> None:
+        symbol, timeframe = key
+        runs = []
+        for strategy_id in list(self._groups.get(key, ())):
+            registration = self._registrations[strategy_id]
+            for strategy_symbol in registration.symbols:
+                if exchange_symbol(strategy_symbol) == symbol:
+                    runs.append(self._decide(registration.strategy, strategy_symbol, timeframe, tick))
+        await asyncio.gather(*runs)
+
+    async def _decide(self, strategy: Dict[str, Any], symbol: str, timeframe: str, tick: float) -> None:
+        """Evaluate ``strategy`` on ``symbol`` and place its orders under the position's lock.
+
+        The candles are read once the lock is held: they are views into the
+        feed's ring buffer, which rows arriving while this waited would
+        overwrite, and the deciders use them without awaiting.
+        """
+        position = (str(strategy["id"]), symbol)
+        lock = self._locks.get(position)
+        if lock is None:
+            return
+        async with lock:
+            open_trades = self._open.get(position)
+            if open_trades is None:  # unregistered while waiting for the lock
+                return
+            candles = self._candles(exchange_symbol(symbol), timeframe, self._window)
+            if candles is None or len(candles) == 0:
+                return
+            try:
+                decisions = DECIDERS[strategy["strategy_type"]](candles, strategy["config"], symbol, list(open_trades))
+            except (ValueError, KeyError, TypeError, ZeroDivisionError) as e:
+                self.errors += 1
+                self.last_error = f"{strategy['name']}: {e}"
+                return
+            self.evaluations += 1
+            self.latency["tick_to_decision"].record(perf_counter() - tick)
+            await asyncio.gather(*(self._place(strategy, decision, tick) for decision in decisions))
+
+    async def _place(self, strategy: Dict[str, Any], decision: Decision, tick: float) -> None:
+        api_key = str(strategy["config"].get("api_key_id") or PAPER_KEY)
+        limit = self._limits.get(api_key)
+        if limit is None:
+            limit = self._limits[api_key] = asyncio.Semaphore(self._concurrency)
+        async with limit:
+            try:
+                trade = await self._submit(strategy, decision)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{strategy['name']}: {type(e).__name__}: {e}"
+                return
+        self.decisions += 1
+        self.latency["tick_to_order"].record(perf_counter() - tick)
+
+        open_trades = self._open.get((str(strategy["id"]), decision.symbol))
+        if open_trades is None or trade is None:
+            return
+        if decision.action == "open":
+            open_trades.append(trade)
+        else:
+            open_trades[:] = [t for t in open_trades if str(t["id"]) != decision.trade_id]
+
+
+def close_profit_loss(trade: Dict[str, Any], price: float) -> float:
+    """Realized P&L of closing ``trade`` at ``price``."""
+    direction = 1.0 if trade.get("side", "buy") == "buy" else -1.0
+    return direction * trade["quantity"] * (price - trade["price"])
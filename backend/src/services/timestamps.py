@@ -0,0 +1,8 @@
+from datetime import datetime, timezone
+
+
+def epoch_seconds(value: datetime) -> float:
+    """Epoch seconds of ``value``; naive datetimes are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
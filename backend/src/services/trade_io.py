@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.trade_store import TradeStore
+
+TRADE_FIELDS = (
+    "id",
+    "strategy_id",
+    "symbol",
+    "side",
+    "quantity",
+    "price",
+    "status",
+    "profit_loss",
+    "close_price",
+    "close_time",
+    "created_at",
+    "updated_at",
+)
+
+
+def _decode_line(line: bytes) -> Optional[str]:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def iter_line_batches(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[Tuple[int, Optional[str]]]]:
+    """Split a byte stream into lists of ``(line number, line)`` pairs, one per chunk, skipping blank lines.
+
+    A line that is not valid UTF-8 comes out as None, for the parser to
+    report as a failed row.
+    """
+    pending = b""
+    number = 0
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        batch = []
+        for line in lines:
+            number += 1
+            if line.strip():
+                batch.append((number, _decode_line(line)))
+        if batch:
+            yield batch
+    if pending.strip():
+        yield [(number + 1, _decode_line(pending))]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[str]]]:
+    """Split a byte stream into ``(line number, line)`` pairs, skipping blank lines."""
+    async for batch in iter_line_batches(chunks):
+        for line in batch:
+            yield line
+
+
+def _parse_lines(
+    lines: List[Tuple[int, Optional[str]]], fmt: str, header: Optional[List[str]]
+) -> Tuple[List[Tuple[int, Any]], Optional[List[str]]]:
+    """Parse lines into ``(line number, row dict or error message)``; returns the rows and the CSV header."""
+    if any(line is None for _, line in lines):
+        failed = [(number, "invalid UTF-8") for number, line in lines if line is None]
+        rows, header = _parse_lines([(number, line) for number, line in lines if line is not None], fmt, header)
+        return sorted(failed + rows, key=lambda row: row[0]), header
+    rows: List[Tuple[int, Any]] = []
+    if fmt == "ndjson":
+        for number, line in lines:
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                rows.append((number, f"invalid JSON: {e}"))
+                continue
+            rows.append((number, row if isinstance(row, dict) else "expected a JSON object"))
+        return rows, header
+
+    cells_per_line = list(csv.reader([line for _, line in lines]))
+    if len(cells_per_line) != len(lines):
+        # An unbalanced quote made a record span lines; parse each line on its own.
+        cells_per_line = [next(csv.reader([line])) for _, line in lines]
+    for (number, _), cells in zip(lines, cells_per_line):
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+        if len(cells) != len(header):
+            rows.append((number, f"expected {len(header)} columns, got {len(cells)}"))
+            continue
+        rows.append((number, {name: cell if cell != "" else None for name, cell in zip(header, cells)}))
+    return rows, header
+
+
+async def parse_rows(lines: AsyncIterator[Tuple[int, Optional[str]]], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield ``(line number, row dict)``, or ``(line number, error message)`` for unparseable lines.
+
+    CSV input needs a header line naming the columns; empty cells become None.
+    """
+    header: Optional[List[str]] = None
+    async for number, line in lines:
+        rows, header = _parse_lines([(number, line)], fmt, header)
+        for row in rows:
+            yield row
+
+
+async def parse_row_batches(
+    batches: AsyncIterator[List[Tuple[int, Optional[str]]]], fmt: str
+) -> AsyncIterator[List[Tuple[int, Any]]]:
+    """``parse_rows`` for line batches: yields a list of parsed rows per batch.
+
+    Each CSV batch goes through one ``csv.reader``, and consumers loop
+    over plain lists instead of awaiting every row.
+    """
+    header: Optional[List[str]] = None
+    async for batch in batches:
+        rows, header = _parse_lines(batch, fmt, header)
+        if rows:
+            yield rows
+
+
+async def import_rows(
+    rows: AsyncIterator[Tuple[int, Any]],
+    store: TradeStore,
+    validate: Callable[[Dict[str, Any]], Dict[str, Any]],
+    batch_size: int = 5000,
+    max_errors: int = 100,
+) -> Dict[str, Any]:
+    """Validate parsed rows and add them to ``store`` ``batch_size`` at a time.
+
+    ``validate`` turns a row into a trade record or raises ``ValueError``
+    (pydantic's ``ValidationError`` is one), and ``store.check`` rejects
+    values the store cannot encode. Invalid rows are counted and
+    the first ``max_errors`` are reported with their line numbers; valid
+    rows are imported regardless.
+    """
+    imported = failed = 0
+    errors: List[str] = []
+    batch: List[Dict[str, Any]] = []
+    async for number, row in rows:
+        try:
+            if isinstance(row, str):
+                raise ValueError(row)
+            record = validate(row)
+            store.check(record)
+            batch.append(record)
+        except ValueError as e:
+            failed += 1
+            if len(errors) < max_errors:
+                errors.append(f"line {number}: {str(e).splitlines()[0] if str(e) else type(e).__name__}")
+            continue
+        if len(batch) >= batch_size:
+            imported += store.add_many(batch, batch_size)
+            batch = []
+    if batch:
+        imported += store.add_many(batch, batch_size)
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+
+def export_lines(
+    store: TradeStore,
+    fmt: str,
+    start: int = 0,
+    stop: Optional[int] = None,
+    chunk: int = 10000,
+    **filters: Any,
+) -> Iterator[str]:
+    """Yield the matching trades as NDJSON or CSV text, one chunk of rows at a time.
+
+    Memory use depends on ``chunk``, not on how many trades are exported.
+    """
+    if fmt == "csv":
+        yield ",".join(TRADE_FIELDS) + "\r\n"
+    for rows in store.scan(start, stop, chunk, **filters):
+        columns = store.export(rows)
+        records = zip(*(columns[field] for field in TRADE_FIELDS))
+        if fmt == "csv":
+            out = io.StringIO()
+            csv.writer(out).writerows(records)
+            yield out.getvalue()
+        else:
+            yield "".join(json.dumps(dict(zip(TRADE_FIELDS, record))) + "\n" for record in records)
@@ -0,0 +1,604 @@
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+
+PERIOD_WINDOWS: Dict[str, Optional[timedelta]] = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "monthly": timedelta(days=30),
+    "all-time": None,
+}
+
+EPOCH = datetime(1970, 1, 1)
+NULL_TIME = np.iinfo(np.int64).min
+MIN_CAPACITY = 1024
+BUCKET_MICROS = 3_600_000_000  # statistics rollups are kept per hour
+
+CODED_FIELDS = ("strategy_id", "symbol", "side", "status")
+FLOAT_FIELDS = ("quantity", "price", "profit_loss", "close_price")
+TIME_FIELDS = ("close_time", "created_at", "updated_at")
+
+COLUMNS: Dict[str, np.dtype] = {
+    "id_hi": np.dtype(np.uint64),
+    "id_lo": np.dtype(np.uint64),
+    "live": np.dtype(np.bool_),
+    "strategy_id": np.dtype(np.uint32),
+    "symbol": np.dtype(np.uint32),
+    "side": np.dtype(np.uint8),
+    "status": np.dtype(np.uint8),
+    **{field: np.dtype(np.float64) for field in FLOAT_FIELDS},
+    **{field: np.dtype(np.int64) for field in TIME_FIELDS},
+}
+
+
+def to_micros(moment: Optional[datetime]) -> int:
+    """Microseconds since the epoch; naive datetimes are taken as UTC."""
+    if moment is None:
+        return NULL_TIME
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value: int) -> Optional[datetime]:
+    return None if value == NULL_TIME else EPOCH + timedelta(microseconds=int(value))
+
+
+def split_id(record_id: Any) -> Optional[Tuple[int, int]]:
+    try:
+        value = record_id.int if isinstance(record_id, UUID) else UUID(str(record_id)).int
+    except ValueError:
+        return None
+    return value >> 64, value & 0xFFFFFFFFFFFFFFFF
+
+
+class EquitySummary(NamedTuple):
+    """Composable summary of a run of realized P&L values.
+
+    ``total`` is the net P&L, ``peak``/``trough`` are the highest and lowest
+    cumulative P&L reached (both relative to the start of the run, and
+    including the starting point) and ``drawdown`` is the largest
+    peak-to-trough drop inside the run. Two adjacent summaries combine in
+    O(1), which lets period queries merge bucket summaries in order.
+    """
+
+    total: float = 0.0
+    peak: float = 0.0
+    trough: float = 0.0
+    drawdown: float = 0.0
+
+    def then(self, later: "EquitySummary") -> "EquitySummary":
+        return EquitySummary(
+            total=self.total + later.total,
+            peak=max(self.peak, self.total + later.peak),
+            trough=min(self.trough, self.total + later.trough),
+            drawdown=max(self.drawdown, later.drawdown, self.peak - (self.total + later.trough)),
+        )
+
+    @classmethod
+    def of(cls, values: Iterable[float]) -> "EquitySummary":
+        equity = peak = trough = drawdown = 0.0
+        for value in values:
+            equity += value
+            peak = max(peak, equity)
+            trough = min(trough, equity)
+            drawdown = max(drawdown, peak - equity)
+        return cls(equity, peak, trough, drawdown)
+
+
+class _Bucket:
+    """Rollup of one hour: trades opened and closed in it, and the rows of its realized closes.
+
+    ``last`` is the ``(settled, row)`` of the latest close in ``summary``;
+    a close after it extends the summary, any other change drops it.
+    """
+
+    __slots__ = ("opened", "closed", "wins", "losses", "duration_sum", "duration_count", "rows", "summary", "last")
+
+    def __init__(self) -> None:
+        self.opened = 0
+        self.closed = 0
+        self.wins = 0
+        self.losses = 0
+        self.duration_sum = 0.0
+        self.duration_count = 0
+        self.rows = array("q")
+        self.summary: Optional[EquitySummary] = None
+        self.last: Tuple[int, int] = (NULL_TIME, -1)
+
+    def is_empty(self) -> bool:
+        return self.opened == 0 and self.closed == 0
+
+
+class _Dictionary:
+    """String <-> integer code mapping, appended to a text file as it grows."""
+
+    def __init__(self, path: Optional[Path], limit: int):
+        self._path = path
+        self._limit = limit
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        if path is not None and path.exists():
+            for line in path.read_text().splitlines():
+                self._codes[line] = len(self.values)
+                self.values.append(line)
+
+    def encode(self, value: Any) -> int:
+        value = "" if value is None else str(value)
+        code = self._codes.get(value)
+        if code is None:
+            if len(self.values) >= self._limit or "\n" in value:
+                raise ValueError(f"Cannot dictionary-encode {value!r}")
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+            if self._path is not None:
+                with open(self._path, "a") as f:
+                    f.write(value + "\n")
+        return code
+
+    def lookup(self, value: Any) -> Optional[int]:
+        return self._codes.get(str(value))
+
+
+class TradeStore:
+    """Append-only columnar trade history, optionally memory-mapped to disk.
+
+    Every trade field lives in its own NumPy column: floats for prices and
+    P&L, int64 microseconds for timestamps (``NULL_TIME`` for None, NaN for
+    missing floats) and dictionary codes for strategy id, symbol, side and
+    status. With a ``directory`` each column is a raw file mapped with
+    ``np.memmap``, so the data survives restarts and stays in the page cache
+    rather than on the heap; without one the columns are plain arrays.
+
+    Trades are never moved: updates overwrite a row in place and deletes
+    only clear its ``live`` flag. Id lookups use a sorted copy of the id
+    column plus a small dict of rows appended since it was last rebuilt,
+    which keeps per-trade overhead at a few dozen bytes.
+
+    Statistics are rolled up per hour as trades are written, so period
+    queries merge the hours in their window instead of scanning rows.
+
+    The method names follow ``InMemoryRepository`` so routes can use either.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self._dir = Path(directory) if directory else None
+        if self._dir is not None:
+            self._dir.mkdir(parents=True, exist_ok=True)
+        self._dictionaries = {
+            field: _Dictionary(
+                self._dir / f"{field}.txt" if self._dir else None,
+                np.iinfo(COLUMNS[field]).max + 1,
+            )
+            for field in CODED_FIELDS
+        }
+        self._columns: Dict[str, np.ndarray] = {}
+        self._capacity = 0
+        if self._dir is not None:
+            self._header = np.memmap(
+                self._dir / "rows.bin", dtype=np.int64, mode="r+" if (self._dir / "rows.bin").exists() else "w+",
+                shape=(2,),
+            )
+        else:
+            self._header = np.zeros(2, dtype=np.int64)
+        self._reserve(self.rows)
+        self._index_keys = np.empty(0, dtype=np.uint64)
+        self._index_rows = np.empty(0, dtype=np.int64)
+        self._tail: Dict[Tuple[int, int], int] = {}
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._buckets: Dict[int, _Bucket] = {}
+        self._keys: List[int] = []
+        self._rebuild_index()
+        for lo in range(0, self.rows, 65536):
+            self._fold(np.arange(lo, min(lo + 65536, self.rows)), 1)
+
+    @property
+    def rows(self) -> int:
+        """Rows written so far, including deleted trades."""
+        return int(self._header[0])
+
+    def __len__(self) -> int:
+        return int(self._header[1])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.find())
+
+    def __contains__(self, record_id: Any) -> bool:
+        return self._locate(record_id) is not None
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of a column over the rows written so far."""
+        view = self._columns[name][:self.rows]
+        view.flags.writeable = False
+        return view
+
+    def get(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """Return the trade with ``record_id`` or None."""
+        row = self._locate(record_id)
+        return None if row is None else self._record(row)
+
+    def check(self, record: Dict[str, Any]) -> None:
+        """Raise ``ValueError`` if ``record``'s dictionary-encoded values cannot be stored.
+
+        A value with a newline, or a new value once a dictionary is full, is
+        rejected. Accepted values are registered, so adding the record
+        afterwards cannot fail on them half-way through a write.
+        """
+        for field, dictionary in self._dictionaries.items():
+            dictionary.encode(record.get(field))
+
+    def add(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a trade, or overwrite the existing trade with the same id."""
+        row = self._locate(record["id"])
+        if row is not None:
+            self._overwrite(row, record)
+            self._changed()
+            return self._record(row)
+        self._append([record])
+        return self._record(self.rows - 1)
+
+    def add_many(self, records: Iterable[Dict[str, Any]], batch_size: int = 10000) -> int:
+        """Add trades in batches; new trades are written a column at a time.
+
+        Trades whose id already exists are overwritten in place, as with
+        ``add``; within one batch the last record for an id wins.
+        """
+        count = 0
+        batch: List[Dict[str, Any]] = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                count += self._add_batch(batch)
+                batch = []
+        if batch:
+            count += self._add_batch(batch)
+        return count
+
+    def update(self, record_id: Any, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Overwrite fields of a trade in place and return the updated trade."""
+        row = self._locate(record_id)
+        if row is None:
+            return None
+        self._overwrite(row, changes)
+        self._changed()
+        return self._record(row)
+
+    def delete(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """Mark a trade deleted and return it, or None if it does not exist."""
+        row = self._locate(record_id)
+        if row is None:
+            return None
+        record = self._record(row)
+        self._fold(np.array([row]), -1)
+        self._columns["live"][row] = False
+        self._header[1] -= 1
+        self._changed()
+        return record
+
+    def scan(
+        self, start: int = 0, stop: Optional[int] = None, chunk: int = 10000, **filters: Any
+    ) -> Iterator[np.ndarray]:
+        """Yield row numbers of matching live trades in ``[start, stop)``, a chunk of rows at a time.
+
+        Rows never move, so a row number is a stable cursor. Only one chunk
+        of the columns is examined at a time, whatever the size of the store.
+        """
+        stop = self.rows if stop is None else min(stop, self.rows)
+        for lo in range(start, stop, chunk):
+            mask = self._mask(filters, lo, min(lo + chunk, stop))
+            if mask is None:
+                return
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                yield rows + lo
+
+    def page_end(self, start: int, limit: int, **filters: Any) -> Optional[int]:
+        """Cursor after the first ``limit`` matches from ``start``, or None if no trades follow them."""
+        remaining = limit
+        for rows in self.scan(start, chunk=65536, **filters):
+            if len(rows) > remaining:
+                return int(rows[remaining])
+            remaining -= len(rows)
+        return None
+
+    def export(self, rows: np.ndarray) -> Dict[str, List[Any]]:
+        """Decode ``rows`` into one list per field, with timestamps as ISO 8601 strings.
+
+        Works a column at a time, which is much cheaper than building the
+        trades one by one when streaming large exports.
+        """
+        columns = self._columns
+        hi = columns["id_hi"][rows].tolist()
+        lo = columns["id_lo"][rows].tolist()
+        fields: Dict[str, List[Any]] = {"id": [str(UUID(int=(h << 64) | l)) for h, l in zip(hi, lo)]}
+        for field, dictionary in self._dictionaries.items():
+            values = np.asarray(dictionary.values or [""], dtype=object)
+            fields[field] = values[columns[field][rows]].tolist()
+        for field in FLOAT_FIELDS:
+            fields[field] = [None if v != v else v for v in columns[field][rows].tolist()]
+        for field in TIME_FIELDS:
+            stamps = columns[field][rows]
+            text = stamps.astype("datetime64[us]").astype(str)
+            fields[field] = np.where(stamps == NULL_TIME, None, text).tolist()
+        return fields
+
+    def find(self, limit: Optional[int] = None, offset: int = 0, **filters: Any) -> List[Dict[str, Any]]:
+        """Return live trades whose fields equal every non-None filter value, oldest first."""
+        mask = self._mask(filters)
+        if mask is None:
+            return []
+        rows = np.flatnonzero(mask)[offset:]
+        if limit is not None:
+            rows = rows[:limit]
+        return [self._record(row) for row in rows]
+
+    def count(self, **filters: Any) -> int:
+        if not any(value is not None for value in filters.values()):
+            return len(self)
+        mask = self._mask(filters)
+        return 0 if mask is None else int(np.count_nonzero(mask))
+
+    def statistics(self, period: str = "all-time", now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Return ``TradingStatistics`` fields for ``period``, merged from the hourly rollups.
+
+        New trades count towards the hour of ``created_at``, closed trades
+        towards the hour of ``close_time`` (``updated_at``, then
+        ``created_at``, if it is missing); windows start at a whole hour.
+        ``max_drawdown`` is the largest peak-to-trough drop of the realized
+        equity curve, i.e. cumulative P&L of closed trades in close order.
+        All-time results are cached until the next write.
+        """
+        window = PERIOD_WINDOWS.get(period)
+        if window is None:
+            if period not in self._cache:
+                self._cache[period] = self._merge(0)
+            return {**self._cache[period], "period": period}
+        start = to_micros((now or datetime.utcnow()) - window) // BUCKET_MICROS
+        return {**self._merge(bisect_left(self._keys, start)), "period": period}
+
+    def flush(self) -> None:
+        """Write dirty pages of a memory-mapped store to disk."""
+        if self._dir is None:
+            return
+        for column in self._columns.values():
+            column.flush()
+        self._header.flush()
+
+    def _mask(self, filters: Dict[str, Any], start: int = 0, stop: Optional[int] = None) -> Optional[np.ndarray]:
+        """Mask of live rows in ``[start, stop)`` matching ``filters``; None when nothing can match."""
+        stop = self.rows if stop is None else stop
+        mask = self._columns["live"][start:stop].copy()
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in self._dictionaries:
+                raise ValueError(f"Cannot filter trades by {field}")
+            code = self._code(field, value)
+            if code is None:
+                return None
+            mask &= self._columns[field][start:stop] == code
+        return mask
+
+    def _code(self, field: str, value: Any) -> Optional[int]:
+        return self._dictionaries[field].lookup(value)
+
+    def _merge(self, first: int) -> Dict[str, Any]:
+        total = closed = wins = losses = duration_count = 0
+        duration_sum = 0.0
+        equity = EquitySummary()
+        for key in self._keys[first:]:
+            bucket = self._buckets[key]
+            total += bucket.opened
+            closed += bucket.closed
+            wins += bucket.wins
+            losses += bucket.losses
+            duration_sum += bucket.duration_sum
+            duration_count += bucket.duration_count
+            if bucket.rows:
+                equity = equity.then(self._summary(bucket))
+        return {
+            "total_trades": total,
+            "winning_trades": wins,
+            "losing_trades": losses,
+            "win_rate": (wins / closed) * 100 if closed else 0,
+            "profit_loss": equity.total,
+            "max_drawdown": equity.drawdown,
+            "avg_trade_duration": duration_sum / duration_count if duration_count else 0,
+        }
+
+    def _summary(self, bucket: _Bucket) -> EquitySummary:
+        if bucket.summary is None:
+            rows = np.frombuffer(bucket.rows, dtype=np.int64)
+            settled = self._settled(rows)
+            order = np.lexsort((rows, settled))
+            bucket.summary = EquitySummary.of(self._columns["profit_loss"][rows[order]].tolist())
+            bucket.last = (int(settled[order[-1]]), int(rows[order[-1]]))
+        return bucket.summary
+
+    def _settled(self, rows: np.ndarray) -> np.ndarray:
+        """When the trades in ``rows`` count as closed."""
+        settled = self._columns["close_time"][rows]
+        for field in ("updated_at", "created_at"):
+            settled = np.where(settled != NULL_TIME, settled, self._columns[field][rows])
+        return settled
+
+    def _fold(self, rows: np.ndarray, sign: int) -> None:
+        """Add (``sign`` 1) or remove (-1) the live trades in ``rows`` to or from the hourly rollups."""
+        columns = self._columns
+        rows = rows[columns["live"][rows]]
+        code = self._code("status", "closed")
+        created = columns["created_at"][rows]
+        touched = set()
+        for row, opened_at, created_at, closed, settled, closed_at, pnl in zip(
+            rows.tolist(),
+            (created // BUCKET_MICROS).tolist(),
+            created.tolist(),
+            (columns["status"][rows] == code).tolist() if code is not None else [False] * len(rows),
+            self._settled(rows).tolist(),
+            columns["close_time"][rows].tolist(),
+            columns["profit_loss"][rows].tolist(),
+        ):
+            self._bucket(opened_at).opened += sign
+            touched.add(opened_at)
+            if not closed:
+                continue
+            key = settled // BUCKET_MICROS
+            bucket = self._bucket(key)
+            touched.add(key)
+            bucket.closed += sign
+            if closed_at != NULL_TIME:
+                bucket.duration_sum += sign * (closed_at - created_at) / 3.6e9  # hours
+                bucket.duration_count += sign
+            if pnl != pnl or pnl == 0:
+                continue
+            if pnl > 0:
+                bucket.wins += sign
+            else:
+                bucket.losses += sign
+            if sign < 0:
+                bucket.rows.remove(row)
+                bucket.summary = None
+                continue
+            bucket.rows.append(row)
+            if bucket.summary is not None and (settled, row) > bucket.last:
+                bucket.summary = bucket.summary.then(EquitySummary.of((pnl,)))
+                bucket.last = (settled, row)
+            else:
+                bucket.summary = None
+
+        if sign < 0:
+            for key in touched:
+                if self._buckets[key].is_empty():
+                    del self._buckets[key]
+                    del self._keys[bisect_left(self._keys, key)]
+
+    def _bucket(self, key: int) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+            insort(self._keys, key)
+        return bucket
+
+    def _overwrite(self, row: int, record: Dict[str, Any]) -> None:
+        self._fold(np.array([row]), -1)
+        self._write(row, record)
+        self._fold(np.array([row]), 1)
+
+    def _write(self, row: int, record: Dict[str, Any]) -> None:
+        for field, value in record.items():
+            if field in self._dictionaries:
+                self._columns[field][row] = self._dictionaries[field].encode(value)
+            elif field in FLOAT_FIELDS:
+                self._columns[field][row] = np.nan if value is None else float(value)
+            elif field in TIME_FIELDS:
+                self._columns[field][row] = to_micros(value)
+
+    def _add_batch(self, batch: List[Dict[str, Any]]) -> int:
+        fresh: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for record in batch:
+            key = split_id(record["id"])
+            if key is None:
+                raise ValueError(f"Trade id is not a UUID: {record['id']!r}")
+            row = self._locate(record["id"])
+            if row is not None:
+                self._overwrite(row, record)
+            else:
+                fresh[key] = record
+        if fresh:
+            self._append(list(fresh.values()))
+        else:
+            self._changed()
+        return len(batch)
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        """Write new trades after the last row; their ids must not exist yet."""
+        start = self.rows
+        stop = start + len(records)
+        keys = [split_id(record["id"]) for record in records]
+        if any(key is None for key in keys):
+            raise ValueError("Trade ids must be UUIDs")
+        self._reserve(stop)
+        columns = self._columns
+        columns["id_hi"][start:stop] = [key[0] for key in keys]
+        columns["id_lo"][start:stop] = [key[1] for key in keys]
+        for field, dictionary in self._dictionaries.items():
+            columns[field][start:stop] = [dictionary.encode(record.get(field)) for record in records]
+        for field in FLOAT_FIELDS:
+            columns[field][start:stop] = [
+                np.nan if record.get(field) is None else float(record[field]) for record in records
+            ]
+        for field in TIME_FIELDS:
+            columns[field][start:stop] = [to_micros(record.get(field)) for record in records]
+        columns["live"][start:stop] = True
+        # The rows only become visible once their columns are written.
+        self._header[0] = stop
+        self._header[1] += len(records)
+        self._tail.update(zip(keys, range(start, stop)))
+        if len(self._tail) > max(MIN_CAPACITY, stop // 16):
+            self._rebuild_index()
+        self._fold(np.arange(start, stop), 1)
+        self._changed()
+
+    def _record(self, row: int) -> Dict[str, Any]:
+        columns = self._columns
+        record: Dict[str, Any] = {
+            "id": str(UUID(int=(int(columns["id_hi"][row]) << 64) | int(columns["id_lo"][row]))),
+        }
+        for field, dictionary in self._dictionaries.items():
+            record[field] = dictionary.values[columns[field][row]]
+        for field in FLOAT_FIELDS:
+            value = float(columns[field][row])
+            record[field] = None if value != value else value
+        for field in TIME_FIELDS:
+            record[field] = from_micros(columns[field][row])
+        return record
+
+    def _locate(self, record_id: Any) -> Optional[int]:
+        """Row of the live trade with ``record_id``, or None."""
+        key = split_id(record_id)
+        if key is None:
+            return None
+        live = self._columns["live"]
+        row = self._tail.get(key)
+        if row is not None and live[row]:
+            return row
+        hi, lo = np.uint64(key[0]), key[1]
+        position = int(np.searchsorted(self._index_keys, hi))
+        while position < len(self._index_keys) and self._index_keys[position] == hi:
+            row = int(self._index_rows[position])
+            if int(self._columns["id_lo"][row]) == lo and live[row]:
+                return row
+            position += 1
+        return None
+
+    def _rebuild_index(self) -> None:
+        hi = self._columns["id_hi"][:self.rows]
+        self._index_rows = np.argsort(hi, kind="stable")
+        self._index_keys = hi[self._index_rows]
+        self._tail.clear()
+
+    def _reserve(self, rows: int) -> None:
+        if rows <= self._capacity and self._columns:
+            return
+        capacity = max(rows, self._capacity * 2, MIN_CAPACITY)
+        for name, dtype in COLUMNS.items():
+            if self._dir is None:
+                column = np.empty(capacity, dtype=dtype)
+                if name in self._columns:
+                    column[:self._capacity] = self._columns[name]
+            else:
+                # Growing the file keeps existing pages; only the mapping is redone.
+                path = self._dir / f"{name}.bin"
+                with open(path, "ab") as f:
+                    f.truncate(max(capacity * dtype.itemsize, f.tell()))
+                column = np.memmap(path, dtype=dtype, mode="r+", shape=(capacity,))
+            self._columns[name] = column
+        self._capacity = capacity
+
+    def _changed(self) -> None:
+        self._cache.clear()